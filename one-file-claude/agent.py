@@ -11,17 +11,24 @@ A simple coding agent in ~300 lines that can:
 Usage:
     export ANTHROPIC_API_KEY="your-key"
     python agent.py
+    python agent.py --resume [SESSION_ID]   # continue a saved session (default: the latest)
 """
 
+import argparse
+import hashlib
+import json
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from anthropic import Anthropic
-from rich.console import Console
-from rich.markdown import Markdown
 
 # Configure logging
 loggingLevel = logging.INFO
 DEMO_MODE = True  # Set to True to show all context before each API call
+MAX_TOOL_WORKERS = 8  # Independent tool calls from one turn run in parallel, set to 1 to disable
+SESSION_DIR = os.path.expanduser("~/.cache/mini-claude/sessions")  # Each message is appended to <id>.jsonl here
+SESSION_INLINE_MAX_BYTES = 16 * 1024  # Larger tool results are stored once under blobs/, by content hash
 
 logging.basicConfig(
     level=loggingLevel,
@@ -29,11 +36,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize the Anthropic client
-client = Anthropic()
+# The Anthropic client is created on first use - importing the SDK and
+# building the client take longer than the rest of startup combined
+client = None
 
-# Initialize Rich console for markdown rendering
-console = Console()
+# The Rich console is also created on first use, so importing the agent doesn't load rich
+console = None
 
 # System prompt that defines the agent's behavior
 SYSTEM_PROMPT = """You are a helpful coding assistant that can read, write, and manage files.
@@ -174,7 +182,129 @@ def execute_tool(tool_name: str, tool_input: dict) -> str:
         return f"Error executing {tool_name}: {e}"
 
 
-def run_agent(user_message: str, conversation_history: list = None) -> None:
+# Tools that only look at the filesystem and can safely run at the same time
+READ_ONLY_TOOLS = {"read_file", "list_files"}
+
+
+def execute_tools(tool_uses: list) -> list:
+    """
+    Execute all tool calls from one model turn and return results in the same order.
+
+    Calls are grouped into lanes: a call joins the lane of any earlier call whose path overlaps
+    its own when at least one of them writes, so writes to a path stay in order. Lanes run in
+    parallel on a bounded thread pool.
+    """
+    lanes = []  # [(call indices, [(path, writes), ...]), ...]
+    for i, block in enumerate(tool_uses):
+        path = os.path.abspath(block.input.get("path", "."))
+        writes = block.name not in READ_ONLY_TOOLS
+        merged_indices, merged_accesses = [i], [(path, writes)]
+        for lane in list(lanes):
+            indices, accesses = lane
+            if any((writes or other_writes) and _paths_overlap(path, other) for other, other_writes in accesses):
+                lanes.remove(lane)
+                merged_indices += indices
+                merged_accesses += accesses
+        lanes.append((sorted(merged_indices), merged_accesses))
+
+    results = [None] * len(tool_uses)
+
+    def run_lane(indices):
+        for i in indices:
+            results[i] = execute_tool(tool_uses[i].name, tool_uses[i].input)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_TOOL_WORKERS, len(lanes)))) as pool:
+        list(pool.map(run_lane, [indices for indices, _ in lanes]))
+    return results
+
+
+def _paths_overlap(a: str, b: str) -> bool:
+    """Check whether one path is the same as, or inside, the other."""
+    return a == b or a.startswith(b.rstrip(os.sep) + os.sep) or b.startswith(a.rstrip(os.sep) + os.sep)
+
+
+def get_client():
+    """Get the Anthropic client, creating it on first use."""
+    global client
+    if client is None:
+        from anthropic import Anthropic
+        client = Anthropic()
+    return client
+
+
+def get_console():
+    """Get the Rich console used for output, creating it on first use."""
+    global console
+    if console is None:
+        from rich.console import Console
+        console = Console()
+    return console
+
+
+# Sessions are append-only JSONL logs: a header line, then one line per message as it is added.
+# Nothing is rewritten, so saving costs one small write per message however long the session gets.
+def _blob_path(digest: str) -> str:
+    return os.path.join(SESSION_DIR, "blobs", digest[:2], digest)
+
+
+def _to_record(message: dict) -> dict:
+    """Turn a history message into JSON, storing large tool results out of line."""
+    content = message["content"]
+    if isinstance(content, str):
+        return message
+    blocks = []
+    for block in content:
+        if not isinstance(block, dict):
+            block = block.model_dump(exclude_none=True)
+        elif block.get("type") == "tool_result" and len(block["content"].encode("utf-8")) > SESSION_INLINE_MAX_BYTES:
+            data = block["content"].encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()
+            if not os.path.exists(_blob_path(digest)):
+                # Write the blob before the log line that refers to it
+                os.makedirs(os.path.dirname(_blob_path(digest)), exist_ok=True)
+                Path(_blob_path(digest) + ".tmp").write_bytes(data)
+                os.replace(_blob_path(digest) + ".tmp", _blob_path(digest))
+            block = {"type": "tool_result", "tool_use_id": block["tool_use_id"], "content_ref": digest}
+        blocks.append(block)
+    return {"role": message["role"], "content": blocks}
+
+
+def save_message(session_path: str, message: dict) -> None:
+    """Append one message to a session log, starting the log if it is new."""
+    os.makedirs(SESSION_DIR, exist_ok=True)
+    with open(session_path, "a", encoding="utf-8") as f:
+        if f.tell() == 0:
+            f.write(json.dumps({"session_id": Path(session_path).stem, "created": time.time(), "cwd": os.getcwd()}) + "\n")
+        f.write(json.dumps(_to_record(message)) + "\n")
+
+
+def load_session(session_path: str) -> list:
+    """Read a session log back into a conversation history."""
+    history = []
+    for line in Path(session_path).read_text(encoding="utf-8").splitlines()[1:]:
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            continue  # A line cut short by a crash
+        if not isinstance(message["content"], str):
+            for block in message["content"]:
+                if "content_ref" in block:
+                    block["content"] = Path(_blob_path(block.pop("content_ref"))).read_text(encoding="utf-8")
+        history.append(message)
+    # A crash between a response and its tool results leaves tool calls unanswered, which the API rejects
+    if history and history[-1]["role"] == "assistant" and not isinstance(history[-1]["content"], str):
+        unanswered = [block["id"] for block in history[-1]["content"] if block.get("type") == "tool_use"]
+        if unanswered:
+            history.append({"role": "user", "content": [
+                {"type": "tool_result", "tool_use_id": tool_use_id, "is_error": True,
+                 "content": "Error: The session ended before this tool call finished; its result is unknown."}
+                for tool_use_id in unanswered
+            ]})
+            save_message(session_path, history[-1])
+    return history
+
+
+def run_agent(user_message: str, conversation_history: list = None, session_path: str = None) -> None:
     """
     Run the agent with a user message.
 
@@ -182,12 +312,19 @@ def run_agent(user_message: str, conversation_history: list = None) -> None:
     1. Send message to Claude
     2. If Claude wants to use a tool, execute it and continue
     3. Repeat until Claude gives a final response
+
+    Each message added to the history is also appended to session_path, if given.
     """
     if conversation_history is None:
         conversation_history = []
 
+    def add_message(message: dict) -> None:
+        conversation_history.append(message)
+        if session_path:
+            save_message(session_path, message)
+
     # Add the user's message to the conversation
-    conversation_history.append({
+    add_message({
         "role": "user",
         "content": user_message
     })
@@ -195,7 +332,7 @@ def run_agent(user_message: str, conversation_history: list = None) -> None:
     # ReAct loop - keep going until the model stops using tools
     while True:
         # Get response from Claude
-        response = client.messages.create(
+        response = get_client().messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=4096,
             system=SYSTEM_PROMPT,
@@ -206,10 +343,11 @@ def run_agent(user_message: str, conversation_history: list = None) -> None:
         # Render any text content as markdown
         text_content = [block.text for block in response.content if hasattr(block, 'text')]
         if text_content:
-            console.print(Markdown(''.join(text_content)))
+            from rich.markdown import Markdown
+            get_console().print(Markdown(''.join(text_content)))
 
         # Add assistant's response to conversation history
-        conversation_history.append({
+        add_message({
             "role": "assistant",
             "content": response.content
         })
@@ -219,8 +357,7 @@ def run_agent(user_message: str, conversation_history: list = None) -> None:
 
         if tool_uses:
             tool_results = []
-            for block in tool_uses:
-                result = execute_tool(block.name, block.input)
+            for block, result in zip(tool_uses, execute_tools(tool_uses)):
                 logger.info("Executed tool: \"%s\", results:\n%s", block.name, result)
 
                 tool_results.append({
@@ -230,7 +367,7 @@ def run_agent(user_message: str, conversation_history: list = None) -> None:
                 })
 
             # Add tool results to the conversation
-            conversation_history.append({
+            add_message({
                 "role": "user",
                 "content": tool_results
             })
@@ -243,37 +380,59 @@ def run_agent(user_message: str, conversation_history: list = None) -> None:
             return
 
 
+def new_session_path() -> str:
+    """Path of the log for a new session."""
+    return os.path.join(SESSION_DIR, time.strftime("%Y%m%d-%H%M%S-") + os.urandom(3).hex() + ".jsonl")
+
+
 def main():
     """Main chat loop."""
-    console.print("\n[bold]Baby Code Phase 1: Minimum Viable Coding Agent[/bold]")
-    console.print("[dim]Commands: 'quit' to exit, 'clear' to reset conversation[/dim]\n")
+    parser = argparse.ArgumentParser(description="Minimal coding agent.")
+    parser.add_argument("--resume", nargs="?", const="", metavar="SESSION_ID",
+                        help="Continue a saved session (the most recent one if no id is given)")
+    args = parser.parse_args()
+
+    get_console().print("\n[bold]Baby Code Phase 1: Minimum Viable Coding Agent[/bold]")
+    get_console().print("[dim]Commands: 'quit' to exit, 'clear' to reset conversation[/dim]\n")
 
     conversation_history = []
+    session_path = new_session_path()
+    if args.resume is not None:
+        if args.resume:
+            session_path = os.path.join(SESSION_DIR, args.resume + ".jsonl")
+        else:
+            logs = sorted(Path(SESSION_DIR).glob("*.jsonl"), key=os.path.getmtime) if os.path.isdir(SESSION_DIR) else []
+            session_path = str(logs[-1]) if logs else session_path
+        if not os.path.exists(session_path):
+            parser.exit(1, "No saved session to resume.\n")
+        conversation_history = load_session(session_path)
+        get_console().print(f"[dim]Resumed session {Path(session_path).stem} ({len(conversation_history)} messages).[/dim]\n")
 
     while True:
         try:
             # Get user input
-            console.print("[bold]>[/bold] ", end="")
+            get_console().print("[bold]>[/bold] ", end="")
             user_input = input().strip()
         except (EOFError, KeyboardInterrupt):
-            console.print("\n[dim]Goodbye![/dim]")
+            get_console().print("\n[dim]Goodbye![/dim]")
             break
 
         if not user_input:
             continue
 
         if user_input.lower() == 'quit':
-            console.print("\n[dim]Goodbye![/dim]\n")
+            get_console().print("\n[dim]Goodbye![/dim]\n")
             break
 
         if user_input.lower() == 'clear':
             conversation_history = []
-            console.print("[dim]Conversation cleared.[/dim]\n")
+            session_path = new_session_path()
+            get_console().print("[dim]Conversation cleared.[/dim]\n")
             continue
 
         # Visual separator before agent response
-        console.rule("[bold green]Agent", style="green")
-        run_agent(user_input, conversation_history)
+        get_console().rule("[bold green]Agent", style="green")
+        run_agent(user_input, conversation_history, session_path)
         print()  # Add spacing after response
 
 
@@ -10,16 +10,30 @@ A modular coding agent that demonstrates clean architecture:
 Usage:
     export ANTHROPIC_API_KEY="your-key"
     python agent.py
+    python agent.py --resume [SESSION_ID]   # continue a saved session (default: the latest)
 """
 
+import argparse
 import logging
+import sys
+from typing import Optional
 from tools.registry import ToolRegistry
 from tools.file_tools import get_file_tools
+from tools.search_tools import get_search_tools
+from tools.shell_tools import get_shell_tools
+from tools.subagent_tools import get_subagent_tools
 from core.agent import Agent
+from core.clients import is_api_error, preload_sdk
+from core.session_store import SessionLog, latest_session, list_sessions
+from core.telemetry import serve_metrics
 from core.ui import (
     show_welcome_message,
     show_goodbye_message,
     show_clear_message,
+    show_stats,
+    show_error,
+    show_resumed_message,
+    show_sessions,
     get_user_input,
     show_agent_separator
 )
@@ -34,12 +48,12 @@ def setup_logging():
     )
 
 
-def create_agent() -> Agent:
+def create_registry() -> ToolRegistry:
     """
-    Create and configure the agent with tools.
+    Create a tool registry with all tools registered.
 
     Returns:
-        Configured Agent instance
+        ToolRegistry for one session
     """
     # Create tool registry
     registry = ToolRegistry()
@@ -48,22 +62,86 @@ def create_agent() -> Agent:
     for tool in get_file_tools():
         registry.register(tool)
 
-    # Future: Add more tools here
-    # for tool in get_bash_tools():
-    #     registry.register(tool)
+    # Register search tools
+    for tool in get_search_tools():
+        registry.register(tool)
+
+    # Register shell tools
+    for tool in get_shell_tools():
+        registry.register(tool)
+
+    # Register sub-agent tools last; sub-agents get the tools registered above
+    for tool in get_subagent_tools(registry):
+        registry.register(tool)
+
+    return registry
 
+
+def create_agent(session_log: Optional[SessionLog] = None) -> Agent:
+    """
+    Create and configure the agent with tools.
+
+    Args:
+        session_log: Log to save the history to, and resume it from
+
+    Returns:
+        Configured Agent instance
+    """
     # Create agent with registered tools
-    agent = Agent(registry)
+    agent = Agent(create_registry(), session_log=session_log)
 
     return agent
 
 
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Minimal coding agent.")
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="",
+        metavar="SESSION_ID",
+        help="Continue a saved session (the most recent one if no id is given)"
+    )
+    return parser.parse_args()
+
+
+def open_session_log(resume: Optional[str]) -> Optional[SessionLog]:
+    """
+    Open the log for this run's session.
+
+    Args:
+        resume: Session id to resume, "" for the most recent session, or
+            None for a new session
+
+    Returns:
+        The session log (None if sessions are not saved and none is resumed)
+    """
+    if resume is None:
+        return SessionLog() if config.SESSION_PERSIST else None
+    session_id = resume or latest_session()
+    if session_id is None:
+        sys.exit("No saved sessions to resume.")
+    session_log = SessionLog(session_id)
+    if not session_log.exists():
+        sys.exit(f"No saved session {session_id!r} in {session_log.directory}.")
+    return session_log
+
+
 def main():
     """Main chat loop."""
+    args = parse_args()
     setup_logging()
     show_welcome_message()
 
-    agent = create_agent()
+    session_log = open_session_log(args.resume)
+    agent = create_agent(session_log)
+    if args.resume is not None:
+        show_resumed_message(session_log.session_id, session_log.message_count())
+    if config.TELEMETRY_METRICS_PORT is not None:
+        serve_metrics(agent.telemetry, config.TELEMETRY_METRICS_PORT)
+    # The prompt is shown before the SDK is loaded; load it while the user types
+    preload_sdk()
 
     while True:
         try:
@@ -84,9 +162,24 @@ def main():
             show_clear_message()
             continue
 
+        if user_input.lower() == 'stats':
+            show_stats(agent.telemetry.summary())
+            continue
+
+        if user_input.lower() == 'sessions':
+            show_sessions(list_sessions(), agent.session_log.session_id if agent.session_log else None)
+            continue
+
         # Visual separator before agent response
         show_agent_separator()
-        agent.run(user_input)
+        try:
+            agent.run(user_input)
+        except Exception as e:
+            if not is_api_error(e):
+                raise
+            # Retries are exhausted; keep the session so the user can try again
+            show_error(str(e))
+            continue
         print()  # Add spacing after response
 
 
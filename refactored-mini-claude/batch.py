@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Headless batch mode: run a JSONL file of tasks over a pool of workers.
+
+Each line of the input is a task object. The prompt is taken from "prompt",
+or built from "title" and "body"; the id comes from "id" or "request_id"
+(defaulting to the line number). A task may set "cwd" to run in an existing
+directory; otherwise it gets a fresh directory under --workdir, optionally
+seeded with a copy of --template.
+
+Every task runs in its own process with its own Agent, so tasks can't see
+each other's conversation, tool state or working directory. One JSON line is
+appended to the output as each task finishes, with the final response,
+token usage and timings. Re-running with the same output file skips tasks
+that already succeeded, so an interrupted batch resumes where it stopped.
+
+Usage:
+    export ANTHROPIC_API_KEY="your-key"
+    python batch.py tasks.jsonl --output results.jsonl --workers 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Set
+import config
+
+
+logger = logging.getLogger(__name__)
+
+
+def load_tasks(path: str) -> List[Dict[str, Any]]:
+    """
+    Read tasks from a JSONL file.
+
+    Args:
+        path: Input file
+
+    Returns:
+        Tasks with "id" and "prompt" filled in, in file order
+
+    Raises:
+        ValueError: If a line is not valid JSON, has no prompt, or reuses an id
+    """
+    tasks = []
+    seen: Set[str] = set()
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                task = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON: {e}")
+
+            task_id = str(task.get("id") or task.get("request_id") or f"task-{line_number}")
+            prompt = task.get("prompt")
+            if prompt is None and ("title" in task or "body" in task):
+                prompt = "\n\n".join(part for part in (task.get("title"), task.get("body")) if part)
+            if not prompt:
+                raise ValueError(f"{path}:{line_number}: task has no prompt")
+            if task_id in seen:
+                raise ValueError(f"{path}:{line_number}: duplicate task id {task_id!r}")
+            seen.add(task_id)
+            tasks.append({**task, "id": task_id, "prompt": prompt})
+    return tasks
+
+
+def load_finished(path: str, retry_failed: bool = True) -> Set[str]:
+    """
+    Find the tasks an earlier run of this batch already finished.
+
+    A line cut short by a crash is ignored, so that task runs again.
+
+    Args:
+        path: Output file of the earlier run
+        retry_failed: Don't count tasks that ended in an error
+
+    Returns:
+        Ids of tasks to skip
+    """
+    finished = set()
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if result.get("status") == "ok" or not retry_failed:
+                    finished.add(result["id"])
+    except FileNotFoundError:
+        pass
+    return finished
+
+
+def run_task(task: Dict[str, Any], workdir: str, template: Optional[str]) -> Dict[str, Any]:
+    """
+    Run one task in this worker process.
+
+    Args:
+        task: Task with "id" and "prompt"
+        workdir: Directory to run the task in
+        template: Directory copied into workdir first, if any
+
+    Returns:
+        Result record for the output file
+    """
+    from agent import create_agent
+    import core.ui
+
+    started = time.time()
+    start = time.perf_counter()
+    result: Dict[str, Any] = {"id": task["id"], "workdir": workdir, "started": started}
+    try:
+        if template and not os.path.exists(workdir):
+            shutil.copytree(template, workdir, symlinks=True)
+        os.makedirs(workdir, exist_ok=True)
+        os.chdir(workdir)
+
+        # Nobody is watching: no demo pauses and no rendering
+        config.DEMO_MODE = False
+        core.ui.console.quiet = True
+
+        agent = create_agent()
+        try:
+            result["result"] = agent.run(task["prompt"])
+            result["status"] = "ok"
+        finally:
+            summary = agent.telemetry.summary()
+            api = summary["api"]
+            result["api_calls"] = api["calls"]
+            result["usage"] = {field: api[field] for field in (
+                "input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens"
+            )}
+            result["tool_calls"] = {name: tool["calls"] for name, tool in summary["tools"].items()}
+            result["api_seconds"] = api["seconds"]
+    except Exception as e:
+        logger.exception("Task %s failed", task["id"])
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["duration"] = time.perf_counter() - start
+    return result
+
+
+def init_worker(workers: int) -> None:
+    """
+    Set up a worker process before it runs any task.
+
+    Each process has its own rate-limit scheduler, so the workers split the
+    account's limits between them instead of each starting from all of it.
+
+    Args:
+        workers: Number of worker processes
+    """
+    config.RATE_LIMIT_SHARE = config.RATE_LIMIT_SHARE / workers
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a JSONL file of agent tasks headlessly.")
+    parser.add_argument("tasks", help="JSONL file of tasks")
+    parser.add_argument("--output", "-o", required=True, help="JSONL file results are appended to")
+    parser.add_argument("--workers", "-j", type=int, default=config.BATCH_WORKERS, help="Tasks run concurrently")
+    parser.add_argument("--workdir", default=config.BATCH_WORKDIR, help="Directory holding each task's working directory")
+    parser.add_argument("--template", help="Directory copied into each new task working directory")
+    parser.add_argument("--no-retry-failed", action="store_true", help="On resume, skip tasks that failed before too")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=config.LOGGING_LEVEL, format='[%(levelname)s] %(message)s')
+    try:
+        tasks = load_tasks(args.tasks)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    finished = load_finished(args.output, retry_failed=not args.no_retry_failed)
+    pending = [task for task in tasks if task["id"] not in finished]
+    print(f"{len(tasks)} tasks, {len(tasks) - len(pending)} already done, running {len(pending)}", file=sys.stderr)
+    if not pending:
+        return 0
+
+    workdir_root = os.path.abspath(args.workdir)
+    template = os.path.abspath(args.template) if args.template else None
+    failures = 0
+    with open(args.output, "a+") as output:
+        # Start on a fresh line if a crash cut the last record short
+        output.seek(0, os.SEEK_END)
+        if output.tell():
+            output.seek(output.tell() - 1)
+            if output.read(1) != "\n":
+                output.write("\n")
+
+        workers = max(1, min(args.workers, len(pending)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(workers,)) as pool:
+            futures = {
+                pool.submit(
+                    run_task,
+                    task,
+                    os.path.abspath(task["cwd"]) if task.get("cwd") else os.path.join(workdir_root, task["id"]),
+                    template
+                ): task
+                for task in pending
+            }
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    task = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # The worker process itself died
+                        result = {"id": task["id"], "status": "error", "error": f"{type(e).__name__}: {e}"}
+                    output.write(json.dumps(result) + "\n")
+                    output.flush()
+                    os.fsync(output.fileno())
+                    failures += result["status"] != "ok"
+                    print(
+                        f"[{done}/{len(pending)}] {task['id']}: {result['status']}"
+                        + (f" ({result['duration']:.1f}s)" if "duration" in result else ""),
+                        file=sys.stderr
+                    )
+            except KeyboardInterrupt:
+                print("Interrupted; re-run with the same --output to resume", file=sys.stderr)
+                pool.shutdown(wait=False, cancel_futures=True)
+                return 130
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
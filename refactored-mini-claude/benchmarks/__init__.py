@@ -0,0 +1,10 @@
+"""Offline benchmarks of the agent's own overhead.
+
+Run from the refactored-mini-claude directory:
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --baseline results.json --tolerance 0.25
+
+No API key or network access is needed: the model is replaced by a fake
+client that replays scripted responses with a configurable latency.
+"""
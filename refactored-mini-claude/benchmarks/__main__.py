@@ -0,0 +1,88 @@
+"""Command line entry point: run suites, write JSON results, compare with a baseline."""
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+from typing import Any, Dict, List
+from .suites import SUITES, run_suite
+
+
+RESULTS_VERSION = 1
+
+# Differences smaller than this many seconds are treated as noise
+NOISE_FLOOR_SECONDS = 0.00005
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Find measurements that got slower than the baseline allows.
+
+    Args:
+        current: Results of this run
+        baseline: Results of an earlier run
+        tolerance: Allowed slowdown as a fraction (0.25 = 25% slower)
+
+    Returns:
+        A description of each regression
+    """
+    regressions = []
+    for name, measurement in sorted(current["results"].items()):
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        seconds, limit = measurement["seconds"], previous["seconds"] * (1 + tolerance)
+        if seconds > limit and seconds - previous["seconds"] > NOISE_FLOOR_SECONDS:
+            regressions.append(
+                f"{name}: {seconds * 1000:.3f}ms vs {previous['seconds'] * 1000:.3f}ms "
+                f"({seconds / previous['seconds']:.2f}x)"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument("suites", nargs="*", help=f"Suites to run: {', '.join(sorted(SUITES))} (default: all)")
+    parser.add_argument("--quick", action="store_true", help="Smaller workloads and fewer repeats")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Fail if any measurement is slower than in this results file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs the baseline (default 0.25)")
+    args = parser.parse_args()
+    unknown = sorted(set(args.suites) - set(SUITES))
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(unknown)}")
+
+    results: Dict[str, Any] = {
+        "version": RESULTS_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "results": {}
+    }
+    for name in args.suites or sorted(SUITES):
+        measurements = run_suite(name, args.quick)
+        results["results"].update(measurements)
+        for key, measurement in measurements.items():
+            print(f"{key:32} {measurement['seconds'] * 1000:10.3f}ms  (min {measurement['min_seconds'] * 1000:.3f}ms)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
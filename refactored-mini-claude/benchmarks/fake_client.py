@@ -0,0 +1,226 @@
+"""Local stand-in for the Anthropic client that replays scripted responses.
+
+FakeAnthropic and FakeAsyncAnthropic implement the parts of the client the
+agent uses - messages.create and messages.stream - and return real SDK
+Message objects, so the agent runs unchanged without network access. Each
+call sleeps for a configurable latency, making it possible to measure the
+agent's own overhead separately from the API's.
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+from anthropic.types import Message
+from core.context import estimate_tokens
+
+
+# A responder turns the request parameters into the content blocks of the
+# response; plain lists of blocks are replayed in order instead
+Responder = Callable[[Dict[str, Any]], List[Dict[str, Any]]]
+
+_ids = itertools.count(1)
+
+
+def text_block(text: str) -> Dict[str, Any]:
+    """
+    Build a text content block.
+
+    Args:
+        text: Text of the block
+
+    Returns:
+        Content block dict
+    """
+    return {"type": "text", "text": text}
+
+
+def tool_use_block(name: str, tool_input: Dict[str, Any], tool_use_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build a tool_use content block.
+
+    Args:
+        name: Tool name
+        tool_input: Tool parameters
+        tool_use_id: Block id (defaults to a unique id)
+
+    Returns:
+        Content block dict
+    """
+    return {"type": "tool_use", "id": tool_use_id or f"toolu_{next(_ids)}", "name": name, "input": tool_input}
+
+
+class FakeMessages:
+    """Synchronous messages resource."""
+
+    def __init__(self, client: "FakeAnthropic"):
+        self._client = client
+
+    def create(self, **params) -> Message:
+        """Return the next scripted response after the configured latency."""
+        time.sleep(self._client.latency)
+        return self._client.next_message(params)
+
+    def stream(self, **params) -> "FakeStream":
+        """Stream the next scripted response."""
+        return FakeStream(self._client, self._client.next_message(params))
+
+
+class FakeAsyncMessages:
+    """Asynchronous messages resource."""
+
+    def __init__(self, client: "FakeAnthropic"):
+        self._client = client
+
+    async def create(self, **params) -> Message:
+        """Return the next scripted response after the configured latency."""
+        await asyncio.sleep(self._client.latency)
+        return self._client.next_message(params)
+
+    def stream(self, **params) -> "FakeAsyncStream":
+        """Stream the next scripted response."""
+        return FakeAsyncStream(self._client, self._client.next_message(params))
+
+
+class FakeAnthropic:
+    """Replaying stand-in for anthropic.Anthropic."""
+
+    def __init__(
+        self,
+        script: Union[Responder, Iterable[List[Dict[str, Any]]]],
+        latency: float = 0.0,
+        time_to_first_token: Optional[float] = None,
+        chunk_chars: int = 20,
+        output_tokens_per_char: float = 0.25
+    ):
+        """
+        Initialize the fake client.
+
+        Args:
+            script: Responder function, or the content of each response in
+                order
+            latency: Seconds each call takes in total
+            time_to_first_token: Seconds before a stream's first event
+                (defaults to half the latency)
+            chunk_chars: Characters per streamed text delta
+            output_tokens_per_char: Used to fill in usage.output_tokens
+        """
+        if callable(script):
+            self._responder = script
+        else:
+            responses = iter(script)
+            self._responder = lambda params: next(responses)
+        self.latency = latency
+        self.time_to_first_token = latency / 2 if time_to_first_token is None else time_to_first_token
+        self.chunk_chars = chunk_chars
+        self.output_tokens_per_char = output_tokens_per_char
+        self.requests: List[Dict[str, Any]] = []
+        self.messages = self._messages_resource()
+
+    def _messages_resource(self) -> Any:
+        return FakeMessages(self)
+
+    def next_message(self, params: Dict[str, Any]) -> Message:
+        """
+        Build the response to a request from the script.
+
+        Args:
+            params: Request parameters
+
+        Returns:
+            SDK Message with estimated usage
+        """
+        self.requests.append(params)
+        content = self._responder(params)
+        output_chars = sum(len(block.get("text", "")) + len(json.dumps(block.get("input", ""))) for block in content)
+        return Message.model_validate({
+            "id": f"msg_{len(self.requests)}",
+            "type": "message",
+            "role": "assistant",
+            "model": params.get("model", "fake"),
+            "content": content,
+            "stop_reason": "tool_use" if any(block["type"] == "tool_use" for block in content) else "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": estimate_tokens(params.get("messages", [])),
+                "output_tokens": int(output_chars * self.output_tokens_per_char),
+                "cache_read_input_tokens": 0,
+                "cache_creation_input_tokens": 0
+            }
+        })
+
+    def events(self, message: Message) -> Iterator[Any]:
+        """
+        Split a message into stream events like the SDK's MessageStream.
+
+        Args:
+            message: Complete message
+
+        Yields:
+            Events with the type and payload fields the agent reads
+        """
+        for index, block in enumerate(message.content):
+            yield SimpleNamespace(type="content_block_start", index=index, content_block=block)
+            if block.type == "text":
+                for start in range(0, len(block.text), self.chunk_chars):
+                    chunk = block.text[start:start + self.chunk_chars]
+                    yield SimpleNamespace(type="text", text=chunk, snapshot=block.text[:start + len(chunk)])
+            else:
+                partial = json.dumps(block.input)
+                yield SimpleNamespace(type="input_json", partial_json=partial, snapshot=block.input)
+            yield SimpleNamespace(type="content_block_stop", index=index, content_block=block)
+        yield SimpleNamespace(type="message_stop", message=message)
+
+
+class FakeAsyncAnthropic(FakeAnthropic):
+    """Replaying stand-in for anthropic.AsyncAnthropic."""
+
+    def _messages_resource(self) -> Any:
+        return FakeAsyncMessages(self)
+
+
+class FakeStream:
+    """Context manager mimicking the SDK's MessageStream."""
+
+    def __init__(self, client: FakeAnthropic, message: Message):
+        self._client = client
+        self._message = message
+
+    def __enter__(self) -> "FakeStream":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def __iter__(self) -> Iterator[Any]:
+        time.sleep(self._client.time_to_first_token)
+        yield from self._client.events(self._message)
+        time.sleep(max(self._client.latency - self._client.time_to_first_token, 0.0))
+
+    def get_final_message(self) -> Message:
+        return self._message
+
+
+class FakeAsyncStream:
+    """Async context manager mimicking the SDK's AsyncMessageStream."""
+
+    def __init__(self, client: FakeAnthropic, message: Message):
+        self._client = client
+        self._message = message
+
+    async def __aenter__(self) -> "FakeAsyncStream":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    async def __aiter__(self):
+        await asyncio.sleep(self._client.time_to_first_token)
+        for event in self._client.events(self._message):
+            yield event
+        await asyncio.sleep(max(self._client.latency - self._client.time_to_first_token, 0.0))
+
+    async def get_final_message(self) -> Message:
+        return self._message
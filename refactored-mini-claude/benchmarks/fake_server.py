@@ -0,0 +1,179 @@
+"""Local HTTP stand-in for the Messages API that enforces rate limits.
+
+FakeAPIServer serves POST /v1/messages, plain and streamed, so a real
+Anthropic client can be pointed at it with base_url. It enforces a
+requests-per-minute limit with a small burst, answering 429 with
+retry-after when it is exceeded, and a concurrency limit, answering 529
+(overloaded) beyond it. Successful responses carry anthropic-ratelimit-*
+headers like the real API's. This makes the rate-limit scheduler testable
+without network access or API quota.
+"""
+
+import datetime
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from core.scheduler import TokenBucket
+from .fake_client import FakeAnthropic, Responder, text_block
+
+
+class FakeAPIServer:
+    """Rate-limited fake Messages API on a local port."""
+
+    def __init__(
+        self,
+        responder: Optional[Responder] = None,
+        requests_per_minute: float = 600,
+        burst: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        latency: float = 0.0
+    ):
+        """
+        Initialize the server (call start() to listen).
+
+        Args:
+            responder: Builds the response content from the request
+                parameters (defaults to a short text answer)
+            requests_per_minute: Sustained request rate allowed
+            burst: Requests allowed at once from an idle start (defaults
+                to a minute's worth, as the real API allows)
+            max_concurrency: Requests in flight beyond which 529 is
+                returned (None = unlimited)
+            latency: Seconds each successful request takes
+        """
+        self.model = FakeAnthropic(responder or (lambda params: [text_block("Done.")]))
+        self.requests_per_minute = requests_per_minute
+        self.bucket = TokenBucket(requests_per_minute, burst)
+        self.max_concurrency = max_concurrency
+        self.latency = latency
+        self.stats = {"requests": 0, "ok": 0, "rate_limited": 0, "overloaded": 0, "max_in_flight": 0}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        """URL to pass to the client as base_url."""
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeAPIServer":
+        """Listen on a free port from a background thread."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                params = json.loads(self.rfile.read(int(self.headers.get("content-length") or 0)))
+                server._handle(self, params)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-api", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """Stop listening."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeAPIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _admit(self) -> Optional[Dict[str, Any]]:
+        """Apply the limits to a new request; returns the error response if it is refused."""
+        with self._lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            wait = self.bucket.delay(1, now)
+            if wait:
+                self.stats["rate_limited"] += 1
+                return {"status": 429, "type": "rate_limit_error", "retry_after": math.ceil(wait)}
+            if self.max_concurrency is not None and self._in_flight >= self.max_concurrency:
+                self.stats["overloaded"] += 1
+                return {"status": 529, "type": "overloaded_error", "retry_after": None}
+            self.bucket.take(1)
+            self._in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+            return None
+
+    def _rate_limit_headers(self) -> Dict[str, str]:
+        with self._lock:
+            remaining = max(int(self.bucket.level), 0)
+            refill = (self.bucket.capacity - self.bucket.level) / self.bucket.rate
+        reset = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=refill)
+        return {
+            "anthropic-ratelimit-requests-limit": str(int(self.requests_per_minute)),
+            "anthropic-ratelimit-requests-remaining": str(remaining),
+            "anthropic-ratelimit-requests-reset": reset.isoformat(timespec="seconds").replace("+00:00", "Z")
+        }
+
+    def _handle(self, handler: BaseHTTPRequestHandler, params: Dict[str, Any]) -> None:
+        """Answer one request: an error, a JSON message or an SSE stream."""
+        error = self._admit()
+        if error is not None:
+            headers = {**self._rate_limit_headers(), "content-type": "application/json"}
+            if error["retry_after"] is not None:
+                headers["retry-after"] = str(error["retry_after"])
+            body = {"type": "error", "error": {"type": error["type"], "message": "Fake API limit exceeded"}}
+            self._send(handler, error["status"], headers, json.dumps(body).encode("utf-8"))
+            return
+
+        try:
+            time.sleep(self.latency)
+            message = self.model.next_message(params).model_dump()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.stats["ok"] += 1
+        headers = self._rate_limit_headers()
+        if params.get("stream"):
+            headers["content-type"] = "text/event-stream"
+            self._send(handler, 200, headers, _sse(message))
+        else:
+            headers["content-type"] = "application/json"
+            self._send(handler, 200, headers, json.dumps(message).encode("utf-8"))
+
+    @staticmethod
+    def _send(handler: BaseHTTPRequestHandler, status: int, headers: Dict[str, str], body: bytes) -> None:
+        handler.send_response(status)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.send_header("content-length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+def _sse(message: Dict[str, Any]) -> bytes:
+    """Encode a message as the Messages API's stream of server-sent events."""
+    events = [("message_start", {"message": {**message, "content": [], "stop_reason": None}})]
+    for index, block in enumerate(message["content"]):
+        if block["type"] == "text":
+            events.append(("content_block_start", {"index": index, "content_block": {"type": "text", "text": ""}}))
+            events.append(("content_block_delta", {"index": index, "delta": {"type": "text_delta", "text": block["text"]}}))
+        else:
+            events.append(("content_block_start", {"index": index, "content_block": {**block, "input": {}}}))
+            events.append(("content_block_delta", {
+                "index": index,
+                "delta": {"type": "input_json_delta", "partial_json": json.dumps(block["input"])}
+            }))
+        events.append(("content_block_stop", {"index": index}))
+    events.append(("message_delta", {
+        "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+        "usage": {"output_tokens": message["usage"]["output_tokens"]}
+    }))
+    events.append(("message_stop", {}))
+    return "".join(
+        f"event: {name}\ndata: {json.dumps({'type': name, **data})}\n\n" for name, data in events
+    ).encode("utf-8")
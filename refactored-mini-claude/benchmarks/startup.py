@@ -0,0 +1,129 @@
+"""Startup import-time budget.
+
+Runs `python -X importtime -c "import <entry point>"` in fresh interpreters,
+for this package's entry points and for the single-file agent in
+one-file-claude, and checks the result against a budget: the import must take less than
+IMPORT_BUDGET_SECONDS (median of several runs) and must not load any of the
+modules deferred until first use (the SDK, markdown rendering, asyncio).
+
+    python -m benchmarks.startup            # exit 1 if over budget
+
+The `startup` benchmark suite reports the same timings, so they are also
+compared against a baseline like every other measurement.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+
+
+IMPORT_BUDGET_SECONDS = 0.25
+
+# Modules that must only be imported on first use
+DEFERRED_MODULES = (
+    "anthropic", "httpx", "httpx2", "pydantic",
+    "rich.markdown", "rich.live", "rich.table", "pygments", "markdown_it",
+    "asyncio", "http.server"
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ONE_FILE_ROOT = os.path.join(os.path.dirname(ROOT), "one-file-claude")
+
+# Entry points whose import is timed: name -> (module, directory it is imported from)
+ENTRY_POINTS: Dict[str, Tuple[str, str]] = {
+    "agent": ("agent", ROOT),
+    "batch": ("batch", ROOT),
+    "one_file_agent": ("agent", ONE_FILE_ROOT)
+}
+
+
+def import_times(module: str, directory: str = ROOT) -> Dict[str, float]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module: Module to import
+        directory: Directory to import it from
+
+    Returns:
+        Cumulative import seconds of every module loaded, by name
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=directory,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1_000_000
+    return times
+
+
+def measure_startup(name: str, runs: int = 5) -> Tuple[List[float], List[str]]:
+    """
+    Time an entry point's import over several runs.
+
+    Args:
+        name: Entry point, a key of ENTRY_POINTS
+        runs: Fresh interpreters to time
+
+    Returns:
+        Import seconds of each run, and the deferred modules it loaded
+    """
+    module, directory = ENTRY_POINTS[name]
+    seconds = []
+    loaded: List[str] = []
+    for _ in range(runs):
+        times = import_times(module, directory)
+        seconds.append(times[module])
+        loaded = [name for name in DEFERRED_MODULES if name in times]
+    return seconds, loaded
+
+
+def check(budget: float = IMPORT_BUDGET_SECONDS, runs: int = 5) -> List[str]:
+    """
+    Check every entry point against the budget.
+
+    Args:
+        budget: Largest allowed median import time, in seconds
+        runs: Fresh interpreters per entry point
+
+    Returns:
+        A description of each violation
+    """
+    problems = []
+    for name in ENTRY_POINTS:
+        seconds, loaded = measure_startup(name, runs)
+        median = statistics.median(seconds)
+        print(f"import {name:14} {median * 1000:8.1f}ms  (min {min(seconds) * 1000:.1f}ms)")
+        if median > budget:
+            problems.append(f"import {name} takes {median * 1000:.1f}ms, budget is {budget * 1000:.0f}ms")
+        if loaded:
+            problems.append(f"import {name} loads {', '.join(loaded)}, which should be imported on first use")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description="Check startup import time against a budget.")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_SECONDS, help="Seconds allowed per entry point import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per entry point")
+    args = parser.parse_args()
+
+    problems = check(args.budget, args.runs)
+    for problem in problems:
+        print(problem)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
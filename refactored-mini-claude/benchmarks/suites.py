@@ -0,0 +1,478 @@
+"""Benchmarks of the agent's own overhead.
+
+Each suite returns a dict of named measurements. A measurement holds the
+median and minimum seconds per operation over several repeats, plus any
+derived figures (such as throughput), so results from different runs can be
+compared key by key.
+"""
+
+import io
+import os
+import re
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+from anthropic import Anthropic, APIError
+from rich.console import Console
+import config
+import core.ui
+from core.agent import Agent
+from core.blob_store import BlobStore
+from core.events import EventSink
+from core.response_cache import RECORD, cache_key
+from core.scheduler import RateLimitScheduler, ScheduledClient
+from core.ui import DemoContextDisplay, StreamingMarkdown, render_agent_response
+from tools.base import Tool
+from tools.registry import ToolRegistry
+from tools.file_tools import edit_file, list_files, read_file, read_files
+from tools.search_tools import search_code
+from .fake_client import FakeAnthropic, text_block, tool_use_block
+from .fake_server import FakeAPIServer
+from .startup import ENTRY_POINTS, measure_startup
+
+
+Measurement = Dict[str, Any]
+
+# name -> suite function taking the `quick` flag
+SUITES: Dict[str, Callable[[bool], Dict[str, Measurement]]] = {}
+
+
+def suite(name: str) -> Callable:
+    """Register a benchmark suite under a name."""
+    def register(function: Callable[[bool], Dict[str, Measurement]]) -> Callable:
+        SUITES[name] = function
+        return function
+    return register
+
+
+def measure(
+    function: Callable[[Any], Any],
+    repeat: int = 5,
+    number: int = 1,
+    setup: Optional[Callable[[], Any]] = None
+) -> Measurement:
+    """
+    Time a function.
+
+    Args:
+        function: Called with the setup's return value
+        repeat: Number of timed repeats; the median is reported
+        number: Calls per repeat; times are divided by it
+        setup: Untimed function run before each repeat
+
+    Returns:
+        Median and minimum seconds per call
+    """
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        start = time.perf_counter()
+        for _ in range(number):
+            function(state)
+        times.append((time.perf_counter() - start) / number)
+    return {"seconds": statistics.median(times), "min_seconds": min(times), "repeat": repeat, "number": number}
+
+
+def _noop(**kwargs) -> str:
+    return "ok"
+
+
+def _noop_registry() -> ToolRegistry:
+    """Registry with a do-nothing tool, so dispatch cost is all that is measured."""
+    registry = ToolRegistry()
+    registry.register(Tool(
+        name="noop",
+        description="Do nothing",
+        input_schema={"type": "object", "properties": {"n": {"type": "integer"}}},
+        function=_noop,
+        read_only=True
+    ))
+    registry.register(Tool(
+        name="noop_pure",
+        description="Do nothing, memoized",
+        input_schema={"type": "object", "properties": {"n": {"type": "integer"}}},
+        function=_noop,
+        read_only=True,
+        pure=True
+    ))
+    return registry
+
+
+def _quiet_console() -> Console:
+    """Console that renders like a terminal but writes to memory."""
+    return Console(file=io.StringIO(), force_terminal=True, width=100, color_system="truecolor")
+
+
+def _tool_loop_agent(tool_turns: int, latency: float = 0.0) -> Agent:
+    """Agent whose fake model calls the noop tool tool_turns times per request, then answers."""
+    def respond(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # Count the tool results since the user's request
+        turn = 0
+        for message in reversed(params["messages"]):
+            content = message["content"]
+            if message["role"] == "user":
+                if isinstance(content, str) or content[0]["type"] != "tool_result":
+                    break
+                turn += 1
+        if turn >= tool_turns:
+            return [text_block("Done. The **noop** tool ran as expected.")]
+        return [text_block("Calling the tool."), tool_use_block("noop", {"n": turn})]
+
+    return Agent(_noop_registry(), client=FakeAnthropic(respond, latency=latency))
+
+
+@suite("loop")
+def loop_overhead(quick: bool) -> Dict[str, Measurement]:
+    """ReAct loop cost per API call with a zero-latency model and a no-op tool."""
+    tool_turns = 5 if quick else 20
+    results = {}
+    for streaming in (False, True):
+        config.STREAM_RESPONSES = streaming
+        result = measure(
+            lambda agent: agent.run("Call the tool."),
+            repeat=3 if quick else 7,
+            setup=lambda: _tool_loop_agent(tool_turns)
+        )
+        calls = tool_turns + 1
+        results[f"loop.{'stream' if streaming else 'create'}.per_call"] = {
+            **result,
+            "seconds": result["seconds"] / calls,
+            "min_seconds": result["min_seconds"] / calls,
+            "calls_per_run": calls
+        }
+    return results
+
+
+def _synthetic_history(messages: int, result_chars: int = 2000) -> List[Dict[str, Any]]:
+    """History of tool-using turns: assistant tool_use followed by a user tool_result."""
+    history: List[Dict[str, Any]] = [{"role": "user", "content": "Explore the repository."}]
+    for i in range(messages // 2):
+        tool_use_id = f"toolu_h{i}"
+        history.append({"role": "assistant", "content": [
+            text_block(f"Reading file {i}."),
+            tool_use_block("read_file", {"path": f"src/module_{i}.py"}, tool_use_id)
+        ]})
+        history.append({"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": tool_use_id, "content": f"line {i}\n" * (result_chars // 8)}
+        ]})
+    return history
+
+
+@suite("history")
+def history_growth(quick: bool) -> Dict[str, Measurement]:
+    """Per-call overhead of building the request and checking the budget as the history grows."""
+    config.STREAM_RESPONSES = False
+    results = {}
+    for size in (10, 100) if quick else (10, 100, 1000):
+        history = _synthetic_history(size)
+
+        def setup():
+            agent = Agent(_noop_registry(), client=FakeAnthropic(lambda params: [text_block("Done.")]))
+            # Measure steady-state cost, not compaction
+            agent.context_manager.token_budget = 10 ** 9
+            agent.conversation_history = list(history)
+            return agent
+
+        results[f"history.build_request.{size}"] = measure(lambda agent: agent._build_request(), setup=setup, number=10)
+        results[f"history.turn.{size}"] = measure(lambda agent: agent.run("Continue."), setup=setup)
+    return results
+
+
+@suite("blobs")
+def blob_store(quick: bool) -> Dict[str, Measurement]:
+    """Memory held by a history of large, often repeated tool results, with and without the blob store."""
+    results_count = 100 if quick else 500
+    # A session re-reading 20 files of 32KB
+    files = [f"{i:02d} " + "source line\n" * 2700 for i in range(20)]
+    tool_uses = [SimpleNamespace(id=f"toolu_b{i}", name="read_file") for i in range(results_count)]
+    results = {}
+    for name, store in (("inline", None), ("stored", BlobStore(memory_bytes=256 * 1024))):
+        agent = Agent(_noop_registry(), client=FakeAnthropic(lambda params: [text_block("Done.")]), events=EventSink())
+        agent.blob_store = store
+        agent.context_manager.token_budget = 10 ** 9
+        tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            for i, tool_use in enumerate(tool_uses):
+                # A fresh string per call, as a tool reading the file would return
+                agent._add_tool_results([tool_use], [files[i % len(files)][:-1] + "\n"])
+            seconds = time.perf_counter() - start
+            retained = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        results[f"blobs.{name}.add_result"] = {
+            "seconds": seconds / results_count,
+            "min_seconds": seconds / results_count,
+            "repeat": 1,
+            "number": results_count,
+            "retained_bytes": retained,
+            **({"store": store.stats()} if store is not None else {})
+        }
+        results[f"blobs.{name}.build_request"] = measure(lambda _: agent._build_request(), repeat=3, number=5)
+        # With the response cache on, requests are hashed as well; only new messages should cost anything
+        saved_mode = config.RESPONSE_CACHE_MODE
+        config.RESPONSE_CACHE_MODE = RECORD
+        try:
+            agent._build_request()
+            results[f"blobs.{name}.cache_key"] = measure(lambda _: cache_key(agent._build_request()), repeat=3, number=5)
+        finally:
+            config.RESPONSE_CACHE_MODE = saved_mode
+    return results
+
+
+@suite("registry")
+def registry_dispatch(quick: bool) -> Dict[str, Measurement]:
+    """ToolRegistry dispatch: single calls, memo hits and parallel batches."""
+    registry = _noop_registry()
+    number = 200 if quick else 2000
+    batch = [(f"toolu_{i}", "noop", {"n": i}) for i in range(16)]
+    return {
+        "registry.execute_tool": measure(lambda _: registry.execute_tool("noop", {"n": 1}), number=number),
+        "registry.memo_hit": measure(lambda _: registry.execute_tool("noop_pure", {"n": 1}), number=number),
+        "registry.batch16.serial": measure(lambda _: registry.execute_tools(batch, max_workers=1), number=number // 20),
+        "registry.batch16.parallel": measure(
+            lambda _: registry.execute_tools(batch, max_workers=config.MAX_TOOL_WORKERS),
+            number=number // 20
+        )
+    }
+
+
+def _make_tree(root: str, directories: int, files_per_directory: int) -> int:
+    """Write a synthetic source tree. Returns the total bytes written."""
+    total = 0
+    for d in range(directories):
+        directory = os.path.join(root, "src", f"package_{d}")
+        os.makedirs(directory)
+        for f in range(files_per_directory):
+            content = "".join(
+                f"def function_{d}_{f}_{line}(value):\n    return value * {line}  # package {d}\n\n"
+                for line in range(15)
+            )
+            with open(os.path.join(directory, f"module_{f}.py"), "w") as handle:
+                handle.write(content)
+            total += len(content)
+    return total
+
+
+@suite("files")
+def file_tools(quick: bool) -> Dict[str, Measurement]:
+    """File tool throughput on a synthetic tree (tools called directly, bypassing the memo)."""
+    directories, files_per_directory = (10, 20) if quick else (40, 50)
+    root = tempfile.mkdtemp(prefix="mini-claude-bench-")
+    saved_index_dir = config.SEARCH_INDEX_DIR
+    config.SEARCH_INDEX_DIR = os.path.join(root, ".index")
+    try:
+        tree_bytes = _make_tree(root, directories, files_per_directory)
+        files = directories * files_per_directory
+        big_file = os.path.join(root, "big.txt")
+        with open(big_file, "w") as handle:
+            handle.write(("x" * 99 + "\n") * 50000)
+        # A minified bundle: one line far longer than a read_file window
+        minified_file = os.path.join(root, "bundle.min.js")
+        with open(minified_file, "w") as handle:
+            handle.write("var a=1;" * (50000 if quick else 200000))
+        small_file = os.path.join(root, "src", "package_0", "module_0.py")
+        glob = os.path.join(root, "src", "package_*", "module_1*.py")
+
+        results = {
+            "files.list_recursive": measure(lambda _: list_files(root, recursive=True), repeat=5),
+            "files.read_file.small": measure(lambda _: read_file(small_file), number=100),
+            "files.read_file.big": measure(lambda _: read_file(big_file, limit=1000000), number=5),
+            "files.read_file.page_long_line": measure(lambda _: _page_through(minified_file), repeat=3),
+            "files.read_files.glob": measure(lambda _: read_files([glob]), repeat=5),
+            "files.search.index_build": measure(lambda _: search_code("function_0_0_0", root), repeat=1),
+            "files.search.warm": measure(lambda _: search_code("function_3_7_11", root), number=20),
+            "files.edit_file": measure(
+                lambda _: (edit_file(small_file, "value * 1 ", "value * 2 "), edit_file(small_file, "value * 2 ", "value * 1 ")),
+                number=20
+            )
+        }
+        results["files.list_recursive"]["entries"] = files + directories + 1
+        results["files.read_file.big"]["bytes_per_second"] = (
+            min(os.path.getsize(big_file), config.READ_FILE_MAX_BYTES) / results["files.read_file.big"]["seconds"]
+        )
+        results["files.search.index_build"]["bytes_per_second"] = tree_bytes / results["files.search.index_build"]["seconds"]
+        return results
+    finally:
+        config.SEARCH_INDEX_DIR = saved_index_dir
+        shutil.rmtree(root, ignore_errors=True)
+
+
+# Continuation marker read_file appends to a truncated window
+_TRUNCATION_MARKER = re.compile(r'\[Truncated: returned bytes (\d+)-(\d+) of (\d+)\. Call read_file with offset=(\d+) unit="(\w+)" to continue\.\]$')
+
+
+def _page_through(path: str) -> int:
+    """
+    Read a whole file by following read_file's continuation markers, as the model would.
+
+    Returns:
+        Number of read_file calls
+
+    Raises:
+        RuntimeError: If the windows skip or repeat bytes, or stop short of the end
+    """
+    size = os.path.getsize(path)
+    offset, unit, position, calls = 0, "lines", 0, 0
+    while True:
+        result = read_file(path, offset=offset, unit=unit)
+        calls += 1
+        marker = _TRUNCATION_MARKER.search(result)
+        if marker is None:
+            return calls
+        start, end = int(marker.group(1)), int(marker.group(2))
+        if start != position or end <= start or calls > size:
+            raise RuntimeError(f"read_file paging went from byte {position} to {start}-{end} of {path}")
+        position = end
+        offset, unit = int(marker.group(4)), marker.group(5)
+
+
+@suite("ui")
+def ui_rendering(quick: bool) -> Dict[str, Measurement]:
+    """Markdown rendering cost, whole responses and throttled streaming."""
+    paragraphs = 10 if quick else 40
+    document = "\n\n".join(
+        f"## Section {i}\n\nSome **bold** text, `inline code` and a list:\n\n- one\n- two\n\n"
+        f"```python\ndef section_{i}():\n    return {i}\n```"
+        for i in range(paragraphs)
+    )
+    chunks = [document[i:i + 20] for i in range(0, len(document), 20)]
+
+    def stream(refresh_interval: float) -> None:
+        with StreamingMarkdown(refresh_interval=refresh_interval) as renderer:
+            for chunk in chunks:
+                renderer.append(chunk)
+
+    tools = _noop_registry().get_tool_schemas()
+
+    def demo_setup():
+        # A long session already on screen; each call adds one turn
+        display = DemoContextDisplay(pause=False)
+        history = _synthetic_history(200 if quick else 1000)
+        display.render(config.SYSTEM_PROMPT, tools, history)
+        return display, history
+
+    def demo_turn(state) -> None:
+        display, history = state
+        history.append({"role": "user", "content": "Continue."})
+        display.render(config.SYSTEM_PROMPT, tools, history)
+
+    return {
+        "ui.demo_context.turn": measure(demo_turn, setup=demo_setup, number=20),
+        "ui.render_response": measure(lambda _: render_agent_response(document)),
+        "ui.stream.throttled": measure(lambda _: stream(config.STREAM_REFRESH_INTERVAL)),
+        "ui.stream.unthrottled": measure(lambda _: stream(0.0), repeat=3)
+    }
+
+
+def _drive(client: Any, sessions: int, requests: int, stream: bool) -> Dict[str, Any]:
+    """Send requests from concurrent session threads; count successes and failures."""
+    params = {"model": "fake", "max_tokens": 100, "messages": [{"role": "user", "content": "Hello"}]}
+    outcomes = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def session() -> None:
+        for _ in range(requests):
+            try:
+                if stream:
+                    with client.messages.stream(**params) as events:
+                        for _ in events:
+                            pass
+                else:
+                    client.messages.create(**params)
+                outcome = "ok"
+            except APIError:
+                outcome = "failed"
+            with lock:
+                outcomes[outcome] += 1
+
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {**outcomes, "wall_seconds": time.perf_counter() - start}
+
+
+@suite("scheduler")
+def rate_limit_scheduler(quick: bool) -> Dict[str, Measurement]:
+    """Concurrent sessions against a rate-limited fake API, with and without the scheduler."""
+    sessions, requests = (8, 4) if quick else (16, 8)
+    total = sessions * requests
+    results = {}
+    for name, stream in (("create", False), ("stream", True)):
+        # 20 requests/second, bursts of 5 and at most 6 in flight
+        with FakeAPIServer(requests_per_minute=1200, burst=5, max_concurrency=6, latency=0.02) as server:
+            scheduler = RateLimitScheduler(backoff_base=0.1)
+            client = ScheduledClient(Anthropic(base_url=server.base_url, api_key="fake"), scheduler=scheduler)
+            outcome = _drive(client, sessions, requests, stream)
+            results[f"scheduler.{name}.per_request"] = {
+                "seconds": outcome["wall_seconds"] / total,
+                "min_seconds": outcome["wall_seconds"] / total,
+                "repeat": 1,
+                "number": total,
+                "failed": outcome["failed"],
+                "server_rate_limited": server.stats["rate_limited"],
+                "server_overloaded": server.stats["overloaded"],
+                "mean_queue_seconds": scheduler.stats()["queue_seconds"] / total,
+                "retries": scheduler.stats()["retries"]
+            }
+
+    # The same load with only the SDK's own retries, for comparison
+    with FakeAPIServer(requests_per_minute=1200, burst=5, max_concurrency=6, latency=0.02) as server:
+        outcome = _drive(Anthropic(base_url=server.base_url, api_key="fake"), sessions, requests, False)
+        results["scheduler.unscheduled.per_request"] = {
+            "seconds": outcome["wall_seconds"] / total,
+            "min_seconds": outcome["wall_seconds"] / total,
+            "repeat": 1,
+            "number": total,
+            "failed": outcome["failed"],
+            "server_rate_limited": server.stats["rate_limited"],
+            "server_overloaded": server.stats["overloaded"]
+        }
+    return results
+
+
+@suite("startup")
+def startup_imports(quick: bool) -> Dict[str, Measurement]:
+    """Import time of each entry point in a fresh interpreter (python -X importtime)."""
+    runs = 3 if quick else 7
+    results = {}
+    for name in ENTRY_POINTS:
+        seconds, loaded = measure_startup(name, runs)
+        results[f"startup.import.{name}"] = {
+            "seconds": statistics.median(seconds),
+            "min_seconds": min(seconds),
+            "repeat": runs,
+            "number": 1,
+            "deferred_modules_loaded": loaded
+        }
+    return results
+
+
+def run_suite(name: str, quick: bool = False) -> Dict[str, Measurement]:
+    """
+    Run one suite with output captured and interactive features off.
+
+    Args:
+        name: Suite name (a key of SUITES)
+        quick: Use smaller workloads and fewer repeats
+
+    Returns:
+        The suite's measurements
+    """
+    saved = (core.ui.console, config.DEMO_MODE, config.STREAM_RESPONSES, config.RATE_LIMIT_SCHEDULER)
+    core.ui.console = _quiet_console()
+    config.DEMO_MODE = False
+    # Fake clients have no rate limits; the scheduler suite drives its own scheduler
+    config.RATE_LIMIT_SCHEDULER = False
+    try:
+        return SUITES[name](quick)
+    finally:
+        core.ui.console, config.DEMO_MODE, config.STREAM_RESPONSES, config.RATE_LIMIT_SCHEDULER = saved
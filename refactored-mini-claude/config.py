@@ -6,20 +6,157 @@ import logging
 MODEL = "claude-sonnet-4-20250514"
 MAX_TOKENS = 4096
 
+# Model routing - pick a model tier per API call (see core/routing.py)
+MODEL_ROUTING = False  # False = every call uses MODEL and MAX_TOKENS
+MODEL_TIERS = {  # Cheapest first; prices in US dollars per million tokens
+    "fast": {
+        "model": "claude-haiku-4-5-20251001",
+        "max_tokens": 2048,
+        "input_cost_per_mtok": 1.0,
+        "output_cost_per_mtok": 5.0
+    },
+    "default": {
+        "model": MODEL,
+        "max_tokens": MAX_TOKENS,
+        "input_cost_per_mtok": 3.0,
+        "output_cost_per_mtok": 15.0
+    }
+}
+ROUTING_RULES = [  # First match wins; conditions are listed in core/routing.py
+    {"turn": 0, "tier": "default"},  # Planning the user's request
+    {"last_tool_error": True, "tier": "default"},  # Recovering from a failed tool call
+    {"min_expected_output_tokens": 1024, "tier": "default"},  # Writing code or a long answer
+    {"last_tools_within": ["read_file", "read_files", "list_files", "search_code", "command_status"], "tier": "fast"}
+]
+ROUTING_DEFAULT_TIER = "default"
+
+# Streaming - render the response as it is generated
+STREAM_RESPONSES = True
+STREAM_REFRESH_INTERVAL = 0.1  # Minimum seconds between markdown re-renders
+
+# Prompt caching - reuse the system prompt, tools and conversation prefix across calls
+PROMPT_CACHING = True
+
+# Response cache - replay recorded API responses for identical requests
+RESPONSE_CACHE_MODE = "passthrough"  # "record", "replay" (misses are errors) or "passthrough" (off)
+RESPONSE_CACHE_DIR = "~/.cache/mini-claude/responses"
+RESPONSE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Rate limiting - API requests from all sessions in a process share one scheduler
+RATE_LIMIT_SCHEDULER = True  # Queue and retry requests (False = send directly, with the SDK's own retries)
+RATE_LIMIT_REQUESTS_PER_MINUTE = 50  # Starting limits; the API's rate-limit headers replace them
+RATE_LIMIT_TOKENS_PER_MINUTE = 30000  # Input tokens per minute
+RATE_LIMIT_MAX_CONCURRENCY = 16  # Most requests in flight; halved on each 429/529, then regrown
+RATE_LIMIT_SHARE = 1.0  # Fraction of the account's limits this process uses; batch workers each get 1/--workers
+RATE_LIMIT_MAX_RETRIES = 6
+RATE_LIMIT_BACKOFF_BASE = 1.0  # Seconds; the backoff ceiling doubles with each retry
+RATE_LIMIT_BACKOFF_MAX = 60.0
+
+# Blob store - large tool results are kept out of the history and put back only when a request is built
+BLOB_STORE = True
+BLOB_STORE_MIN_CHARS = 8 * 1024  # Shorter results stay in the history
+BLOB_STORE_MEMORY_BYTES = 64 * 1024 * 1024  # Least recently used blobs beyond this are written to disk
+BLOB_STORE_DIR = None  # Where evicted blobs go (None = a temporary directory, removed at exit)
+
+# Context compaction - keep conversation history within a token budget
+CONTEXT_TOKEN_BUDGET = 150000
+COMPACTION_THRESHOLD = 0.8  # Start compacting at this fraction of the budget
+COMPACTION_TARGET = 0.5  # Compact down to this fraction of the budget
+COMPACTION_KEEP_RECENT_TOOL_RESULTS = 6  # Most recent tool results are never shrunk
+COMPACTION_TOOL_RESULT_PREVIEW_CHARS = 500
+COMPACTION_SUMMARY_LINE_CHARS = 300
+COMPACTION_SUMMARY_MAX_CHARS = 8000
+COMPACTION_MODEL_SUMMARY = False  # Ask the model to write summaries instead of extracting them
+
+# Tool execution - independent tool calls from one turn run in parallel
+PARALLEL_TOOL_CALLS = True
+MAX_TOOL_WORKERS = 8
+TOOL_MEMO_MAX_ENTRIES = 256  # Memoized results of pure tools (0 disables memoization)
+TOOL_MEMO_TTL = 60.0  # Seconds a memoized result stays valid
+
+# File reading
+READ_FILE_MAX_BYTES = 100000  # Largest chunk read_file returns per call
+READ_FILE_MMAP_THRESHOLD = 1000000  # Files this large are memory-mapped
+READ_FILE_BINARY_SNIFF_BYTES = 8192  # Leading bytes checked for NUL to detect binaries
+READ_FILES_MAX_BYTES = 200000  # Total content read_files returns per call
+READ_FILES_MAX_FILES = 50
+
+# File cache - contents of recently read files, validated against mtime/size/inode
+FILE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+FILE_CACHE_MAX_FILE_BYTES = 4 * 1024 * 1024
+
+# File editing
+EDIT_DIFF_MAX_LINES = 40  # Longest diff edit_file returns
+
+# Directory listing
+LIST_FILES_PAGE_SIZE = 1000  # Entries per list_files call before a continuation cursor
+DEFAULT_EXCLUDES = [".git", "node_modules", "__pycache__", ".venv", "venv", ".mypy_cache", ".pytest_cache", ".tox"]
+
+# Code search
+SEARCH_INDEX_DIR = "~/.cache/mini-claude/search-index"
+SEARCH_REFRESH_INTERVAL = 30.0  # Seconds between full rescans for changed files
+SEARCH_MAX_FILE_BYTES = 2 * 1024 * 1024  # Larger files are not indexed
+SEARCH_MAX_RESULTS = 50
+SEARCH_MAX_LINE_CHARS = 300
+
+# Shell commands (run_command)
+SHELL_TIMEOUT = 120.0  # Default seconds before a command's process group is killed
+SHELL_MAX_TIMEOUT = 1800.0  # Longest timeout the model may ask for
+SHELL_KILL_GRACE_SECONDS = 2.0  # Between SIGTERM and SIGKILL
+SHELL_OUTPUT_MAX_BYTES = 30000  # Output kept per command: the first and last half of this
+SHELL_MAX_BACKGROUND_JOBS = 8
+
+# Sub-agents (spawn_subagents) - child agents working on parts of a task in parallel
+SUBAGENT_MAX_CONCURRENCY = 4  # Children running at once
+SUBAGENT_MAX_TASKS = 16  # Most children per spawn_subagents call
+SUBAGENT_TOKEN_BUDGET = 400000  # Tokens all children of one call may use together
+SUBAGENT_MAX_API_CALLS = 25  # Per child
+SUBAGENT_REPORT_MAX_CHARS = 4000  # Longer reports are cut, keeping the end
+
+# Batch mode (batch.py)
+BATCH_WORKERS = 4  # Tasks run concurrently, each in its own process
+BATCH_WORKDIR = "batch-work"  # Each task without a "cwd" runs in <BATCH_WORKDIR>/<task id>
+
+# Server mode (server.py)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+MAX_SESSIONS = 64  # Least recently used idle sessions are evicted beyond this
+SESSION_IDLE_TIMEOUT = 1800.0  # Seconds before an idle session is closed
+SESSION_EVICT_INTERVAL = 60.0  # Seconds between idle session sweeps
+
+# Session persistence (agent.py) - the history is appended to a log as it grows, so it can be resumed
+SESSION_PERSIST = True
+SESSION_DIR = "~/.cache/mini-claude/sessions"  # Resume with: python agent.py --resume [SESSION_ID]
+SESSION_INLINE_MAX_BYTES = 16 * 1024  # Larger tool results are stored once, out of line, by content hash
+SESSION_FSYNC = False  # fsync every write (survives power loss, not just crashes, at some cost per message)
+
+# Telemetry - spans for every API call and tool execution
+TELEMETRY_JSONL_PATH = None  # Append spans to this JSONL file, e.g. "~/.cache/mini-claude/telemetry.jsonl"
+TELEMETRY_METRICS_PORT = None  # Serve Prometheus metrics on http://127.0.0.1:<port>/metrics
+
 # Logging configuration
 LOGGING_LEVEL = logging.ERROR
 PFORMAT_WIDTH = 200
 
-# Demo mode - shows all context before each API call
+# Demo mode - shows the context before each API call (only what is new since the last call)
 DEMO_MODE = True
+DEMO_MODE_PAUSE = True  # Wait for Enter before each call (False = log the context at INFO and carry on)
+DEMO_MESSAGE_MAX_CHARS = 2000  # Longer messages are cut in the display
+DEMO_TOOL_RESULT_PREVIEW_CHARS = 200  # Tool results are collapsed to a preview this long
 
 # System prompt that defines the agent's behavior
 SYSTEM_PROMPT = """You are a helpful coding assistant that can read, write, and manage files.
 
 You have access to the following tools:
 - read_file: Read the contents of a file
+- read_files: Read several files (or glob patterns) in one call
 - write_file: Write content to a file (creates or overwrites)
+- edit_file: Change part of an existing file (prefer this over rewriting whole files)
 - list_files: List files in a directory
+- search_code: Search file contents for text or a regex
+- run_command: Run a shell command, such as tests or a build (optionally as a background job)
+- command_status: Check on a background job's output and exit code
+- spawn_subagents: Hand independent parts of a large task to sub-agents that work in parallel
 
 When given a task:
 1. Think about what you need to do
@@ -27,4 +164,5 @@ When given a task:
 3. Continue until the task is complete
 4. Explain what you did
 
-Always be careful when writing files - make sure you understand the existing content first."""
+Always be careful when writing files - make sure you understand the existing content first.
+Run the tests after making changes, when the project has them."""
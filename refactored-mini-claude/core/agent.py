@@ -1,11 +1,22 @@
 """Core agent logic implementing the ReAct pattern."""
 
+import json
 import logging
-from typing import List, Dict, Any
-from anthropic import Anthropic
+import time
+from typing import List, Dict, Any, Optional
 import config
 from tools.registry import ToolRegistry
-from core.ui import show_demo_context, render_agent_response
+from core.ui import DemoContextDisplay, ConsoleSink
+from core.events import EventSink
+from core.prompt_cache import apply_cache_breakpoints
+from core.context import ContextManager, CHARS_PER_TOKEN, block_field, summarize_messages
+from core.telemetry import Telemetry, API_CALL, RUN, TOOL
+from core.response_cache import CachedClient, DigestedMessages, HistoryDigests, PASSTHROUGH
+from core.scheduler import ScheduledClient
+from core.session_store import SessionLog
+from core.blob_store import get_blob_store, rehydrate
+from core.clients import is_api_error
+from core.routing import ModelRouter, is_capacity_error
 
 
 logger = logging.getLogger(__name__)
@@ -14,18 +25,115 @@ logger = logging.getLogger(__name__)
 class Agent:
     """Coding agent that uses ReAct pattern with Claude."""
 
-    def __init__(self, tool_registry: ToolRegistry):
+    # Wrapper used when config.RESPONSE_CACHE_MODE enables the response cache
+    cached_client_class = CachedClient
+    # Wrapper used when config.RATE_LIMIT_SCHEDULER is on
+    scheduled_client_class = ScheduledClient
+    # Show the new context before each API call when config.DEMO_MODE is on
+    demo_mode = True
+
+    def __init__(
+        self,
+        tool_registry: ToolRegistry,
+        client: Optional[Any] = None,
+        events: Optional[EventSink] = None,
+        session_log: Optional[SessionLog] = None
+    ):
         """
         Initialize the agent.
 
         Args:
             tool_registry: Registry of available tools
+            client: Anthropic client to use (defaults to a new Anthropic(),
+                created on the first API call). Requests go through the shared rate-limit scheduler if
+                config.RATE_LIMIT_SCHEDULER is on, and the response cache
+                in front of it unless config.RESPONSE_CACHE_MODE is
+                "passthrough".
+            events: Where streamed text, responses and tool results are
+                reported (defaults to rendering them on the console)
+            session_log: Log the history is saved to as it grows (defaults
+                to not saving it). If the session already has a log, its
+                history is resumed, read on first use.
         """
-        self.client = Anthropic()
+        # Importing the SDK and building a client are slow, so wait until the first call
+        self._client = self._wrap_client(client) if client is not None else None
         self.tool_registry = tool_registry
-        self.conversation_history: List[Dict[str, Any]] = []
+        self.system_prompt = config.SYSTEM_PROMPT
+        self.events = events if events is not None else ConsoleSink()
+        self.session_log = session_log
+        # Large tool results are held here, with only handles in the history
+        self.blob_store = get_blob_store() if config.BLOB_STORE else None
+        # Loaded from the session log on first use
+        self._history: Optional[List[Dict[str, Any]]] = None
+        # Request hashing for the response cache; reset whenever the history is rewritten
+        self._history_digests = HistoryDigests()
+        self.context_manager = ContextManager(
+            summarizer=self._summarize_with_model if config.COMPACTION_MODEL_SUMMARY else None,
+            # Tools must not point back to results that are no longer in the history
+            on_discard=tool_registry.session.forget_results
+        )
+        self.compaction_reports: List[Dict[str, Any]] = []
+        self.demo_display = DemoContextDisplay()
+        # Spans for every API call and tool execution
+        self.telemetry = Telemetry()
+        # Queue time and retries of the latest request, added to its span
+        self._queue_stats: Dict[str, Any] = {}
+        if self.blob_store is not None:
+            self.telemetry.add_gauge("blob_store", self.blob_store.stats)
+        # Picks the model tier of each call when config.MODEL_ROUTING is on
+        self.router = ModelRouter() if config.MODEL_ROUTING else None
+        # Tier of the call in progress, added to its span
+        self._tier: Optional[str] = None
+        if self.router is not None:
+            self.telemetry.add_gauge("routing", lambda: {"escalations": self.router.escalations})
+        tool_registry.on_execute = self._record_tool
+
+    @property
+    def client(self) -> Any:
+        """Client for API calls, wrapped in the scheduler and response cache as configured."""
+        if self._client is None:
+            self._client = self._wrap_client(self._new_client())
+        return self._client
+
+    @property
+    def conversation_history(self) -> List[Dict[str, Any]]:
+        """Messages of the conversation so far, resumed from the session log if it has one."""
+        if self._history is None:
+            self._history = self._store_tool_results(self.session_log.load()) if self.session_log is not None else []
+        return self._history
+
+    @conversation_history.setter
+    def conversation_history(self, history: List[Dict[str, Any]]) -> None:
+        self._history = history
+        self._history_digests.reset()
+
+    def _store_tool_results(self, history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Move the large tool results of a loaded history into the blob store."""
+        if self.blob_store is None:
+            return history
+        for message in history:
+            if isinstance(message["content"], str):
+                continue
+            for block in message["content"]:
+                if block.get("type") == "tool_result" and isinstance(block.get("content"), str):
+                    block["content"] = self.blob_store.maybe_put(block["content"])
+        return history
 
-    def run(self, user_message: str) -> None:
+    def _new_client(self) -> Any:
+        """Create the default client."""
+        from core.clients import create_client
+        return create_client()
+
+    def _wrap_client(self, client: Any) -> Any:
+        """Wrap a client in the rate-limit scheduler and response cache, as configured."""
+        # Cache hits never reach the scheduler, so they don't use up rate limits
+        if config.RATE_LIMIT_SCHEDULER:
+            client = self.scheduled_client_class(client, listener=self._record_queue)
+        if config.RESPONSE_CACHE_MODE != PASSTHROUGH:
+            client = self.cached_client_class(client, mode=config.RESPONSE_CACHE_MODE)
+        return client
+
+    def run(self, user_message: str) -> str:
         """
         Run the agent with a user message.
 
@@ -36,74 +144,413 @@ class Agent:
 
         Args:
             user_message: The user's message
+
+        Returns:
+            Text of the final response
         """
-        # Add the user's message to the conversation
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_message
-        })
+        with self.telemetry.span(RUN, "run") as span:
+            span["api_calls"] = self._run(user_message)
+        return self.last_response_text()
+
+    def _run(self, user_message: str) -> int:
+        """
+        Run the ReAct loop for one user message.
+
+        Args:
+            user_message: The user's message
+
+        Returns:
+            Number of API calls made
+        """
+        self._add_user_message(user_message)
+        if self.router is not None:
+            self.router.start_request()
 
         # ReAct loop - keep going until the model stops using tools
+        api_calls = 0
         while True:
-            # Demo mode: Show all context before making the API call
-            if config.DEMO_MODE:
-                show_demo_context(
-                    config.SYSTEM_PROMPT,
+            # Keep the history within its token budget
+            self._compact_history()
+
+            # Demo mode: Show the new context before making the API call
+            if config.DEMO_MODE and self.demo_mode:
+                self.demo_display.show(
+                    self.system_prompt,
                     self.tool_registry.get_tool_schemas(),
                     self.conversation_history
                 )
 
-            # Get response from Claude
-            response = self.client.messages.create(
-                model=config.MODEL,
-                max_tokens=config.MAX_TOKENS,
-                system=config.SYSTEM_PROMPT,
-                tools=self.tool_registry.get_tool_schemas(),
-                messages=self.conversation_history
-            )
-
-            # Render any text content as markdown
-            text_content = [block.text for block in response.content if hasattr(block, 'text')]
-            if text_content:
-                render_agent_response(''.join(text_content))
+            # Get response from Claude, rendering its text as markdown
+            response = self._get_routed_response(api_calls)
+            api_calls += 1
 
             # Add assistant's response to conversation history
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": response.content
-            })
-
-            # Check if there are any tool uses
-            tool_uses = [block for block in response.content if block.type == "tool_use"]
+            tool_uses = self._add_assistant_response(response)
 
             if tool_uses:
-                tool_results = []
-                for block in tool_uses:
-                    result = self.tool_registry.execute_tool(block.name, block.input)
-                    logger.info("Executed tool: \"%s\", results:\n%s", block.name, result)
-
-                    tool_results.append({
-                        "type": "tool_result",
-                        "tool_use_id": block.id,
-                        "content": result
-                    })
+                max_workers = config.MAX_TOOL_WORKERS if config.PARALLEL_TOOL_CALLS else 1
+                results = self.tool_registry.execute_tools(
+                    [(block.id, block.name, block.input) for block in tool_uses],
+                    max_workers=max_workers
+                )
 
                 # Add tool results to the conversation
-                self.conversation_history.append({
-                    "role": "user",
-                    "content": tool_results
-                })
+                self._add_tool_results(tool_uses, results)
                 # Continue loop to get Claude's next response
                 logger.info("Running the model with tool outputs")
 
             else:
                 # No tool uses - we're done
                 logger.info("ReAct loop complete, prompting user")
-                return
+                return api_calls
+
+    def _get_routed_response(self, turn: int) -> Any:
+        """
+        Get the next response, on the model tier the router picks.
+
+        A call that fails for lack of capacity, or is cut off at max_tokens,
+        is retried on the next tier up until the top tier has been tried.
+        Only the response that is kept is reported to the event sink.
+
+        Args:
+            turn: Index of the call within the current user request
+
+        Returns:
+            The complete response message
+        """
+        if self.router is None:
+            return self._get_response(**self._build_request())
+        tier = self.router.choose(turn)
+        while True:
+            self._tier = tier
+            try:
+                response = self._get_response(report=False, **self._build_request(tier))
+            except Exception as e:
+                tier = self._escalate(tier, e)
+                self.events.on_retry(type(e).__name__)
+                continue
+            retry_tier = self.router.should_escalate(tier, response)
+            if retry_tier is None:
+                self.events.on_response(response)
+                return response
+            tier = retry_tier
+            self.events.on_retry("response reached max_tokens")
+
+    def _escalate(self, tier: str, error: Exception) -> str:
+        """
+        Pick the tier to retry a failed call on.
+
+        Args:
+            tier: Tier the call failed on
+            error: Why it failed
+
+        Returns:
+            The next tier up
+
+        Raises:
+            Exception: The error itself, if a larger tier wouldn't avoid it
+                or tier is the top one
+        """
+        next_tier = None
+        if is_api_error(error) and is_capacity_error(error):
+            next_tier = self.router.escalate(tier, str(error))
+        if next_tier is None:
+            raise error
+        return next_tier
+
+    def _build_request(self, tier: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Build the Messages API parameters for the next call.
+
+        Args:
+            tier: Model tier to use (defaults to config.MODEL)
+
+        Returns:
+            Parameters for client.messages.create
+        """
+        history = self.conversation_history
+        params = {
+            "model": config.MODEL,
+            "max_tokens": config.MAX_TOKENS,
+            "system": self.system_prompt,
+            "tools": self.tool_registry.get_tool_schemas(),
+            # Stored tool results (from the blob store or a resumed session) are only read back for the request
+            "messages": rehydrate(history)
+        }
+        if tier is not None:
+            params.update(self.router.params(tier))
+        digest = None
+        if config.RESPONSE_CACHE_MODE != PASSTHROUGH:
+            # Hashed before rehydration: a stored result is identified by its digest, not re-read and re-hashed
+            digest = self._history_digests.digest(history)
+        if config.PROMPT_CACHING:
+            params = apply_cache_breakpoints(params)
+        if digest is not None:
+            params["messages"] = DigestedMessages(params["messages"], digest)
+        return params
+
+    def _add_user_message(self, user_message: str) -> None:
+        """
+        Add the user's message to the history.
+
+        Args:
+            user_message: The user's message
+        """
+        self.conversation_history.append({
+            "role": "user",
+            "content": user_message
+        })
+        self._save_history()
+
+    def _add_assistant_response(self, response: Any) -> List[Any]:
+        """
+        Add the model's response to the history.
+
+        Args:
+            response: Message returned by the API
+
+        Returns:
+            The tool_use blocks in the response (empty if the turn is done)
+        """
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": response.content
+        })
+        self._save_history()
+
+        # Check if there are any tool uses
+        return [block for block in response.content if block.type == "tool_use"]
+
+    def _add_tool_results(self, tool_uses: List[Any], results: List[str]) -> None:
+        """
+        Add the results of a turn's tool calls to the history.
+
+        Args:
+            tool_uses: tool_use blocks from the response
+            results: Tool results, in the same order
+        """
+        tool_results = []
+        for block, result in zip(tool_uses, results):
+            logger.info("Executed tool: \"%s\", results:\n%s", block.name, result)
+            self.events.on_tool_result(block.id, block.name, result)
+
+            tool_results.append({
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "content": self.blob_store.maybe_put(result) if self.blob_store is not None else result
+            })
+
+        self.conversation_history.append({
+            "role": "user",
+            "content": tool_results
+        })
+        self._save_history()
+        if self.router is not None:
+            self.router.record_tool_results([block.name for block in tool_uses], results)
+
+    def _save_history(self) -> None:
+        """Append the messages added since the last save to the session log."""
+        if self.session_log is not None:
+            self.session_log.sync(self.conversation_history)
+
+    def _compact_history(self) -> None:
+        """Compact the conversation history if it is near its token budget."""
+        tool_schemas = self.tool_registry.get_tool_schemas()
+        reserved_tokens = (len(self.system_prompt) + len(json.dumps(tool_schemas))) // CHARS_PER_TOKEN
+        report = self.context_manager.maybe_compact(self.conversation_history, reserved_tokens)
+        if report:
+            self.compaction_reports.append(report)
+            self._history_digests.reset()
+            # Compaction rewrites messages in place, so the log is rewritten to match
+            if self.session_log is not None:
+                self.session_log.checkpoint(self.conversation_history)
+
+    def _summarize_with_model(self, messages: List[Dict[str, Any]]) -> str:
+        """
+        Summarize old messages with the model, for context compaction.
+
+        Args:
+            messages: Messages being compacted away
+
+        Returns:
+            Summary text (falls back to an extractive summary on error)
+        """
+        transcript = summarize_messages(messages)
+        try:
+            response = self.client.messages.create(
+                model=config.MODEL,
+                max_tokens=config.COMPACTION_SUMMARY_MAX_CHARS // CHARS_PER_TOKEN,
+                system=(
+                    "Summarize this coding session transcript for the assistant that will continue it. "
+                    "Keep the user's goals, decisions made, files read or changed, and open tasks."
+                ),
+                messages=[{"role": "user", "content": transcript}]
+            )
+        except Exception as e:
+            logger.warning("Model summary failed, using extractive summary: %s", e)
+            return transcript
+        return ''.join(block.text for block in response.content if hasattr(block, 'text'))
+
+    def _get_response(self, report: bool = True, **params) -> Any:
+        """
+        Call the Messages API, reporting the response to the event sink.
+
+        With config.STREAM_RESPONSES the response is streamed: text is
+        reported as it arrives and the SDK assembles tool_use blocks from
+        their input deltas. Otherwise only the complete response is reported.
+
+        Args:
+            report: Report the complete response (False leaves it to the
+                caller, which may discard it)
+            **params: Parameters for client.messages.create
+
+        Returns:
+            The complete response message
+        """
+        start_time = time.time()
+        start = time.perf_counter()
+        time_to_first_token = None
+
+        try:
+            if config.STREAM_RESPONSES:
+                with self.client.messages.stream(**params) as stream:
+                    for event in stream:
+                        if time_to_first_token is None and event.type in ("content_block_start", "text", "input_json"):
+                            time_to_first_token = time.perf_counter() - start
+                        if event.type == "text":
+                            self.events.on_text(event.text)
+                    response = stream.get_final_message()
+            else:
+                response = self.client.messages.create(**params)
+        except Exception as e:
+            self.events.on_error(e)
+            raise
+
+        self._record_response(response, start_time, time.perf_counter() - start, time_to_first_token)
+        if report:
+            self.events.on_response(response)
+        return response
+
+    def _record_response(
+        self,
+        response: Any,
+        start_time: float,
+        latency: float,
+        time_to_first_token: Optional[float]
+    ) -> None:
+        """
+        Record latency and token usage for one API call.
+
+        Args:
+            response: Message returned by the API
+            start_time: Wall-clock time the request was sent
+            latency: Seconds from request to complete response
+            time_to_first_token: Seconds until the first content arrived,
+                if streamed
+        """
+        usage = response.usage
+        routing = {"tier": self._tier, "cost_usd": self.router.cost(self._tier, usage)} if self.router is not None else {}
+        self.telemetry.record(
+            API_CALL,
+            response.model,
+            start_time,
+            latency,
+            time_to_first_token=time_to_first_token,
+            stop_reason=response.stop_reason,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            cache_read_input_tokens=usage.cache_read_input_tokens or 0,
+            cache_creation_input_tokens=usage.cache_creation_input_tokens or 0,
+            **self._queue_stats,
+            **routing
+        )
+        self._queue_stats = {}
+        logger.info(
+            "Tokens: %d input, %d cache read, %d cache write, %d output",
+            usage.input_tokens,
+            usage.cache_read_input_tokens or 0,
+            usage.cache_creation_input_tokens or 0,
+            usage.output_tokens
+        )
+        if time_to_first_token is not None:
+            logger.info("Time to first token: %.3fs, total: %.3fs", time_to_first_token, latency)
+
+    def _record_queue(self, queue_seconds: float, retries: int) -> None:
+        """
+        Note the scheduling of the latest request (the scheduler's listener).
+
+        Args:
+            queue_seconds: Seconds the request waited for rate limits,
+                concurrency and backoff
+            retries: Times the request was retried
+        """
+        self._queue_stats = {"queue_seconds": queue_seconds, "retries": retries}
+
+    def _record_tool(self, name: str, start_time: float, duration: float, result: str, cached: bool) -> None:
+        """
+        Record one tool execution (the tool registry's on_execute listener).
+
+        Args:
+            name: Tool name
+            start_time: Wall-clock time the tool started
+            duration: Seconds the tool took
+            result: Tool result
+            cached: Whether the result came from the memo
+        """
+        self.telemetry.record(
+            TOOL,
+            name,
+            start_time,
+            duration,
+            result_bytes=len(result.encode("utf-8")),
+            cached=cached,
+            error=result.startswith("Error")
+        )
+
+    def last_response_text(self) -> str:
+        """
+        Get the text of the most recent assistant message.
+
+        Returns:
+            Concatenated text blocks (empty if there is no response yet)
+        """
+        for message in reversed(self.conversation_history):
+            if message["role"] == "assistant":
+                content = message["content"]
+                if isinstance(content, str):
+                    return content
+                # Resumed histories hold dicts rather than SDK blocks
+                return ''.join(block_field(block, "text") for block in content if block_field(block, "type") == "text")
+        return ""
+
+    @property
+    def turn_stats(self) -> List[Dict[str, Any]]:
+        """Measurements for every API call so far (latency, time to first token, token usage)."""
+        return self.telemetry.spans(API_CALL)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Summarize prompt cache usage over all API calls so far.
+
+        Returns:
+            Token totals and the fraction of input tokens read from cache
+        """
+        totals = {
+            key: sum(stats[key] for stats in self.turn_stats)
+            for key in ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+        }
+        total_input = sum(totals.values())
+        totals["hit_rate"] = totals["cache_read_input_tokens"] / total_input if total_input else 0.0
+        return totals
 
     def clear_history(self) -> None:
-        """Clear the conversation history."""
+        """Clear the conversation history, starting a new session log if there is one."""
         self.conversation_history = []
+        if self.session_log is not None:
+            self.session_log.close()
+            self.session_log = SessionLog(directory=self.session_log.directory)
+        self.tool_registry.session.clear()
+        self.demo_display.reset()
 
     def get_history(self) -> List[Dict[str, Any]]:
         """
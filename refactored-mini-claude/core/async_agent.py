@@ -0,0 +1,204 @@
+"""Asynchronous agent for serving many sessions from one process."""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from typing import Any, Optional
+import config
+from tools.registry import ToolRegistry
+from core.agent import Agent
+from core.clients import get_async_client
+from core.context import ContextManager
+from core.telemetry import RUN
+from core.response_cache import AsyncCachedClient
+from core.scheduler import AsyncScheduledClient
+from core.session_store import SessionLog
+from core.events import EventSink
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAgent(Agent):
+    """
+    Coding agent with the same ReAct loop as Agent, built on AsyncAnthropic.
+
+    API calls and tool execution are awaited, so one event loop can drive
+    many sessions concurrently. All instances share one pooled HTTP client
+    unless another client is passed in.
+
+    Differences from Agent:
+    - Demo mode is skipped, since waiting on input() would block the loop
+    - Context compaction always uses the extractive summary
+    """
+
+    cached_client_class = AsyncCachedClient
+    scheduled_client_class = AsyncScheduledClient
+
+    def __init__(
+        self,
+        tool_registry: ToolRegistry,
+        client: Optional[Any] = None,
+        executor: Optional[Executor] = None,
+        events: Optional[EventSink] = None,
+        session_log: Optional[SessionLog] = None
+    ):
+        """
+        Initialize the agent.
+
+        Args:
+            tool_registry: Registry of available tools
+            client: AsyncAnthropic client (defaults to the shared client,
+                fetched on the first API call)
+            executor: Executor for blocking tools (defaults to the event
+                loop's default thread pool)
+            events: Where streamed text, responses and tool results are
+                reported (defaults to rendering them on the console)
+            session_log: Log the history is saved to as it grows (defaults
+                to not saving it)
+        """
+        super().__init__(tool_registry, client, events, session_log)
+        self.executor = executor
+        self.context_manager = ContextManager(on_discard=tool_registry.session.forget_results)
+        # A session handles one user message at a time
+        self._lock = asyncio.Lock()
+
+    def _new_client(self) -> Any:
+        """Use the shared async client."""
+        return get_async_client()
+
+    @property
+    def busy(self) -> bool:
+        """True while a user message is being handled."""
+        return self._lock.locked()
+
+    async def run(self, user_message: str) -> str:
+        """
+        Run the agent with a user message.
+
+        This implements the ReAct (Reason, Act, Observe) loop:
+        1. Send message to Claude
+        2. If Claude wants to use a tool, execute it and continue
+        3. Repeat until Claude gives a final response
+
+        Args:
+            user_message: The user's message
+
+        Returns:
+            Text of the final response
+        """
+        async with self._lock:
+            with self.telemetry.span(RUN, "run") as span:
+                span["api_calls"] = await self._run(user_message)
+            return self.last_response_text()
+
+    async def _run(self, user_message: str) -> int:
+        """
+        Run the ReAct loop for one user message.
+
+        Args:
+            user_message: The user's message
+
+        Returns:
+            Number of API calls made
+        """
+        self._add_user_message(user_message)
+        if self.router is not None:
+            self.router.start_request()
+
+        # ReAct loop - keep going until the model stops using tools
+        api_calls = 0
+        while True:
+            # Keep the history within its token budget
+            self._compact_history()
+
+            # Get response from Claude, rendering its text as markdown
+            response = await self._get_routed_response(api_calls)
+            api_calls += 1
+
+            # Add assistant's response to conversation history
+            tool_uses = self._add_assistant_response(response)
+
+            if tool_uses:
+                calls = [(block.id, block.name, block.input) for block in tool_uses]
+                if config.PARALLEL_TOOL_CALLS:
+                    results = await self.tool_registry.execute_tools_async(calls, self.executor)
+                else:
+                    results = [
+                        await self.tool_registry.execute_tool_async(name, tool_input, tool_use_id, self.executor)
+                        for tool_use_id, name, tool_input in calls
+                    ]
+
+                # Add tool results to the conversation
+                self._add_tool_results(tool_uses, results)
+                logger.info("Running the model with tool outputs")
+
+            else:
+                # No tool uses - we're done
+                logger.info("ReAct loop complete")
+                return api_calls
+
+    async def _get_routed_response(self, turn: int) -> Any:
+        """
+        Get the next response, on the model tier the router picks.
+
+        Args:
+            turn: Index of the call within the current user request
+
+        Returns:
+            The complete response message
+        """
+        if self.router is None:
+            return await self._get_response(**self._build_request())
+        tier = self.router.choose(turn)
+        while True:
+            self._tier = tier
+            try:
+                response = await self._get_response(report=False, **self._build_request(tier))
+            except Exception as e:
+                tier = self._escalate(tier, e)
+                self.events.on_retry(type(e).__name__)
+                continue
+            retry_tier = self.router.should_escalate(tier, response)
+            if retry_tier is None:
+                self.events.on_response(response)
+                return response
+            tier = retry_tier
+            self.events.on_retry("response reached max_tokens")
+
+    async def _get_response(self, report: bool = True, **params) -> Any:
+        """
+        Call the Messages API, reporting the response to the event sink.
+
+        Args:
+            report: Report the complete response (False leaves it to the
+                caller, which may discard it)
+            **params: Parameters for client.messages.create
+
+        Returns:
+            The complete response message
+        """
+        start_time = time.time()
+        start = time.perf_counter()
+        time_to_first_token = None
+
+        try:
+            if config.STREAM_RESPONSES:
+                async with self.client.messages.stream(**params) as stream:
+                    async for event in stream:
+                        if time_to_first_token is None and event.type in ("content_block_start", "text", "input_json"):
+                            time_to_first_token = time.perf_counter() - start
+                        if event.type == "text":
+                            self.events.on_text(event.text)
+                    response = await stream.get_final_message()
+            else:
+                response = await self.client.messages.create(**params)
+        except Exception as e:
+            self.events.on_error(e)
+            raise
+
+        self._record_response(response, start_time, time.perf_counter() - start, time_to_first_token)
+        if report:
+            self.events.on_response(response)
+        return response
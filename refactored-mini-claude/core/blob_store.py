@@ -0,0 +1,241 @@
+"""Content-addressed store for large tool results.
+
+A long session reads the same large files again and again, and every result
+stays in the conversation history. Tool results of at least
+config.BLOB_STORE_MIN_CHARS characters are kept here instead, and the
+history holds a BlobRef handle. Results are put back into a request only
+when its payload is built, and that copy is dropped once it is sent.
+
+Blobs live in a memory LRU bounded by config.BLOB_STORE_MEMORY_BYTES. Blobs
+evicted from it are written to disk (config.BLOB_STORE_DIR, or a temporary
+directory removed at exit), so a handle never dangles. Identical results are
+stored once however often they are returned.
+
+One store is shared per process (get_blob_store()).
+"""
+
+import atexit
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import config
+
+
+logger = logging.getLogger(__name__)
+
+
+class BlobRef:
+    """Handle to a stored tool result, held in the history in place of its text."""
+
+    __slots__ = ("store", "digest", "length")
+
+    def __init__(self, store: "BlobStore", digest: str, length: int):
+        """
+        Args:
+            store: Store holding the blob
+            digest: SHA-256 of the UTF-8 text
+            length: Length of the text in characters
+        """
+        self.store = store
+        self.digest = digest
+        self.length = length
+
+    def text(self) -> str:
+        """Read the text back from the store."""
+        return self.store.get(self.digest)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __repr__(self) -> str:
+        return f"BlobRef({self.digest[:12]}, {self.length} chars)"
+
+
+class BlobStore:
+    """Memory LRU of blobs by hash, spilling to disk. Safe to use from several threads."""
+
+    def __init__(
+        self,
+        memory_bytes: int = config.BLOB_STORE_MEMORY_BYTES,
+        directory: Optional[str] = config.BLOB_STORE_DIR,
+        min_chars: int = config.BLOB_STORE_MIN_CHARS
+    ):
+        """
+        Initialize an empty store.
+
+        Args:
+            memory_bytes: Most bytes of blobs kept in memory
+            directory: Directory blobs evicted from memory are written to
+                (None = a temporary directory, created on first use)
+            min_chars: Shorter results are left in the history
+        """
+        self.memory_bytes = memory_bytes
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.min_chars = min_chars
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_used = 0
+        self._disk: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {"puts": 0, "deduplicated": 0, "memory_hits": 0, "disk_reads": 0, "evictions": 0}
+
+    def put(self, text: str) -> BlobRef:
+        """
+        Store text.
+
+        Args:
+            text: Tool result
+
+        Returns:
+            Handle to the stored text
+        """
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._stats["puts"] += 1
+            if digest in self._memory:
+                self._memory.move_to_end(digest)
+                self._stats["deduplicated"] += 1
+            elif digest in self._disk:
+                self._stats["deduplicated"] += 1
+            else:
+                self._remember(digest, data)
+        return BlobRef(self, digest, len(text))
+
+    def maybe_put(self, text: str) -> Any:
+        """
+        Store text if it is long enough to be worth a handle.
+
+        Args:
+            text: Tool result
+
+        Returns:
+            A handle, or the text itself if it is short
+        """
+        if len(text) < self.min_chars:
+            return text
+        return self.put(text)
+
+    def get(self, digest: str) -> str:
+        """
+        Read a blob.
+
+        Args:
+            digest: Blob hash
+
+        Returns:
+            The stored text
+
+        Raises:
+            KeyError: If the blob was never stored
+        """
+        with self._lock:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                self._stats["memory_hits"] += 1
+                return data.decode("utf-8")
+            if digest not in self._disk:
+                raise KeyError(digest)
+            self._stats["disk_reads"] += 1
+            path = self._path(digest)
+        # Blobs on disk are immutable, so they can be read without the lock
+        with open(path, "rb") as f:
+            data = f.read()
+        with self._lock:
+            if digest not in self._memory:
+                self._remember(digest, data)
+        return data.decode("utf-8")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report the store's size and activity.
+
+        Returns:
+            Blobs and bytes in memory and on disk, and operation counts
+        """
+        with self._lock:
+            return {
+                "memory_blobs": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "disk_blobs": len(self._disk),
+                "disk_bytes": sum(self._disk.values()),
+                **self._stats
+            }
+
+    def _remember(self, digest: str, data: bytes) -> None:
+        """Add a blob to the memory LRU, spilling the least recently used. Must hold the lock."""
+        self._memory[digest] = data
+        self._memory_used += len(data)
+        while self._memory_used > self.memory_bytes:
+            old_digest, old_data = self._memory.popitem(last=False)
+            self._memory_used -= len(old_data)
+            self._stats["evictions"] += 1
+            if old_digest not in self._disk:
+                self._write(old_digest, old_data)
+
+    def _write(self, digest: str, data: bytes) -> None:
+        """Write an evicted blob to disk. Must hold the lock."""
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        self._disk[digest] = len(data)
+
+    def _path(self, digest: str) -> str:
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix="mini-claude-blobs-")
+            atexit.register(shutil.rmtree, self.directory, True)
+        return os.path.join(self.directory, digest[:2], digest)
+
+
+def rehydrate(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Put stored tool results back into messages, for a request payload.
+
+    Only messages holding handles are copied; the history keeps its handles.
+
+    Args:
+        messages: Conversation history
+
+    Returns:
+        Shallow copy of the messages with every BlobRef replaced by its text
+    """
+    loaded = list(messages)
+    for index, message in enumerate(loaded):
+        content = message["content"]
+        if isinstance(content, str) or not any(
+            isinstance(block, dict) and isinstance(block.get("content"), BlobRef) for block in content
+        ):
+            continue
+        loaded[index] = {**message, "content": [
+            {**block, "content": block["content"].text()}
+            if isinstance(block, dict) and isinstance(block.get("content"), BlobRef) else block
+            for block in content
+        ]}
+    return loaded
+
+
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """
+    Get the process-wide blob store, creating it on first use.
+
+    Returns:
+        Shared store
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BlobStore()
+        return _store
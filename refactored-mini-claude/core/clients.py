@@ -0,0 +1,66 @@
+"""Anthropic API clients.
+
+Each client owns an HTTP connection pool. Agents that share a process should
+share a client, so sessions reuse warm connections instead of each opening
+their own.
+
+Importing the SDK takes most of the agent's startup time, so it is only
+imported here, when the first client is created. preload_sdk() starts that
+import in the background while the user is still typing.
+"""
+
+import importlib
+import sys
+import threading
+from typing import Any, Optional
+
+
+_lock = threading.Lock()
+_async_client: Optional[Any] = None
+
+
+def create_client() -> Any:
+    """
+    Create a synchronous Anthropic client.
+
+    Returns:
+        New Anthropic client
+    """
+    from anthropic import Anthropic
+    return Anthropic()
+
+
+def get_async_client() -> Any:
+    """
+    Get the process-wide AsyncAnthropic client, creating it on first use.
+
+    Returns:
+        Shared async client
+    """
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            from anthropic import AsyncAnthropic
+            _async_client = AsyncAnthropic()
+        return _async_client
+
+
+def preload_sdk() -> None:
+    """Import the SDK on a background thread, so the first API call doesn't wait for it."""
+    threading.Thread(target=importlib.import_module, args=("anthropic",), name="preload-sdk", daemon=True).start()
+
+
+def is_api_error(error: BaseException) -> bool:
+    """
+    Check whether an exception is an error from the Anthropic API.
+
+    Doesn't import the SDK: if it isn't loaded, no API call can have failed.
+
+    Args:
+        error: The exception
+
+    Returns:
+        True for anthropic.APIError and its subclasses
+    """
+    anthropic = sys.modules.get("anthropic")
+    return anthropic is not None and isinstance(error, anthropic.APIError)
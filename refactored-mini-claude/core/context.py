@@ -0,0 +1,317 @@
+"""Token-budgeted compaction of the conversation history.
+
+Every message stays in the history and is resent on each API call, so a
+session slows down and eventually overflows the context window. When the
+history nears its token budget the ContextManager compacts it in two stages:
+
+1. Shrink stale tool results - old tool_result payloads (usually whole files)
+   are cut down to a short preview.
+2. Summarize older turns - if that is not enough, the oldest messages are
+   replaced with a single summary message.
+
+Compaction only ever cuts the history right before an assistant message, so
+every kept tool_result still follows the tool_use it answers.
+"""
+
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional
+import config
+from core.blob_store import BlobRef
+
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used for estimates
+CHARS_PER_TOKEN = 4
+
+SUMMARY_HEADER = "[Summary of the earlier conversation]"
+
+
+def block_field(block: Any, name: str, default: Any = None) -> Any:
+    """
+    Read a field from a content block.
+
+    The history holds both plain dicts and SDK content block objects.
+
+    Args:
+        block: Content block (dict or SDK object)
+        name: Field name
+        default: Value returned if the field is missing
+
+    Returns:
+        Field value
+    """
+    if isinstance(block, dict):
+        return block.get(name, default)
+    return getattr(block, name, default)
+
+
+def content_text(content: Any) -> str:
+    """
+    Flatten message or tool_result content to plain text.
+
+    Args:
+        content: String or list of content blocks
+
+    Returns:
+        Text representation of the content
+    """
+    if isinstance(content, str):
+        return content
+    if isinstance(content, BlobRef):
+        return content.text()
+    parts = []
+    for block in content or []:
+        block_type = block_field(block, "type")
+        if block_type == "text":
+            parts.append(block_field(block, "text", ""))
+        elif block_type == "tool_use":
+            parts.append(json.dumps(block_field(block, "input", {})))
+        elif block_type == "tool_result":
+            parts.append(content_text(block_field(block, "content", "")))
+    return "\n".join(parts)
+
+
+def content_length(content: Any) -> int:
+    """
+    Length of content_text(content), without reading stored tool results.
+
+    Args:
+        content: String, BlobRef or list of content blocks
+
+    Returns:
+        Length in characters
+    """
+    if isinstance(content, (str, BlobRef)):
+        return len(content)
+    length = 0
+    for block in content or []:
+        block_type = block_field(block, "type")
+        if block_type == "text":
+            length += len(block_field(block, "text", ""))
+        elif block_type == "tool_use":
+            length += len(json.dumps(block_field(block, "input", {})))
+        elif block_type == "tool_result":
+            length += content_length(block_field(block, "content", ""))
+        else:
+            continue
+        length += 1
+    return max(length - 1, 0)
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """
+    Estimate the token count of a list of messages.
+
+    Args:
+        messages: Conversation messages
+
+    Returns:
+        Approximate number of tokens
+    """
+    return sum(content_length(message["content"]) for message in messages) // CHARS_PER_TOKEN
+
+
+def summarize_messages(messages: List[Dict[str, Any]]) -> str:
+    """
+    Build an extractive summary of messages without calling the model.
+
+    Args:
+        messages: Messages being compacted away
+
+    Returns:
+        Summary text listing requests, replies and tool calls
+    """
+    limit = config.COMPACTION_SUMMARY_LINE_CHARS
+    lines = []
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            if content.startswith(SUMMARY_HEADER):
+                # Carry an earlier summary forward
+                lines.append(content[len(SUMMARY_HEADER):].strip())
+            else:
+                lines.append(f"{message['role'].capitalize()}: {_clip(content, limit)}")
+            continue
+        for block in content:
+            block_type = block_field(block, "type")
+            if block_type == "text":
+                lines.append(f"{message['role'].capitalize()}: {_clip(block_field(block, 'text', ''), limit)}")
+            elif block_type == "tool_use":
+                arguments = json.dumps(block_field(block, "input", {}))
+                lines.append(f"- Called {block_field(block, 'name')}({_clip(arguments, limit)})")
+            elif block_type == "tool_result":
+                result = content_text(block_field(block, "content", ""))
+                lines.append(f"  -> {_clip(result, limit // 3)}")
+
+    summary = "\n".join(line for line in lines if line)
+    if len(summary) > config.COMPACTION_SUMMARY_MAX_CHARS:
+        # Keep the most recent part of the summary
+        summary = "...\n" + summary[-config.COMPACTION_SUMMARY_MAX_CHARS:]
+    return summary
+
+
+def _clip(text: str, limit: int) -> str:
+    """Collapse whitespace and cut text to at most limit characters."""
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[:limit] + "..."
+
+
+class ContextManager:
+    """Keeps the conversation history within a token budget."""
+
+    def __init__(
+        self,
+        token_budget: int = config.CONTEXT_TOKEN_BUDGET,
+        threshold: float = config.COMPACTION_THRESHOLD,
+        target: float = config.COMPACTION_TARGET,
+        keep_recent_tool_results: int = config.COMPACTION_KEEP_RECENT_TOOL_RESULTS,
+        summarizer: Optional[Callable[[List[Dict[str, Any]]], str]] = None,
+        on_discard: Optional[Callable[[List[str]], None]] = None
+    ):
+        """
+        Initialize the context manager.
+
+        Args:
+            token_budget: Maximum tokens the history may use
+            threshold: Fraction of the budget at which compaction starts
+            target: Fraction of the budget compaction tries to get down to
+            keep_recent_tool_results: Number of most recent tool results
+                that are never shrunk
+            summarizer: Function turning old messages into summary text
+                (defaults to an extractive summary)
+            on_discard: Called with the tool_use_ids whose results were
+                shrunk or summarized away
+        """
+        self.token_budget = token_budget
+        self.threshold = threshold
+        self.target = target
+        self.keep_recent_tool_results = keep_recent_tool_results
+        self.summarizer = summarizer or summarize_messages
+        self.on_discard = on_discard
+
+    def maybe_compact(self, messages: List[Dict[str, Any]], reserved_tokens: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        Compact the history in place if it is close to the budget.
+
+        Args:
+            messages: Conversation history (modified in place)
+            reserved_tokens: Tokens used by the rest of the request
+                (system prompt, tool schemas)
+
+        Returns:
+            Compaction report, or None if no compaction was needed
+        """
+        tokens_before = estimate_tokens(messages) + reserved_tokens
+        if tokens_before < self.token_budget * self.threshold:
+            return None
+
+        target_tokens = int(self.token_budget * self.target) - reserved_tokens
+        report = {
+            "tokens_before": tokens_before,
+            "tool_results_shrunk": self._shrink_tool_results(messages),
+            "messages_summarized": 0
+        }
+        if estimate_tokens(messages) > target_tokens:
+            report["messages_summarized"] = self._summarize_old_turns(messages, target_tokens)
+
+        report["tokens_after"] = estimate_tokens(messages) + reserved_tokens
+        report["tokens_saved"] = tokens_before - report["tokens_after"]
+        logger.info(
+            "Compacted context: %d -> %d tokens (saved %d; %d tool results shrunk, %d messages summarized)",
+            report["tokens_before"],
+            report["tokens_after"],
+            report["tokens_saved"],
+            report["tool_results_shrunk"],
+            report["messages_summarized"]
+        )
+        return report
+
+    def _shrink_tool_results(self, messages: List[Dict[str, Any]]) -> int:
+        """
+        Replace stale tool_result payloads with a short preview.
+
+        Args:
+            messages: Conversation history (modified in place)
+
+        Returns:
+            Number of tool results shrunk
+        """
+        preview_chars = config.COMPACTION_TOOL_RESULT_PREVIEW_CHARS
+        seen = 0
+        shrunk_ids = []
+        for index in range(len(messages) - 1, -1, -1):
+            message = messages[index]
+            if message["role"] != "user" or isinstance(message["content"], str):
+                continue
+
+            new_content = []
+            changed = False
+            for block in reversed(message["content"]):
+                if block_field(block, "type") == "tool_result":
+                    seen += 1
+                    length = content_length(block_field(block, "content", ""))
+                    if seen > self.keep_recent_tool_results and length > 2 * preview_chars:
+                        text = content_text(block_field(block, "content", ""))
+                        block = {
+                            "type": "tool_result",
+                            "tool_use_id": block_field(block, "tool_use_id"),
+                            "content": (
+                                f"{text[:preview_chars]}\n[... {len(text) - preview_chars} characters of this "
+                                "stale tool result were removed to save context; run the tool again if needed]"
+                            )
+                        }
+                        changed = True
+                        shrunk_ids.append(block["tool_use_id"])
+                new_content.append(block)
+
+            if changed:
+                messages[index] = {**message, "content": list(reversed(new_content))}
+
+        if shrunk_ids and self.on_discard:
+            self.on_discard(shrunk_ids)
+        return len(shrunk_ids)
+
+    def _summarize_old_turns(self, messages: List[Dict[str, Any]], target_tokens: int) -> int:
+        """
+        Replace the oldest messages with a summary message.
+
+        The history is cut right before an assistant message and a user
+        message holding the summary takes the place of everything before
+        it, so the user/assistant alternation and tool_use/tool_result
+        pairing stay valid.
+
+        Args:
+            messages: Conversation history (modified in place)
+            target_tokens: Token count to get the history under
+
+        Returns:
+            Number of messages replaced by the summary
+        """
+        # Never cut the final assistant message; it may be mid tool use
+        cut_points = [i for i, message in enumerate(messages[:-1]) if i > 0 and message["role"] == "assistant"]
+        if not cut_points:
+            return 0
+
+        summary_allowance = config.COMPACTION_SUMMARY_MAX_CHARS // CHARS_PER_TOKEN
+        cut = cut_points[-1]
+        for candidate in cut_points:
+            if estimate_tokens(messages[candidate:]) + summary_allowance <= target_tokens:
+                cut = candidate
+                break
+
+        summary = self.summarizer(messages[:cut])
+        discarded_ids = [
+            block_field(block, "tool_use_id")
+            for message in messages[:cut]
+            if not isinstance(message["content"], str)
+            for block in message["content"]
+            if block_field(block, "type") == "tool_result"
+        ]
+        messages[:cut] = [{"role": "user", "content": f"{SUMMARY_HEADER}\n{summary}"}]
+        if discarded_ids and self.on_discard:
+            self.on_discard(discarded_ids)
+        return cut
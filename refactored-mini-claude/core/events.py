@@ -0,0 +1,96 @@
+"""Event sinks: where an agent reports what it is doing.
+
+The agent doesn't print anything itself. It reports streamed text, complete
+responses and tool results to an EventSink; the terminal uses the console
+sink in core/ui.py, the server forwards events to its clients.
+"""
+
+from typing import Any, Dict, Optional
+
+
+class EventSink:
+    """Receives agent events. The base class ignores them all."""
+
+    def on_text(self, text: str) -> None:
+        """
+        Called with each chunk of response text as it streams in.
+
+        Args:
+            text: Text delta
+        """
+
+    def on_response(self, response: Any) -> None:
+        """
+        Called when a complete response has arrived.
+
+        Args:
+            response: Message returned by the API (text and tool_use blocks)
+        """
+
+    def on_tool_result(self, tool_use_id: str, name: str, result: str) -> None:
+        """
+        Called after a tool has run.
+
+        Args:
+            tool_use_id: Id of the tool_use block
+            name: Tool name
+            result: Tool result
+        """
+
+    def on_error(self, error: BaseException) -> None:
+        """
+        Called when an API call fails, before the error propagates.
+
+        Args:
+            error: The exception
+        """
+
+    def on_retry(self, reason: str) -> None:
+        """
+        Called when an attempt is discarded and the call is made again on a
+        larger model. Text already streamed for the attempt is superseded;
+        its response was never reported.
+
+        Args:
+            reason: Why the attempt was discarded
+        """
+
+
+class QueueSink(EventSink):
+    """
+    Turns events into plain dicts on an asyncio queue.
+
+    Must be used from the event loop's thread, as AsyncAgent does. Errors
+    are not queued; whoever awaits the run sees them raised.
+    """
+
+    def __init__(self, queue: Optional["asyncio.Queue[Dict[str, Any]]"] = None):
+        """
+        Initialize the sink.
+
+        Args:
+            queue: Queue to put events on (defaults to a new queue)
+        """
+        if queue is None:
+            import asyncio
+            queue = asyncio.Queue()
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = queue
+
+    def on_text(self, text: str) -> None:
+        self.queue.put_nowait({"type": "text", "text": text})
+
+    def on_response(self, response: Any) -> None:
+        for block in response.content:
+            if block.type == "tool_use":
+                self.queue.put_nowait({"type": "tool_call", "id": block.id, "name": block.name, "input": block.input})
+        self.queue.put_nowait({
+            "type": "response",
+            "text": ''.join(block.text for block in response.content if hasattr(block, 'text')),
+            "stop_reason": response.stop_reason
+        })
+
+    def on_tool_result(self, tool_use_id: str, name: str, result: str) -> None:
+        self.queue.put_nowait({"type": "tool_result", "id": tool_use_id, "name": name, "result": result})
+
+    def on_retry(self, reason: str) -> None:
+        self.queue.put_nowait({"type": "retry", "reason": reason})
@@ -0,0 +1,106 @@
+"""Prompt caching breakpoints for Messages API requests.
+
+Every ReAct iteration resends the system prompt, the tool schemas and the
+whole conversation so far. Marking cache breakpoints lets the API reuse the
+already-processed prefix instead of billing it as new input each time.
+"""
+
+from typing import Any, Dict, List, Union
+
+# Marker added to a content block to end a cacheable prefix there
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Rolling breakpoints in the conversation (the API allows 4 in total,
+# and the system prompt and tools use the other two)
+HISTORY_BREAKPOINTS = 2
+
+
+def apply_cache_breakpoints(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add cache breakpoints to request parameters.
+
+    Breakpoints go on the system prompt, the last tool schema and the last
+    HISTORY_BREAKPOINTS user messages. The breakpoint on the previous user
+    message matches where the last request ended, so each call reads the
+    prefix cached by the one before it. The stored conversation is never
+    modified; only the blocks that carry a breakpoint are copied.
+
+    Args:
+        params: Parameters for client.messages.create
+
+    Returns:
+        New parameters with cache_control breakpoints
+    """
+    cached = dict(params)
+    if params.get("system"):
+        cached["system"] = cached_system(params["system"])
+    if params.get("tools"):
+        cached["tools"] = cached_tools(params["tools"])
+    if params.get("messages"):
+        cached["messages"] = cached_messages(params["messages"])
+    return cached
+
+
+def cached_system(system: Union[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Convert a system prompt to text blocks ending in a cache breakpoint.
+
+    Args:
+        system: System prompt string or list of text blocks
+
+    Returns:
+        List of system text blocks
+    """
+    if isinstance(system, str):
+        return [{"type": "text", "text": system, "cache_control": CACHE_CONTROL}]
+    return _with_breakpoint_on_last(system)
+
+
+def cached_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Add a cache breakpoint after the last tool schema.
+
+    Args:
+        tools: Tool schemas in Anthropic API format
+
+    Returns:
+        Tool schemas with the last one marked for caching
+    """
+    return _with_breakpoint_on_last(tools)
+
+
+def cached_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Add rolling cache breakpoints to the most recent user messages.
+
+    Args:
+        messages: Conversation history
+
+    Returns:
+        Shallow copy of the conversation with breakpoints added
+    """
+    cached = list(messages)
+    remaining = HISTORY_BREAKPOINTS
+    for i in range(len(cached) - 1, -1, -1):
+        if remaining == 0:
+            break
+        message = cached[i]
+        if message.get("role") != "user" or not message.get("content"):
+            continue
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        cached[i] = {**message, "content": _with_breakpoint_on_last(content)}
+        remaining -= 1
+    return cached
+
+
+def _with_breakpoint_on_last(blocks: List[Any]) -> List[Any]:
+    """Copy a list of blocks, adding cache_control to the last one."""
+    if not blocks:
+        return blocks
+    last = blocks[-1]
+    if hasattr(last, "model_dump"):
+        # SDK content block objects are converted to plain dicts
+        last = last.model_dump(exclude_none=True)
+    return list(blocks[:-1]) + [{**last, "cache_control": CACHE_CONTROL}]
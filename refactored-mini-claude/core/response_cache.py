@@ -0,0 +1,457 @@
+"""Content-addressed cache of Messages API responses.
+
+Re-running a scripted task sends exactly the same requests, so their
+responses can be replayed from disk instead of paying for the API again.
+Responses are stored under a SHA-256 hash of the request fields that affect
+the output (model, system prompt, tools, messages, max_tokens and sampling
+options). Prompt caching markers on the system prompt and tools are part of
+the request, so record and replay with the same config.PROMPT_CACHING
+setting. The agent hashes its history incrementally (HistoryDigests) and
+passes the digest along with the messages, so a long conversation isn't
+re-hashed on every call.
+
+Modes (config.RESPONSE_CACHE_MODE):
+- "record": serve hits from the cache, call the API on a miss and store it
+- "replay": serve hits from the cache, raise ResponseCacheMiss on a miss
+- "passthrough": always call the API, never read or write the cache
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+import config
+from core.blob_store import BlobRef
+
+if TYPE_CHECKING:
+    from anthropic.types import Message
+
+
+logger = logging.getLogger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+PASSTHROUGH = "passthrough"
+
+# Request fields that determine the response
+KEY_FIELDS = ("model", "system", "tools", "messages", "max_tokens", "temperature", "top_p", "top_k", "stop_sequences", "tool_choice")
+
+
+class ResponseCacheMiss(Exception):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+def _encode(value: Any) -> bytes:
+    """Canonical JSON of request data, dumping SDK objects to plain data and stored tool results to their hash."""
+    return json.dumps(
+        value,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=_plain
+    ).encode("utf-8")
+
+
+def _plain(obj: Any) -> Any:
+    if isinstance(obj, BlobRef):
+        # Content-addressed already: the digest identifies the text without reading it
+        return {"blob_sha256": obj.digest}
+    return obj.model_dump(exclude_none=True)
+
+
+class HistoryDigests:
+    """
+    SHA-256 digests of one conversation's messages, by position.
+
+    A history only grows between compactions, so a message hashed for one
+    request is the same when the next request resends it, and hashing a
+    request costs only the new messages. Only the 32-byte digests are kept,
+    never the messages. The owner calls reset() whenever it rewrites the
+    history (compaction, resume, clear).
+    """
+
+    def __init__(self):
+        self._digests: List[bytes] = []
+
+    def digest(self, messages: List[Any]) -> bytes:
+        """
+        Get the concatenated digests of a history.
+
+        Args:
+            messages: The conversation history, before stored tool results
+                are put back into it
+
+        Returns:
+            32 bytes per message
+        """
+        if len(messages) < len(self._digests):
+            self.reset()
+        for message in messages[len(self._digests):]:
+            self._digests.append(hashlib.sha256(_encode(message)).digest())
+        return b"".join(self._digests)
+
+    def reset(self) -> None:
+        """Forget the digests; the next request hashes the whole history."""
+        self._digests = []
+
+
+class DigestedMessages(list):
+    """Request messages that carry the HistoryDigests digest of the history they came from."""
+
+    def __init__(self, messages: List[Any], digest: bytes):
+        super().__init__(messages)
+        self.digest = digest
+
+
+def cache_key(params: Dict[str, Any]) -> str:
+    """
+    Get the content hash of a request.
+
+    Args:
+        params: Parameters for client.messages.create
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    key = hashlib.sha256()
+    for name in KEY_FIELDS:
+        if name in params:
+            value = params[name]
+            part = value.digest if isinstance(value, DigestedMessages) else _encode(value)
+            key.update(f"{name}:{len(part)}:".encode("utf-8"))
+            key.update(part)
+    return key.hexdigest()
+
+
+class ResponseCache:
+    """
+    Responses stored one JSON file per key, with least-recently-used
+    eviction once the directory exceeds its size limit.
+
+    Recently used responses are also kept in memory, so a hit only costs
+    the hash of the request.
+    """
+
+    def __init__(
+        self,
+        directory: str = config.RESPONSE_CACHE_DIR,
+        max_bytes: int = config.RESPONSE_CACHE_MAX_BYTES,
+        memory_entries: int = 256
+    ):
+        """
+        Initialize the cache, indexing the responses already on disk.
+
+        Args:
+            directory: Where responses are stored
+            max_bytes: Total size of stored responses before the least
+                recently used are deleted
+            memory_entries: Parsed responses kept in memory
+        """
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        # key -> file size, least recently used first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._memory: "OrderedDict[str, Message]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._scan()
+
+    def get(self, key: str) -> Optional["Message"]:
+        """
+        Look up a response.
+
+        Args:
+            key: Request hash from cache_key
+
+        Returns:
+            The stored response, or None
+        """
+        with self._lock:
+            message = self._memory.get(key)
+            if message is not None:
+                self._memory.move_to_end(key)
+                self._index.move_to_end(key)
+                self.hits += 1
+                return message
+            if key not in self._index:
+                self.misses += 1
+                return None
+
+        from anthropic.types import Message
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                message = Message.model_validate_json(f.read())
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            logger.warning("Dropping unreadable cached response %s: %s", key, e)
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self._index.move_to_end(key)
+            self._remember(key, message)
+            self.hits += 1
+        return message
+
+    def put(self, key: str, message: "Message") -> None:
+        """
+        Store a response, evicting old ones if the cache is over its limit.
+
+        Args:
+            key: Request hash from cache_key
+            message: Complete response
+        """
+        data = message.model_dump_json(exclude_none=True).encode("utf-8")
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning("Could not store response in cache: %s", e)
+            return
+
+        with self._lock:
+            self._forget(key)
+            self._index[key] = len(data)
+            self._total_bytes += len(data)
+            self._remember(key, message)
+            while self._total_bytes > self.max_bytes and len(self._index) > 1:
+                oldest = next(iter(self._index))
+                self._forget(oldest)
+                try:
+                    os.remove(self._path(oldest))
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Hits, misses, stored responses and their total size
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._index), "bytes": self._total_bytes}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _remember(self, key: str, message: "Message") -> None:
+        """Keep a parsed response in memory (lock held)."""
+        self._memory[key] = message
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _forget(self, key: str) -> None:
+        """Drop a key from the index and memory (lock held)."""
+        self._total_bytes -= self._index.pop(key, 0)
+        self._memory.pop(key, None)
+
+    def _scan(self) -> None:
+        """Index the responses on disk, oldest use first."""
+        entries = []
+        try:
+            subdirectories = os.scandir(self.directory)
+        except OSError:
+            return
+        with subdirectories:
+            for subdirectory in subdirectories:
+                if not subdirectory.is_dir():
+                    continue
+                with os.scandir(subdirectory.path) as files:
+                    for entry in files:
+                        if entry.name.endswith(".json"):
+                            st = entry.stat()
+                            entries.append((st.st_mtime_ns, entry.name[:-len(".json")], st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(directory: str = config.RESPONSE_CACHE_DIR) -> ResponseCache:
+    """
+    Get the shared cache for a directory, indexing it on first use.
+
+    Args:
+        directory: Cache directory
+
+    Returns:
+        Shared cache
+    """
+    directory = os.path.abspath(os.path.expanduser(directory))
+    with _caches_lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            cache = _caches[directory] = ResponseCache(directory)
+        return cache
+
+
+def _replay_events(message: "Message") -> Iterator[Any]:
+    """Stream events for a cached response: each block whole, in order."""
+    for index, block in enumerate(message.content):
+        yield SimpleNamespace(type="content_block_start", index=index, content_block=block)
+        if block.type == "text":
+            yield SimpleNamespace(type="text", text=block.text, snapshot=block.text)
+        yield SimpleNamespace(type="content_block_stop", index=index, content_block=block)
+    yield SimpleNamespace(type="message_stop", message=message)
+
+
+class _ReplayStream:
+    """Stands in for a MessageStream (sync or async) when the response is cached."""
+
+    def __init__(self, message: "Message"):
+        self._message = message
+
+    def __enter__(self) -> "_ReplayStream":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def __iter__(self) -> Iterator[Any]:
+        return _replay_events(self._message)
+
+    def get_final_message(self) -> "Message":
+        return self._message
+
+
+class _AsyncReplayStream(_ReplayStream):
+
+    async def __aenter__(self) -> "_AsyncReplayStream":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    async def __aiter__(self):
+        for event in _replay_events(self._message):
+            yield event
+
+    async def get_final_message(self) -> "Message":
+        return self._message
+
+
+class _RecordingStream:
+    """Wraps an SDK stream manager and stores the final message when the stream completes."""
+
+    def __init__(self, manager: Any, cache: ResponseCache, key: str):
+        self._manager = manager
+        self._cache = cache
+        self._key = key
+        self._stream = None
+
+    def __enter__(self) -> Any:
+        self._stream = self._manager.__enter__()
+        return self._stream
+
+    def __exit__(self, *exc_info) -> Any:
+        if exc_info[0] is None:
+            self._cache.put(self._key, self._stream.get_final_message())
+        return self._manager.__exit__(*exc_info)
+
+    async def __aenter__(self) -> Any:
+        self._stream = await self._manager.__aenter__()
+        return self._stream
+
+    async def __aexit__(self, *exc_info) -> Any:
+        if exc_info[0] is None:
+            self._cache.put(self._key, await self._stream.get_final_message())
+        return await self._manager.__aexit__(*exc_info)
+
+
+class CachedMessages:
+    """messages resource that consults the response cache before the API."""
+
+    def __init__(self, messages: Any, cache: ResponseCache, mode: str):
+        self._messages = messages
+        self._cache = cache
+        self._mode = mode
+
+    def _lookup(self, params: Dict[str, Any]) -> Tuple[str, Optional["Message"]]:
+        """Hash the request and look it up, enforcing replay mode."""
+        key = cache_key(params)
+        message = self._cache.get(key)
+        if message is None and self._mode == REPLAY:
+            raise ResponseCacheMiss(f"No recorded response for request {key[:16]} (response cache is in replay mode)")
+        return key, message
+
+    def create(self, **params) -> "Message":
+        key, message = self._lookup(params)
+        if message is None:
+            message = self._messages.create(**params)
+            self._cache.put(key, message)
+        return message
+
+    def stream(self, **params) -> Any:
+        key, message = self._lookup(params)
+        if message is not None:
+            return _ReplayStream(message)
+        return _RecordingStream(self._messages.stream(**params), self._cache, key)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._messages, name)
+
+
+class AsyncCachedMessages(CachedMessages):
+    """Async messages resource that consults the response cache before the API."""
+
+    async def create(self, **params) -> "Message":
+        key, message = self._lookup(params)
+        if message is None:
+            message = await self._messages.create(**params)
+            self._cache.put(key, message)
+        return message
+
+    def stream(self, **params) -> Any:
+        key, message = self._lookup(params)
+        if message is not None:
+            return _AsyncReplayStream(message)
+        return _RecordingStream(self._messages.stream(**params), self._cache, key)
+
+
+class CachedClient:
+    """Client wrapper whose messages resource goes through a response cache."""
+
+    messages_class = CachedMessages
+
+    def __init__(self, client: Any, cache: Optional[ResponseCache] = None, mode: str = config.RESPONSE_CACHE_MODE):
+        """
+        Wrap a client.
+
+        Args:
+            client: Anthropic client
+            cache: Response cache (defaults to the shared cache in
+                config.RESPONSE_CACHE_DIR)
+            mode: RECORD or REPLAY
+        """
+        self._client = client
+        self.cache = cache if cache is not None else get_response_cache()
+        self.messages = self.messages_class(client.messages, self.cache, mode)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+class AsyncCachedClient(CachedClient):
+    """Async client wrapper whose messages resource goes through a response cache."""
+
+    messages_class = AsyncCachedMessages
@@ -0,0 +1,229 @@
+"""Per-call model routing.
+
+Most iterations of the ReAct loop are small steps - read the next file, run
+the next search - that a smaller, faster model handles as well as the main
+one. With config.MODEL_ROUTING on, the ModelRouter picks a tier (a model and
+its max_tokens) for every API call:
+
+1. Rules - config.ROUTING_RULES are tried in order and the first whose
+   conditions all hold names the tier. Conditions look at the turn index
+   within the user's request, the tools called in the previous step and
+   whether any failed, and the expected output size (the previous
+   response's output tokens). If no rule matches, config.ROUTING_DEFAULT_TIER
+   is used.
+2. Escalation - if a call fails for lack of capacity (overloaded, a server
+   error, or rate limited after the scheduler's retries) or is cut off at
+   max_tokens, it is retried on the next tier up, and the rest of the
+   request never goes below that tier again. Other errors (bad request,
+   authentication, request too large) would fail the same way on any
+   tier, so they are raised. A discarded attempt's response is never
+   reported to the event sink; EventSink.on_retry tells it to drop any text
+   already streamed.
+
+Tiers are listed cheapest first in config.MODEL_TIERS, with their prices, so
+telemetry can report latency and cost per tier.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+import config
+
+
+logger = logging.getLogger(__name__)
+
+# Cache reads and writes are priced relative to the tier's input price
+CACHE_READ_PRICE_FACTOR = 0.1
+CACHE_WRITE_PRICE_FACTOR = 1.25
+
+
+def is_capacity_error(error: BaseException) -> bool:
+    """
+    Check whether an API error may not happen on another model.
+
+    Args:
+        error: The exception
+
+    Returns:
+        True for 429 (any retries have been made by then), 529 and other 5xx
+    """
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+class ModelRouter:
+    """Chooses the model tier for each API call of one agent."""
+
+    def __init__(
+        self,
+        tiers: Optional[Dict[str, Dict[str, Any]]] = None,
+        rules: Optional[List[Dict[str, Any]]] = None,
+        default_tier: str = config.ROUTING_DEFAULT_TIER
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            tiers: Tier name -> model, max_tokens and prices per million
+                tokens, cheapest first (defaults to config.MODEL_TIERS)
+            rules: Routing rules, tried in order (defaults to
+                config.ROUTING_RULES)
+            default_tier: Tier used when no rule matches
+
+        Raises:
+            ValueError: If a rule or the default names an unknown tier
+        """
+        self.tiers = tiers if tiers is not None else config.MODEL_TIERS
+        self.rules = rules if rules is not None else config.ROUTING_RULES
+        self.default_tier = default_tier
+        self.order = list(self.tiers)
+        for tier in [default_tier] + [rule["tier"] for rule in self.rules]:
+            if tier not in self.tiers:
+                raise ValueError(f"Unknown model tier in routing config: {tier!r}")
+        self.escalations = 0
+        self.start_request()
+
+    def start_request(self) -> None:
+        """Forget the previous user request's state; call before each new request."""
+        # Lowest tier allowed for the rest of the request, raised by escalation
+        self._floor = 0
+        self._last_tools: List[str] = []
+        self._last_tool_error = False
+        self._last_output_tokens = 0
+
+    def choose(self, turn: int) -> str:
+        """
+        Pick the tier for the next call.
+
+        Args:
+            turn: Index of the call within the current user request (0 for
+                the first)
+
+        Returns:
+            Tier name
+        """
+        context = {
+            "turn": turn,
+            "last_tools": self._last_tools,
+            "last_tool_error": self._last_tool_error,
+            "expected_output_tokens": self._last_output_tokens
+        }
+        tier = next((rule["tier"] for rule in self.rules if _matches(rule, context)), self.default_tier)
+        if self.order.index(tier) < self._floor:
+            tier = self.order[self._floor]
+        logger.info("Routing turn %d to the %s tier", turn, tier)
+        return tier
+
+    def params(self, tier: str) -> Dict[str, Any]:
+        """
+        Request parameters for a tier.
+
+        Args:
+            tier: Tier name
+
+        Returns:
+            The model and max_tokens to use
+        """
+        return {"model": self.tiers[tier]["model"], "max_tokens": self.tiers[tier]["max_tokens"]}
+
+    def escalate(self, tier: str, reason: str) -> Optional[str]:
+        """
+        Move up from a tier that failed, for this call and the rest of the request.
+
+        Args:
+            tier: Tier that failed
+            reason: Why, for the log
+
+        Returns:
+            The next tier up, or None if tier is already the top one
+        """
+        index = self.order.index(tier) + 1
+        if index >= len(self.order):
+            return None
+        self._floor = max(self._floor, index)
+        self.escalations += 1
+        logger.info("Escalating from the %s tier to %s: %s", tier, self.order[index], reason)
+        return self.order[index]
+
+    def should_escalate(self, tier: str, response: Any) -> Optional[str]:
+        """
+        Check a response, escalating if it was cut off short of the top tier.
+
+        Args:
+            tier: Tier that produced the response
+            response: Message returned by the API
+
+        Returns:
+            Tier to retry the call on, or None to keep the response
+        """
+        self._last_output_tokens = response.usage.output_tokens
+        if response.stop_reason == "max_tokens":
+            return self.escalate(tier, "response reached max_tokens")
+        return None
+
+    def record_tool_results(self, names: List[str], results: List[str]) -> None:
+        """
+        Note the outcome of the tools called in the latest step.
+
+        Args:
+            names: Tool names, in call order
+            results: Tool results, in the same order
+        """
+        self._last_tools = list(names)
+        self._last_tool_error = any(result.startswith("Error") for result in results)
+
+    def cost(self, tier: str, usage: Any) -> float:
+        """
+        Price a call's token usage at a tier's rates.
+
+        Args:
+            tier: Tier name
+            usage: Usage from the response
+
+        Returns:
+            Cost in US dollars
+        """
+        prices = self.tiers[tier]
+        input_price = prices["input_cost_per_mtok"]
+        return (
+            usage.input_tokens * input_price
+            + (usage.cache_read_input_tokens or 0) * input_price * CACHE_READ_PRICE_FACTOR
+            + (usage.cache_creation_input_tokens or 0) * input_price * CACHE_WRITE_PRICE_FACTOR
+            + usage.output_tokens * prices["output_cost_per_mtok"]
+        ) / 1_000_000
+
+
+def _matches(rule: Dict[str, Any], context: Dict[str, Any]) -> bool:
+    """
+    Check a routing rule's conditions against the current state.
+
+    Conditions (all optional, all must hold):
+        turn: The turn index equals this
+        min_turn: The turn index is at least this
+        last_tool_error: Whether a tool in the previous step failed
+        last_tools_within: Every tool called in the previous step is in
+            this list (and at least one was called)
+        max_expected_output_tokens: The expected output is at most this
+        min_expected_output_tokens: The expected output is at least this
+
+    Args:
+        rule: Rule from config.ROUTING_RULES
+        context: Current turn, last tools and outcome, expected output
+
+    Returns:
+        True if every condition holds
+    """
+    if "turn" in rule and context["turn"] != rule["turn"]:
+        return False
+    if "min_turn" in rule and context["turn"] < rule["min_turn"]:
+        return False
+    if "last_tool_error" in rule and context["last_tool_error"] != rule["last_tool_error"]:
+        return False
+    if "last_tools_within" in rule and (
+        not context["last_tools"] or not set(context["last_tools"]) <= set(rule["last_tools_within"])
+    ):
+        return False
+    if "max_expected_output_tokens" in rule and context["expected_output_tokens"] > rule["max_expected_output_tokens"]:
+        return False
+    if "min_expected_output_tokens" in rule and context["expected_output_tokens"] < rule["min_expected_output_tokens"]:
+        return False
+    return True
@@ -0,0 +1,577 @@
+"""Shared scheduler for Messages API requests.
+
+Before it is sent, every request waits for a concurrency slot and for room
+in two token buckets: requests per minute and input tokens per minute. The
+buckets start from the configured limits and follow the API's rate-limit
+headers (anthropic-ratelimit-*) once responses arrive, so they track the
+account's real limits and remaining quota.
+
+Concurrency adapts like TCP congestion control: each success raises the
+limit slowly, and each 429 or 529 halves it. A 429 with retry-after also
+pauses every request sharing the scheduler, not just the one that failed.
+Failed requests are retried with jittered exponential backoff and give up
+their slot while they wait.
+
+asyncio is only imported by the async methods, so the synchronous REPL
+doesn't load it at startup.
+
+One scheduler is shared per process (get_scheduler()), so all agents and
+sessions in a process are coordinated. Processes don't coordinate with each
+other; when several share an account (batch workers), each is given a
+fraction of the limits (config.RATE_LIMIT_SHARE). Time spent waiting is reported per
+request through the client wrapper's listener.
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import config
+from core.context import CHARS_PER_TOKEN, estimate_tokens
+
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying; 429 and 529 also mean "slow down"
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+RATE_LIMITED_STATUS = {429, 529}
+
+# Called once per request with the seconds it spent queued and its retry count
+RequestListener = Callable[[float, int], None]
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket, by default holding a minute's worth of a limit.
+
+    A request larger than the whole bucket waits for a full bucket and
+    leaves it in debt, so it can't be starved by smaller requests forever.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """
+        Initialize a full bucket.
+
+        Args:
+            per_minute: Refill rate per minute
+            capacity: Most the bucket holds, i.e. the largest burst
+                (defaults to per_minute)
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """
+        Seconds until amount can be taken (0 if it can be taken now).
+
+        Args:
+            amount: Units wanted
+            now: Current time.monotonic()
+        """
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float) -> None:
+        """Take amount from the bucket (after delay() returned 0)."""
+        self.level -= amount
+
+    def set_limit(self, per_minute: float, now: float) -> None:
+        """Change the limit to a new per-minute rate and capacity, keeping the current level."""
+        self._refill(now)
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = min(self.level, self.capacity)
+
+    def set_remaining(self, remaining: float, now: float) -> None:
+        """Lower the level to what the server says is left."""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+
+class RateLimitScheduler:
+    """Admits requests within rate limits and an adaptive concurrency limit. Thread-safe."""
+
+    def __init__(
+        self,
+        requests_per_minute: float = config.RATE_LIMIT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = config.RATE_LIMIT_TOKENS_PER_MINUTE,
+        max_concurrency: int = config.RATE_LIMIT_MAX_CONCURRENCY,
+        max_retries: int = config.RATE_LIMIT_MAX_RETRIES,
+        backoff_base: float = config.RATE_LIMIT_BACKOFF_BASE,
+        backoff_max: float = config.RATE_LIMIT_BACKOFF_MAX,
+        share: float = 1.0
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            requests_per_minute: Initial requests per minute limit
+            tokens_per_minute: Initial input tokens per minute limit
+            max_concurrency: Most requests in flight at once
+            max_retries: Retries of a failed request before giving up
+            backoff_base: Backoff ceiling in seconds for the first retry,
+                doubling for each retry after it
+            backoff_max: Largest backoff ceiling in seconds
+            share: Fraction of the account's limits this scheduler may use,
+                when several processes send requests for the same account;
+                applied to the limits above and to those in the headers
+        """
+        self.share = share
+        self.requests = TokenBucket(requests_per_minute * share)
+        self.tokens = TokenBucket(tokens_per_minute * share)
+        self.max_concurrency = max(1, int(max_concurrency * share))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Fractional, so additive increase can grow it by less than one slot per success
+        self.concurrency_limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._async_waiters: List[Tuple["asyncio.AbstractEventLoop", "asyncio.Event"]] = []
+        self._stats = {"requests": 0, "retries": 0, "rate_limited": 0, "failed": 0, "queue_seconds": 0.0}
+
+    def _reserve(self, tokens: int) -> float:
+        """
+        Admit a request if possible. Must hold the lock.
+
+        Returns:
+            0 if admitted, otherwise seconds to wait before trying again
+            (math.inf to wait for a running request to finish)
+        """
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight >= int(self.concurrency_limit):
+            return math.inf
+        delay = max(self.requests.delay(1, now), self.tokens.delay(tokens, now))
+        if delay:
+            return delay
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        self.in_flight += 1
+        return 0.0
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Wait until a request may be sent.
+
+        Args:
+            tokens: Estimated input tokens of the request
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.perf_counter()
+        with self._released:
+            while True:
+                delay = self._reserve(tokens)
+                if not delay:
+                    break
+                self._released.wait(None if delay == math.inf else delay)
+        return time.perf_counter() - start
+
+    async def acquire_async(self, tokens: int) -> float:
+        """
+        Wait until a request may be sent, without blocking the event loop.
+
+        Args:
+            tokens: Estimated input tokens of the request
+
+        Returns:
+            Seconds spent waiting
+        """
+        import asyncio
+
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        while True:
+            released = asyncio.Event()
+            with self._lock:
+                delay = self._reserve(tokens)
+                if not delay:
+                    break
+                self._async_waiters.append((loop, released))
+            try:
+                await asyncio.wait_for(released.wait(), None if delay == math.inf else delay)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    if (loop, released) in self._async_waiters:
+                        self._async_waiters.remove((loop, released))
+        return time.perf_counter() - start
+
+    def release(self) -> None:
+        """Give back a request's concurrency slot and wake the waiting requests."""
+        with self._released:
+            self.in_flight -= 1
+            self._released.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, released in waiters:
+            loop.call_soon_threadsafe(released.set)
+
+    def on_success(self, headers: Any, estimated_tokens: int, usage: Any = None) -> None:
+        """
+        Learn from a successful response.
+
+        Args:
+            headers: Response headers (None if unavailable)
+            estimated_tokens: Input tokens taken from the bucket for it
+            usage: Response usage, to correct the estimate
+        """
+        with self._lock:
+            self._stats["requests"] += 1
+            # Additive increase: about one more slot per limit's worth of successes
+            self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+            if usage is not None:
+                used = usage.input_tokens + (usage.cache_creation_input_tokens or 0)
+                self.tokens.take(used - estimated_tokens)
+            self._apply_headers(headers)
+
+    def on_failure(self, error: BaseException, attempt: int) -> Optional[float]:
+        """
+        Learn from a failed request and decide whether to retry it.
+
+        Args:
+            error: The exception the request raised
+            attempt: Retries already made for this request
+
+        Returns:
+            Seconds to back off before retrying, or None to give up
+        """
+        from anthropic import APIConnectionError
+
+        status = getattr(error, "status_code", None)
+        retryable = status in RETRYABLE_STATUS or isinstance(error, APIConnectionError)
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        retry_after = _retry_after(headers)
+
+        with self._lock:
+            if status in RATE_LIMITED_STATUS:
+                self._stats["rate_limited"] += 1
+                # Multiplicative decrease
+                self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+                if retry_after is not None and status == 429:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self._apply_headers(headers)
+            if not retryable or attempt >= self.max_retries:
+                self._stats["failed"] += 1
+                return None
+            self._stats["retries"] += 1
+
+        # Full jitter, so retries from many sessions don't arrive together
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, ceiling)
+
+    def record_queue_time(self, seconds: float) -> None:
+        """Add a request's queue time to the totals."""
+        with self._lock:
+            self._stats["queue_seconds"] += seconds
+
+    def _apply_headers(self, headers: Any) -> None:
+        """Sync the buckets with the anthropic-ratelimit-* headers. Must hold the lock."""
+        if not headers:
+            return
+        now = time.monotonic()
+        for bucket, prefix in (
+            (self.requests, "anthropic-ratelimit-requests"),
+            (self.tokens, "anthropic-ratelimit-input-tokens")
+        ):
+            # The headers describe the whole account; this process gets its share
+            limit = _number(headers.get(f"{prefix}-limit"))
+            if limit:
+                bucket.set_limit(limit * self.share, now)
+            remaining = _number(headers.get(f"{prefix}-remaining"))
+            if remaining is not None:
+                bucket.set_remaining(remaining * self.share, now)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report scheduler state and totals.
+
+        Returns:
+            Current limits, requests in flight, and counts of requests,
+            retries, rate-limit responses, failures and queue seconds
+        """
+        with self._lock:
+            return {
+                **self._stats,
+                "in_flight": self.in_flight,
+                "concurrency_limit": self.concurrency_limit,
+                "requests_per_minute": self.requests.capacity,
+                "tokens_per_minute": self.tokens.capacity
+            }
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _retry_after(headers: Any) -> Optional[float]:
+    """Seconds the server asked us to wait, if it said."""
+    if not headers:
+        return None
+    milliseconds = _number(headers.get("retry-after-ms"))
+    if milliseconds is not None:
+        return milliseconds / 1000
+    return _number(headers.get("retry-after"))
+
+
+def _headers(stream: Any) -> Any:
+    """Headers of the HTTP response behind an SDK stream, if there is one."""
+    return getattr(getattr(stream, "response", None), "headers", None)
+
+
+def estimate_request_tokens(params: Dict[str, Any]) -> int:
+    """
+    Estimate the input tokens of a Messages API request.
+
+    Args:
+        params: Parameters for client.messages.create
+
+    Returns:
+        Approximate input tokens (system prompt, tools and messages)
+    """
+    system = params.get("system") or ""
+    system_chars = len(system) if isinstance(system, str) else sum(len(block.get("text", "")) for block in system)
+    tools_chars = sum(len(tool.get("description", "")) + len(str(tool.get("input_schema", ""))) for tool in params.get("tools") or [])
+    return (system_chars + tools_chars) // CHARS_PER_TOKEN + estimate_tokens(params.get("messages", []))
+
+
+_scheduler: Optional[RateLimitScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """
+    Get the process-wide scheduler, creating it on first use.
+
+    Returns:
+        Shared scheduler
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RateLimitScheduler(share=config.RATE_LIMIT_SHARE)
+        return _scheduler
+
+
+class _ScheduledStream:
+    """
+    Stream manager that opens the stream through the scheduler.
+
+    The request keeps its slot until the stream is closed. Errors while
+    opening the stream (where 429s and 529s show up) are retried; errors
+    once events are flowing are not.
+    """
+
+    def __init__(self, messages: "ScheduledMessages", params: Dict[str, Any]):
+        self._messages = messages
+        self._params = params
+        self._manager = None
+        self._stream = None
+        self._tokens = 0
+
+    def __enter__(self) -> Any:
+        def open_stream():
+            self._manager = self._messages._messages.stream(**self._params)
+            return self._manager.__enter__()
+
+        self._stream, self._tokens = self._messages._send(open_stream, self._params, release=False)
+        return self._stream
+
+    def __exit__(self, *exc_info) -> Any:
+        try:
+            if exc_info[0] is None:
+                self._messages._scheduler.on_success(
+                    _headers(self._stream), self._tokens, self._stream.get_final_message().usage
+                )
+            return self._manager.__exit__(*exc_info)
+        finally:
+            self._messages._scheduler.release()
+
+    async def __aenter__(self) -> Any:
+        async def open_stream():
+            self._manager = self._messages._messages.stream(**self._params)
+            return await self._manager.__aenter__()
+
+        self._stream, self._tokens = await self._messages._send_async(open_stream, self._params, release=False)
+        return self._stream
+
+    async def __aexit__(self, *exc_info) -> Any:
+        try:
+            if exc_info[0] is None:
+                message = await self._stream.get_final_message()
+                self._messages._scheduler.on_success(_headers(self._stream), self._tokens, message.usage)
+            return await self._manager.__aexit__(*exc_info)
+        finally:
+            self._messages._scheduler.release()
+
+
+class ScheduledMessages:
+    """messages resource that sends every request through the scheduler."""
+
+    def __init__(self, messages: Any, scheduler: RateLimitScheduler, listener: Optional[RequestListener]):
+        self._messages = messages
+        self._scheduler = scheduler
+        self._listener = listener
+
+    def _send(self, send: Callable[[], Any], params: Dict[str, Any], release: bool = True) -> Tuple[Any, int]:
+        """
+        Send a request, queueing and retrying as the scheduler says.
+
+        Args:
+            send: Makes the request
+            params: Request parameters, for the token estimate
+            release: Give the slot back when the request returns (streams
+                keep it until they are closed)
+
+        Returns:
+            What send returned, and the estimated input tokens
+        """
+        tokens = estimate_request_tokens(params)
+        queued = 0.0
+        attempt = 0
+        try:
+            while True:
+                queued += self._scheduler.acquire(tokens)
+                try:
+                    result = send()
+                except Exception as e:
+                    self._scheduler.release()
+                    backoff = self._scheduler.on_failure(e, attempt)
+                    if backoff is None:
+                        raise
+                    logger.info("API request failed (%s), retry %d in %.1fs", e, attempt + 1, backoff)
+                    attempt += 1
+                    time.sleep(backoff)
+                    queued += backoff
+                    continue
+                if release:
+                    self._scheduler.release()
+                return result, tokens
+        finally:
+            self._report(queued, attempt)
+
+    async def _send_async(self, send: Callable[[], Any], params: Dict[str, Any], release: bool = True) -> Tuple[Any, int]:
+        """Async version of _send: send is a coroutine function."""
+        import asyncio
+
+        tokens = estimate_request_tokens(params)
+        queued = 0.0
+        attempt = 0
+        try:
+            while True:
+                queued += await self._scheduler.acquire_async(tokens)
+                try:
+                    result = await send()
+                except Exception as e:
+                    self._scheduler.release()
+                    backoff = self._scheduler.on_failure(e, attempt)
+                    if backoff is None:
+                        raise
+                    logger.info("API request failed (%s), retry %d in %.1fs", e, attempt + 1, backoff)
+                    attempt += 1
+                    await asyncio.sleep(backoff)
+                    queued += backoff
+                    continue
+                if release:
+                    self._scheduler.release()
+                return result, tokens
+        finally:
+            self._report(queued, attempt)
+
+    def _report(self, queued: float, retries: int) -> None:
+        self._scheduler.record_queue_time(queued)
+        if self._listener is not None:
+            self._listener(queued, retries)
+
+    def _create(self, params: Dict[str, Any]) -> Tuple[Any, Any]:
+        """Make one create call, returning the message and its headers (None if the client can't say)."""
+        raw = getattr(self._messages, "with_raw_response", None)
+        if raw is None:
+            return self._messages.create(**params), None
+        response = raw.create(**params)
+        return response.parse(), response.headers
+
+    def create(self, **params) -> Any:
+        (message, headers), tokens = self._send(lambda: self._create(params), params)
+        self._scheduler.on_success(headers, tokens, message.usage)
+        return message
+
+    def stream(self, **params) -> Any:
+        return _ScheduledStream(self, params)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._messages, name)
+
+
+class AsyncScheduledMessages(ScheduledMessages):
+    """Async messages resource that sends every request through the scheduler."""
+
+    async def _create(self, params: Dict[str, Any]) -> Tuple[Any, Any]:
+        raw = getattr(self._messages, "with_raw_response", None)
+        if raw is None:
+            return await self._messages.create(**params), None
+        response = await raw.create(**params)
+        return await response.parse(), response.headers
+
+    async def create(self, **params) -> Any:
+        (message, headers), tokens = await self._send_async(lambda: self._create(params), params)
+        self._scheduler.on_success(headers, tokens, message.usage)
+        return message
+
+
+class ScheduledClient:
+    """Client wrapper whose messages resource goes through the rate-limit scheduler."""
+
+    messages_class = ScheduledMessages
+
+    def __init__(
+        self,
+        client: Any,
+        scheduler: Optional[RateLimitScheduler] = None,
+        listener: Optional[RequestListener] = None
+    ):
+        """
+        Wrap a client.
+
+        The SDK's own retries are turned off, so that retries are
+        coordinated by the scheduler instead.
+
+        Args:
+            client: Anthropic client
+            scheduler: Scheduler (defaults to the process-wide one)
+            listener: Called after each request with its queue seconds
+                and retry count
+        """
+        if hasattr(client, "with_options"):
+            client = client.with_options(max_retries=0)
+        self._client = client
+        self.scheduler = scheduler if scheduler is not None else get_scheduler()
+        self.messages = self.messages_class(client.messages, self.scheduler, listener)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+class AsyncScheduledClient(ScheduledClient):
+    """Async client wrapper whose messages resource goes through the rate-limit scheduler."""
+
+    messages_class = AsyncScheduledMessages
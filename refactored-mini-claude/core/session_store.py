@@ -0,0 +1,382 @@
+"""Durable, append-only session logs.
+
+Each session is a JSONL file: a header line, then one line per message,
+appended as the message is added to the history. Nothing is ever
+re-serialized on the normal path; only compaction, which rewrites the
+history, rewrites the log (atomically, and the compacted history is small).
+
+Tool results larger than config.SESSION_INLINE_MAX_BYTES are stored out of
+line in a content-addressed blob directory shared by all sessions, so a file
+read in many turns or sessions is stored once and the log itself stays small
+enough to parse in milliseconds. Loading a session doesn't read them: they
+come back as BlobRef handles, read only when a request needs their text.
+
+Layout:
+    <SESSION_DIR>/<session id>.jsonl
+    <SESSION_DIR>/blobs/<first 2 hex digits>/<sha256>
+
+A crash can at worst cut the last line short; it is skipped on load. A crash
+between a response and its tool results leaves tool calls unanswered, which
+the API rejects; on load they are answered with error results.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+import config
+from core.blob_store import BlobRef
+
+
+logger = logging.getLogger(__name__)
+
+LOG_VERSION = 1
+
+# Result given on resume to tool calls that were cut off by a crash
+INTERRUPTED_TOOL_RESULT = "Error: The session ended before this tool call finished; its result is unknown."
+
+
+class SessionLog:
+    """The log of one session. Safe to use from several threads."""
+
+    def __init__(
+        self,
+        session_id: Optional[str] = None,
+        directory: str = config.SESSION_DIR,
+        inline_max_bytes: int = config.SESSION_INLINE_MAX_BYTES,
+        fsync: bool = config.SESSION_FSYNC
+    ):
+        """
+        Open a session log. Nothing is written until the first message.
+
+        Args:
+            session_id: Id of an existing session to continue (defaults to
+                a new session)
+            directory: Directory holding the session logs
+            inline_max_bytes: Tool results larger than this are stored out
+                of line
+            fsync: fsync after every write, to survive power loss as well
+                as crashes
+        """
+        self.directory = os.path.expanduser(directory)
+        self.session_id = session_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        self.inline_max_bytes = inline_max_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._file = None
+        # How much of the history is in the log, and the last message written
+        self._count = 0
+        self._last: Any = None
+        self._blobs = _BlobDirectory(os.path.join(self.directory, "blobs"))
+
+    @property
+    def path(self) -> str:
+        """Path of the log file."""
+        return os.path.join(self.directory, f"{self.session_id}.jsonl")
+
+    def exists(self) -> bool:
+        """True if the session has been written to."""
+        return os.path.exists(self.path)
+
+    def sync(self, history: List[Dict[str, Any]]) -> None:
+        """
+        Bring the log up to date with the history.
+
+        Messages added since the last sync are appended. If the history was
+        rewritten instead (compacted or cleared), the log is rewritten.
+
+        Args:
+            history: Conversation history
+        """
+        with self._lock:
+            count = self._count
+            if count > len(history) or (count and history[count - 1] is not self._last):
+                self._rewrite(history)
+            elif count < len(history):
+                self._append(history[count:])
+
+    def checkpoint(self, history: List[Dict[str, Any]]) -> None:
+        """
+        Rewrite the log from the history, after it was changed in place.
+
+        Args:
+            history: Conversation history
+        """
+        with self._lock:
+            self._rewrite(history)
+
+    def message_count(self) -> int:
+        """Count the messages in the log without decoding them."""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        # Every complete line but the header; a torn last line has no newline
+        return max(0, data.count(b"\n") - 1)
+
+    def load(self) -> List[Dict[str, Any]]:
+        """
+        Read the session's history.
+
+        Out-of-line tool results come back as BlobRef handles; their text is
+        only read when it is needed. Tool calls left unanswered by a crash
+        get error results, which the next sync appends to the log. Later
+        syncs append to this history.
+
+        Returns:
+            Conversation history (empty if the session has no log)
+        """
+        history = []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            lines = []
+        for line_number, line in enumerate(lines[1:], 2):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Only the last line can be torn by a crash
+                logger.warning("Skipping unreadable line %d of %s", line_number, self.path)
+                continue
+            history.append(self._decode_message(record))
+
+        with self._lock:
+            self._count = len(history)
+            self._last = history[-1] if history else None
+        answers = _answer_interrupted_tool_calls(history)
+        if answers is not None:
+            logger.warning("Session %s ended during a tool call; answering it with an error", self.session_id)
+            history.append(answers)
+        return history
+
+    def close(self) -> None:
+        """Close the log file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _append(self, messages: List[Dict[str, Any]]) -> None:
+        """Append messages to the log. Must hold the lock."""
+        if self._file is None:
+            self._file = self._open()
+        self._file.write("".join(json.dumps(self._encode_message(message)) + "\n" for message in messages))
+        self._flush(self._file)
+        self._count += len(messages)
+        self._last = messages[-1]
+
+    def _open(self) -> Any:
+        """Open the log for appending, writing the header for a new session."""
+        os.makedirs(self.directory, exist_ok=True)
+        f = open(self.path, "a+", encoding="utf-8")
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            f.write(json.dumps(self._header()) + "\n")
+        else:
+            # Start on a fresh line if a crash cut the last record short
+            f.seek(f.tell() - 1)
+            if f.read(1) != "\n":
+                f.write("\n")
+        return f
+
+    def _rewrite(self, history: List[Dict[str, Any]]) -> None:
+        """Replace the log with the history, atomically. Must hold the lock."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{self.session_id}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(json.dumps(self._header()) + "\n")
+                for message in history:
+                    f.write(json.dumps(self._encode_message(message)) + "\n")
+                self._flush(f)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self._count = len(history)
+        self._last = history[-1] if history else None
+
+    def _flush(self, f: Any) -> None:
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def _header(self) -> Dict[str, Any]:
+        return {"session_id": self.session_id, "version": LOG_VERSION, "created": time.time(), "cwd": os.getcwd()}
+
+    def _encode_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn a history message into a JSON record, moving large tool results out of line."""
+        content = message["content"]
+        if not isinstance(content, str):
+            content = [self._encode_block(block) for block in content]
+        return {"role": message["role"], "content": content}
+
+    def _encode_block(self, block: Any) -> Dict[str, Any]:
+        if not isinstance(block, dict):
+            # SDK content block from a response
+            return block.model_dump(exclude_none=True)
+        content = block.get("content")
+        if isinstance(content, BlobRef):
+            # Already out of line in memory; only read it if this session hasn't stored it
+            encoded = {key: value for key, value in block.items() if key != "content"}
+            if os.path.exists(self._blob_path(content.digest)):
+                encoded["content_ref"] = content.digest
+            else:
+                encoded["content_ref"] = self._put_blob(content.text().encode("utf-8"))
+            encoded["content_chars"] = len(content)
+            return encoded
+        if block.get("type") == "tool_result" and isinstance(content, str) and len(content) > self.inline_max_bytes:
+            data = content.encode("utf-8")
+            if len(data) > self.inline_max_bytes:
+                encoded = {key: value for key, value in block.items() if key != "content"}
+                encoded["content_ref"] = self._put_blob(data)
+                encoded["content_chars"] = len(content)
+                return encoded
+        return block
+
+    def _decode_message(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        content = record["content"]
+        if not isinstance(content, str):
+            for block in content:
+                if "content_ref" in block:
+                    digest = block.pop("content_ref")
+                    length = block.pop("content_chars", None)
+                    if length is None:
+                        # Logs written before lengths were recorded; bytes are close enough for sizing
+                        length = self._blobs.size(digest)
+                    block["content"] = BlobRef(self._blobs, digest, length)
+        return {"role": record["role"], "content": content}
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "blobs", digest[:2], digest)
+
+    def _put_blob(self, data: bytes) -> str:
+        """Store content once under its hash, before any log line refers to it."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                self._flush(f)
+            os.replace(temp_path, path)
+        return digest
+
+
+class _BlobDirectory:
+    """Read-only view of a session blob directory, the store behind BlobRefs of loaded sessions."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def get(self, digest: str) -> str:
+        """Read a stored tool result, or an error in its place if it is gone."""
+        try:
+            with open(self._path(digest), encoding="utf-8") as f:
+                return f.read()
+        except OSError as e:
+            logger.warning("Missing stored tool result %s: %s", digest, e)
+            return f"Error: stored tool result {digest[:12]} is missing"
+
+    def size(self, digest: str) -> int:
+        try:
+            return os.path.getsize(self._path(digest))
+        except OSError:
+            return 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+
+def _answer_interrupted_tool_calls(history: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Build error results for tool calls a crash left unanswered.
+
+    Tool results are appended in one message right after the response that
+    asked for them, so only a response at the end of the log can be
+    missing them.
+
+    Args:
+        history: Loaded conversation history
+
+    Returns:
+        A user message answering each unanswered tool call, or None
+    """
+    if not history or history[-1]["role"] != "assistant" or isinstance(history[-1]["content"], str):
+        return None
+    tool_use_ids = [block["id"] for block in history[-1]["content"] if block.get("type") == "tool_use"]
+    if not tool_use_ids:
+        return None
+    return {"role": "user", "content": [
+        {"type": "tool_result", "tool_use_id": tool_use_id, "content": INTERRUPTED_TOOL_RESULT, "is_error": True}
+        for tool_use_id in tool_use_ids
+    ]}
+
+
+def list_sessions(directory: str = config.SESSION_DIR) -> List[Dict[str, Any]]:
+    """
+    List saved sessions, most recently used first.
+
+    Only each log's header and first message are read.
+
+    Args:
+        directory: Directory holding the session logs
+
+    Returns:
+        Session id, last modified time, size in bytes, working directory
+        and the first user message of each session
+    """
+    directory = os.path.expanduser(directory)
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith(".jsonl")]
+    except FileNotFoundError:
+        return []
+
+    sessions = []
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                first = f.readline()
+            stat = os.stat(path)
+        except (OSError, ValueError):
+            continue
+        try:
+            first_message = json.loads(first)["content"] if first else ""
+        except (ValueError, KeyError):
+            first_message = ""
+        sessions.append({
+            "session_id": name[:-len(".jsonl")],
+            "modified": stat.st_mtime,
+            "bytes": stat.st_size,
+            "cwd": header.get("cwd"),
+            "first_message": first_message if isinstance(first_message, str) else ""
+        })
+    sessions.sort(key=lambda session: -session["modified"])
+    return sessions
+
+
+def latest_session(directory: str = config.SESSION_DIR) -> Optional[str]:
+    """
+    Find the most recently used session.
+
+    Args:
+        directory: Directory holding the session logs
+
+    Returns:
+        Its id, or None if there are no sessions
+    """
+    sessions = list_sessions(directory)
+    return sessions[0]["session_id"] if sessions else None
@@ -0,0 +1,173 @@
+"""Pool of agent sessions for the server, with idle eviction."""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import config
+from core.async_agent import AsyncAgent
+from core.events import QueueSink
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionPoolFull(Exception):
+    """Raised when no session can be created because every session is busy."""
+
+
+class Session:
+    """One conversation: an agent and the sink its events go to."""
+
+    def __init__(self, session_id: str, agent: AsyncAgent, sink: QueueSink):
+        self.id = session_id
+        self.agent = agent
+        self.sink = sink
+        self.created = time.time()
+        self.last_used = time.monotonic()
+        # Set while a message is being handled, including before the agent starts
+        self.running = False
+
+    @property
+    def busy(self) -> bool:
+        """True while the session is handling a message."""
+        return self.running or self.agent.busy
+
+    def touch(self) -> None:
+        """Mark the session as used now."""
+        self.last_used = time.monotonic()
+
+    def info(self) -> Dict[str, Any]:
+        """Summary for session listings."""
+        return {
+            "session_id": self.id,
+            "busy": self.busy,
+            "created": self.created,
+            "idle_seconds": time.monotonic() - self.last_used,
+            "messages": len(self.agent.conversation_history)
+        }
+
+
+class SessionPool:
+    """
+    Sessions by id, least recently used first.
+
+    Sessions idle for longer than the idle timeout are closed by
+    evict_idle(); when the pool is full, creating a session closes the least
+    recently used idle one. Busy sessions are never evicted.
+    """
+
+    def __init__(
+        self,
+        agent_factory: Callable[[QueueSink], AsyncAgent],
+        max_sessions: int = config.MAX_SESSIONS,
+        idle_timeout: float = config.SESSION_IDLE_TIMEOUT
+    ):
+        """
+        Initialize an empty pool.
+
+        Args:
+            agent_factory: Creates the agent for a new session, reporting
+                events to the given sink
+            max_sessions: Most sessions kept open
+            idle_timeout: Seconds of inactivity before a session is closed
+        """
+        self.agent_factory = agent_factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self) -> Session:
+        """
+        Open a new session.
+
+        Returns:
+            The session
+
+        Raises:
+            SessionPoolFull: If the pool is full and every session is busy
+        """
+        if len(self._sessions) >= self.max_sessions:
+            idle = next((session for session in self._sessions.values() if not session.busy), None)
+            if idle is None:
+                raise SessionPoolFull(f"All {self.max_sessions} sessions are busy")
+            logger.info("Session pool full, evicting %s", idle.id)
+            self.close(idle.id)
+
+        sink = QueueSink()
+        session = Session(uuid.uuid4().hex, self.agent_factory(sink), sink)
+        session.agent.telemetry.session_id = session.id
+        self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """
+        Look up a session and mark it as used.
+
+        Args:
+            session_id: Session id
+
+        Returns:
+            The session, or None if it doesn't exist (or was evicted)
+        """
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.touch()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def close(self, session_id: str) -> bool:
+        """
+        Close a session.
+
+        Args:
+            session_id: Session id
+
+        Returns:
+            True if the session existed
+        """
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.agent.clear_history()
+        # Background jobs the session started die with it
+        session.agent.tool_registry.session.close()
+        return True
+
+    def list(self) -> List[Dict[str, Any]]:
+        """
+        Describe the open sessions.
+
+        Returns:
+            Session summaries, least recently used first
+        """
+        return [session.info() for session in self._sessions.values()]
+
+    def evict_idle(self) -> int:
+        """
+        Close sessions that have been idle longer than the idle timeout.
+
+        Returns:
+            Number of sessions closed
+        """
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [
+            session.id for session in self._sessions.values()
+            if session.last_used < cutoff and not session.busy
+        ]
+        for session_id in expired:
+            self.close(session_id)
+        if expired:
+            logger.info("Evicted %d idle sessions", len(expired))
+        return len(expired)
+
+    async def run_evictor(self, interval: float = config.SESSION_EVICT_INTERVAL) -> None:
+        """Evict idle sessions every interval seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
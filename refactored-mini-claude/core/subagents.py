@@ -0,0 +1,207 @@
+"""Child agents for fanning a task out in parallel.
+
+The spawn_subagents tool hands independent parts of a task to child agents.
+Each child starts with an empty history and its own registry holding a
+subset of the parent's tools, runs its ReAct loop in a worker thread, and
+returns only its final report; the parent's context grows by the reports,
+not by the children's exploration. All children of one call share a token
+budget; once it is spent, each child stops before its next API call and
+reports what it has.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import config
+from tools.registry import ToolRegistry
+from core.agent import Agent
+from core.events import EventSink
+
+
+logger = logging.getLogger(__name__)
+
+# Appended to the system prompt of every child
+SUBAGENT_INSTRUCTIONS = """
+
+You are a sub-agent working on one part of a larger task for another agent, which only sees your final
+message. Work on your task alone, without asking questions. When you are done, reply with a concise
+report: what you found or changed (with file paths), and anything left unresolved. Do not repeat file
+contents unless they are the answer."""
+
+
+class BudgetExhausted(Exception):
+    """Raised in a child agent when its token budget or API call limit is used up."""
+
+
+class TokenBudget:
+    """Tokens shared by a group of child agents. Safe to use from several threads."""
+
+    def __init__(self, total: int):
+        """
+        Args:
+            total: Tokens (input, cached input and output) the group may use
+        """
+        self.total = total
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def charge(self, tokens: int) -> None:
+        """Record tokens used."""
+        with self._lock:
+            self.used += tokens
+
+    @property
+    def exhausted(self) -> bool:
+        """True once the budget is used up."""
+        with self._lock:
+            return self.used >= self.total
+
+
+class SubAgent(Agent):
+    """
+    Agent run unattended by spawn_subagents.
+
+    Its output goes nowhere but the report, it never shows the demo-mode
+    context, and it stops when the shared budget or its API call limit runs
+    out.
+    """
+
+    demo_mode = False
+
+    def __init__(
+        self,
+        tool_registry: ToolRegistry,
+        budget: TokenBudget,
+        client: Optional[Any] = None,
+        max_api_calls: int = config.SUBAGENT_MAX_API_CALLS
+    ):
+        """
+        Initialize the child.
+
+        Args:
+            tool_registry: The child's own registry
+            budget: Token budget shared with the other children
+            client: Anthropic client (defaults to a new one)
+            max_api_calls: Most API calls the child may make
+        """
+        super().__init__(tool_registry, client, events=EventSink())
+        self.system_prompt = config.SYSTEM_PROMPT + SUBAGENT_INSTRUCTIONS
+        self.budget = budget
+        self.max_api_calls = max_api_calls
+        self.tokens_used = 0
+
+    def _get_response(self, report: bool = True, **params) -> Any:
+        if self.budget.exhausted:
+            raise BudgetExhausted("the shared token budget is used up")
+        if len(self.turn_stats) >= self.max_api_calls:
+            raise BudgetExhausted(f"it reached its limit of {self.max_api_calls} API calls")
+        return super()._get_response(report, **params)
+
+    def _record_response(
+        self,
+        response: Any,
+        start_time: float,
+        latency: float,
+        time_to_first_token: Optional[float]
+    ) -> None:
+        super()._record_response(response, start_time, latency, time_to_first_token)
+        usage = response.usage
+        tokens = (
+            usage.input_tokens + usage.output_tokens
+            + (usage.cache_read_input_tokens or 0) + (usage.cache_creation_input_tokens or 0)
+        )
+        self.tokens_used += tokens
+        self.budget.charge(tokens)
+
+
+def child_registry(parent: ToolRegistry, tool_names: Optional[List[str]] = None) -> ToolRegistry:
+    """
+    Build a child's registry from some of the parent's tools.
+
+    The child gets its own session state and memo; the tool objects are
+    shared. spawn_subagents itself is never passed on, so children can't
+    fan out further.
+
+    Args:
+        parent: Parent registry
+        tool_names: Tools to give the child (defaults to all of them)
+
+    Returns:
+        The child's registry
+
+    Raises:
+        KeyError: If a named tool isn't in the parent registry
+    """
+    names = [name for name in (parent.list_tools() if tool_names is None else tool_names) if name != "spawn_subagents"]
+    registry = ToolRegistry()
+    for name in names:
+        registry.register(parent.get_tool(name))
+    return registry
+
+
+def run_subagents(
+    tasks: List[Dict[str, Any]],
+    parent: ToolRegistry,
+    max_concurrency: int = config.SUBAGENT_MAX_CONCURRENCY,
+    token_budget: int = config.SUBAGENT_TOKEN_BUDGET,
+    client: Optional[Any] = None
+) -> List[Dict[str, Any]]:
+    """
+    Run child agents on tasks concurrently.
+
+    Args:
+        tasks: Each a dict with the "task" prompt and optionally the "tools"
+            the child may use
+        parent: Registry the children's tools come from
+        max_concurrency: Most children running at once
+        token_budget: Tokens all the children may use together
+        client: Anthropic client shared by the children (defaults to a
+            new one)
+
+    Returns:
+        For each task, in order: the report, whether it completed, and the
+        API calls, tokens and seconds it took
+    """
+    if client is None:
+        from core.clients import create_client
+        client = create_client()
+    budget = TokenBudget(token_budget)
+
+    def run(task: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        child = SubAgent(child_registry(parent, task.get("tools")), budget, client)
+        try:
+            report = child.run(task["task"])
+            status = "completed"
+        except BudgetExhausted as e:
+            # Report whatever the child got to before it ran out
+            report = f"[Stopped early: {e}]\n{child.last_response_text()}"
+            status = "stopped"
+        except Exception as e:
+            logger.warning("Sub-agent failed: %s", e)
+            report = f"Error: {e}"
+            status = "failed"
+        finally:
+            # Nobody can reach the child's background jobs once it has reported
+            child.tool_registry.session.close()
+        return {
+            "task": task["task"],
+            "status": status,
+            "report": _clip_report(report),
+            "api_calls": len(child.turn_stats),
+            "tokens": child.tokens_used,
+            "seconds": time.perf_counter() - start
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(tasks))), thread_name_prefix="subagent") as executor:
+        return list(executor.map(run, tasks))
+
+
+def _clip_report(report: str) -> str:
+    """Cut a report to config.SUBAGENT_REPORT_MAX_CHARS, keeping the end, where conclusions usually are."""
+    limit = config.SUBAGENT_REPORT_MAX_CHARS
+    if len(report) <= limit:
+        return report
+    return f"[... {len(report) - limit} characters of the report omitted ...]\n" + report[-limit:]
@@ -0,0 +1,309 @@
+"""Per-session performance telemetry.
+
+Every API call and tool execution is recorded as a span: a flat dict with the
+span kind, a name, when it started, how long it took and kind-specific
+measurements (token usage for API calls, result size for tools). Spans can
+be streamed to a JSONL file as they finish, summarized for the REPL `stats`
+command, and exposed as Prometheus text metrics.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import config
+
+
+logger = logging.getLogger(__name__)
+
+# Span kinds
+API_CALL = "api_call"
+TOOL = "tool"
+RUN = "run"
+
+# Usage fields summed over API call spans
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+
+
+class Telemetry:
+    """Collects spans for one session. Safe to use from tool worker threads."""
+
+    def __init__(self, session_id: Optional[str] = None, jsonl_path: Optional[str] = config.TELEMETRY_JSONL_PATH):
+        """
+        Initialize telemetry.
+
+        Args:
+            session_id: Identifier written with every span (defaults to a
+                random id)
+            jsonl_path: File each finished span is appended to as a JSON
+                line (None = keep spans in memory only)
+        """
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.jsonl_path = os.path.expanduser(jsonl_path) if jsonl_path else None
+        self._spans: List[Dict[str, Any]] = []
+        self._gauges: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, name: str, start: float, duration: float, **fields: Any) -> Dict[str, Any]:
+        """
+        Record a finished span.
+
+        Args:
+            kind: Span kind (API_CALL, TOOL or RUN)
+            name: Model name for API calls, tool name for tools
+            start: Wall-clock start time (time.time())
+            duration: Seconds the span took
+            **fields: Kind-specific measurements
+
+        Returns:
+            The recorded span
+        """
+        span = {
+            "session_id": self.session_id,
+            "kind": kind,
+            "name": name,
+            "start": start,
+            "duration": duration,
+            **fields
+        }
+        with self._lock:
+            self._spans.append(span)
+            if self.jsonl_path:
+                self._write_line(span)
+        return span
+
+    @contextmanager
+    def span(self, kind: str, name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Time a block of code as a span.
+
+        The yielded dict can be filled with measurements while the block
+        runs; they are recorded with the span when it finishes.
+
+        Args:
+            kind: Span kind
+            name: Span name
+            **fields: Initial measurements
+        """
+        start = time.time()
+        started = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.record(kind, name, start, time.perf_counter() - started, **fields)
+
+    def spans(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the recorded spans.
+
+        Args:
+            kind: Only return spans of this kind
+
+        Returns:
+            Spans in the order they finished
+        """
+        with self._lock:
+            return [span for span in self._spans if kind is None or span["kind"] == kind]
+
+    def clear(self) -> None:
+        """Drop all recorded spans (the JSONL file is kept)."""
+        with self._lock:
+            self._spans.clear()
+
+    def add_gauge(self, name: str, read: Callable[[], Dict[str, float]]) -> None:
+        """
+        Report current values, such as memory use, alongside the spans.
+
+        Args:
+            name: Gauge group name
+            read: Returns the current values by name, read on every summary
+        """
+        self._gauges[name] = read
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Break down where the session's time and tokens went.
+
+        Returns:
+            Totals for runs and API calls, per-tool call counts, durations
+            and result sizes, per-model-tier calls, time and cost (with
+            routing on), and the current gauge values
+        """
+        runs = self.spans(RUN)
+        api_calls = self.spans(API_CALL)
+        tools: Dict[str, Dict[str, Any]] = {}
+        for span in self.spans(TOOL):
+            stats = tools.setdefault(span["name"], {"calls": 0, "cached": 0, "errors": 0, "seconds": 0.0, "result_bytes": 0})
+            stats["calls"] += 1
+            stats["cached"] += span.get("cached", False)
+            stats["errors"] += span.get("error", False)
+            stats["seconds"] += span["duration"]
+            stats["result_bytes"] += span.get("result_bytes", 0)
+
+        tiers: Dict[str, Dict[str, Any]] = {}
+        for span in api_calls:
+            if span.get("tier") is None:
+                continue
+            stats = tiers.setdefault(span["tier"], {"calls": 0, "seconds": 0.0, "cost_usd": 0.0, "output_tokens": 0})
+            stats["calls"] += 1
+            stats["seconds"] += span["duration"]
+            stats["cost_usd"] += span.get("cost_usd", 0.0)
+            stats["output_tokens"] += span.get("output_tokens", 0)
+
+        latencies = sorted(span["duration"] for span in api_calls)
+        first_tokens = [span["time_to_first_token"] for span in api_calls if span.get("time_to_first_token") is not None]
+        return {
+            "session_id": self.session_id,
+            "runs": len(runs),
+            "run_seconds": sum(span["duration"] for span in runs),
+            "api": {
+                "calls": len(api_calls),
+                "seconds": sum(latencies),
+                "p50_latency": _percentile(latencies, 0.5),
+                "p95_latency": _percentile(latencies, 0.95),
+                "mean_time_to_first_token": sum(first_tokens) / len(first_tokens) if first_tokens else None,
+                "stop_reasons": _count(span.get("stop_reason") for span in api_calls),
+                # Part of the API time spent waiting on the rate-limit scheduler
+                "queue_seconds": sum(span.get("queue_seconds", 0.0) for span in api_calls),
+                "retries": sum(span.get("retries", 0) for span in api_calls),
+                **{field: sum(span.get(field, 0) for span in api_calls) for field in TOKEN_FIELDS}
+            },
+            "tools": tools,
+            "tiers": tiers,
+            "gauges": {name: read() for name, read in self._gauges.items()}
+        }
+
+    def prometheus(self) -> str:
+        """
+        Render the session's metrics in the Prometheus text format.
+
+        Returns:
+            Metrics text, as served on /metrics
+        """
+        summary = self.summary()
+        api = summary["api"]
+        session = f'session_id="{self.session_id}"'
+        lines = [
+            "# HELP mini_claude_api_calls_total Messages API calls.",
+            "# TYPE mini_claude_api_calls_total counter"
+        ]
+        for stop_reason, count in sorted(api["stop_reasons"].items(), key=lambda item: str(item[0])):
+            lines.append(f'mini_claude_api_calls_total{{{session},stop_reason="{stop_reason}"}} {count}')
+        lines += [
+            "# HELP mini_claude_api_latency_seconds Time from request to complete response.",
+            "# TYPE mini_claude_api_latency_seconds summary",
+            f"mini_claude_api_latency_seconds_sum{{{session}}} {api['seconds']}",
+            f"mini_claude_api_latency_seconds_count{{{session}}} {api['calls']}",
+            "# HELP mini_claude_api_queue_seconds_total Time API calls waited on rate limits and backoff.",
+            "# TYPE mini_claude_api_queue_seconds_total counter",
+            f"mini_claude_api_queue_seconds_total{{{session}}} {api['queue_seconds']}",
+            "# HELP mini_claude_api_retries_total Retried API requests.",
+            "# TYPE mini_claude_api_retries_total counter",
+            f"mini_claude_api_retries_total{{{session}}} {api['retries']}",
+            "# HELP mini_claude_tokens_total Tokens used by API calls.",
+            "# TYPE mini_claude_tokens_total counter"
+        ]
+        for field in TOKEN_FIELDS:
+            token_type = field[:-len("_tokens")].replace("_input", "")
+            lines.append(f'mini_claude_tokens_total{{{session},type="{token_type}"}} {api[field]}')
+        tool_labels = [(f'{session},tool="{name}"', stats) for name, stats in sorted(summary["tools"].items())]
+        lines += [
+            "# HELP mini_claude_tool_calls_total Tool executions.",
+            "# TYPE mini_claude_tool_calls_total counter"
+        ]
+        lines += [f"mini_claude_tool_calls_total{{{labels}}} {stats['calls']}" for labels, stats in tool_labels]
+        lines += [
+            "# HELP mini_claude_tool_duration_seconds Time spent executing tools.",
+            "# TYPE mini_claude_tool_duration_seconds summary"
+        ]
+        for labels, stats in tool_labels:
+            lines.append(f"mini_claude_tool_duration_seconds_sum{{{labels}}} {stats['seconds']}")
+            lines.append(f"mini_claude_tool_duration_seconds_count{{{labels}}} {stats['calls']}")
+        lines += [
+            "# HELP mini_claude_tool_result_bytes_total Bytes of tool results returned to the model.",
+            "# TYPE mini_claude_tool_result_bytes_total counter"
+        ]
+        lines += [f"mini_claude_tool_result_bytes_total{{{labels}}} {stats['result_bytes']}" for labels, stats in tool_labels]
+        tier_labels = [(f'{session},tier="{name}"', stats) for name, stats in sorted(summary["tiers"].items())]
+        if tier_labels:
+            lines += [
+                "# HELP mini_claude_tier_latency_seconds Time from request to complete response, by model tier.",
+                "# TYPE mini_claude_tier_latency_seconds summary"
+            ]
+            for labels, stats in tier_labels:
+                lines.append(f"mini_claude_tier_latency_seconds_sum{{{labels}}} {stats['seconds']}")
+                lines.append(f"mini_claude_tier_latency_seconds_count{{{labels}}} {stats['calls']}")
+            lines += [
+                "# HELP mini_claude_tier_cost_dollars_total Estimated API cost, by model tier.",
+                "# TYPE mini_claude_tier_cost_dollars_total counter"
+            ]
+            lines += [f"mini_claude_tier_cost_dollars_total{{{labels}}} {stats['cost_usd']}" for labels, stats in tier_labels]
+        for group, values in sorted(summary["gauges"].items()):
+            for name, value in sorted(values.items()):
+                metric = f"mini_claude_{group}_{name}"
+                lines += [f"# TYPE {metric} gauge", f"{metric}{{{session}}} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def _write_line(self, span: Dict[str, Any]) -> None:
+        """Append one span to the JSONL file."""
+        try:
+            os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+            with open(self.jsonl_path, "a") as f:
+                f.write(json.dumps(span, default=str) + "\n")
+        except OSError as e:
+            logger.warning("Could not write telemetry to %s: %s", self.jsonl_path, e)
+            self.jsonl_path = None
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def _count(values: Iterator[Any]) -> Dict[Any, int]:
+    """Count occurrences of each value."""
+    counts: Dict[Any, int] = {}
+    for value in values:
+        counts[value] = counts.get(value, 0) + 1
+    return counts
+
+
+def serve_metrics(telemetry: Telemetry, port: int = config.TELEMETRY_METRICS_PORT, host: str = "127.0.0.1") -> Any:
+    """
+    Serve the session's metrics on /metrics from a background thread.
+
+    Args:
+        telemetry: Telemetry to expose
+        port: Port to listen on (0 picks a free port)
+        host: Interface to bind
+
+    Returns:
+        The running ThreadingHTTPServer (call shutdown() to stop it)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = telemetry.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("Metrics request: " + format, *args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info("Serving metrics on http://%s:%d/metrics", host, server.server_address[1])
+    return server
@@ -1,20 +1,33 @@
 """UI components for the agent using Rich library."""
 
+import json
+import logging
+import time
 from rich.console import Console
-from rich.markdown import Markdown
 from pprint import pformat
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import config
+from core.context import block_field, content_text
+from core.events import EventSink
+
+
+logger = logging.getLogger(__name__)
 
 
 # Global console instance
 console = Console()
 
+# rich.markdown, rich.live and rich.table (with pygments and markdown-it) are
+# imported where they are used, so the first prompt doesn't wait for them
+
 
 def show_welcome_message() -> None:
     """Display welcome message and instructions."""
     console.print("\n[bold]Baby Code Phase 1: Minimum Viable Coding Agent (Refactored)[/bold]")
-    console.print("[dim]Commands: 'quit' to exit, 'clear' to reset conversation[/dim]\n")
+    console.print(
+        "[dim]Commands: 'quit' to exit, 'clear' to reset conversation, 'stats' for session statistics, "
+        "'sessions' to list saved sessions[/dim]\n"
+    )
 
 
 def show_goodbye_message() -> None:
@@ -27,6 +40,39 @@ def show_clear_message() -> None:
     console.print("[dim]Conversation cleared.[/dim]\n")
 
 
+def show_resumed_message(session_id: str, message_count: int) -> None:
+    """
+    Display which session was resumed.
+
+    Args:
+        session_id: Session id
+        message_count: Messages in its history
+    """
+    console.print(f"[dim]Resumed session {session_id} ({message_count} messages).[/dim]\n")
+
+
+def show_sessions(sessions: List[Dict[str, Any]], current: Optional[str] = None) -> None:
+    """
+    Display saved sessions.
+
+    Args:
+        sessions: Session summaries from list_sessions()
+        current: Id of the session in use, marked in the list
+    """
+    if not sessions:
+        console.print("[dim]No saved sessions.[/dim]\n")
+        return
+    for session in sessions:
+        marker = "*" if session["session_id"] == current else " "
+        first_message = " ".join(session["first_message"].split())[:60]
+        console.print(
+            f"{marker} {session['session_id']}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(session['modified']))}  "
+            f"{session['bytes'] / 1024:8.1f}KB  {first_message}",
+            markup=False
+        )
+    console.print("[dim]Resume with: python agent.py --resume SESSION_ID[/dim]\n")
+
+
 def get_user_input() -> str:
     """
     Get user input with styled prompt.
@@ -38,6 +84,82 @@ def get_user_input() -> str:
     return input().strip()
 
 
+def show_stats(summary: Dict[str, Any]) -> None:
+    """
+    Display where the session's time and tokens went.
+
+    Args:
+        summary: Telemetry summary from Telemetry.summary()
+    """
+    api = summary["api"]
+    console.print(f"\n[bold]Session {summary['session_id']}[/bold]")
+    console.print(
+        f"{summary['runs']} requests in {summary['run_seconds']:.2f}s: "
+        f"{api['calls']} API calls ({api['seconds']:.2f}s), "
+        f"{sum(tool['calls'] for tool in summary['tools'].values())} tool calls "
+        f"({sum(tool['seconds'] for tool in summary['tools'].values()):.2f}s)"
+    )
+    if api["calls"]:
+        console.print(
+            f"API latency p50 {api['p50_latency']:.2f}s, p95 {api['p95_latency']:.2f}s"
+            + (f", time to first token {api['mean_time_to_first_token']:.2f}s avg"
+               if api["mean_time_to_first_token"] is not None else "")
+            + (f", {api['queue_seconds']:.2f}s queued for rate limits" if api["queue_seconds"] >= 0.01 else "")
+            + (f", {api['retries']} retries" if api["retries"] else "")
+        )
+        console.print(
+            f"Tokens: {api['input_tokens']} input, {api['cache_read_input_tokens']} cache read, "
+            f"{api['cache_creation_input_tokens']} cache write, {api['output_tokens']} output"
+        )
+        stop_reasons = ", ".join(f"{reason}: {count}" for reason, count in api["stop_reasons"].items())
+        console.print(f"[dim]Stop reasons: {stop_reasons}[/dim]")
+
+    if summary["tools"]:
+        from rich.table import Table
+
+        table = Table(show_edge=False)
+        for column in ("Tool", "Calls", "Cached", "Errors", "Time", "Result bytes"):
+            table.add_column(column, justify="left" if column == "Tool" else "right")
+        for name, tool in sorted(summary["tools"].items(), key=lambda item: -item[1]["seconds"]):
+            table.add_row(
+                name,
+                str(tool["calls"]),
+                str(tool["cached"]),
+                str(tool["errors"]),
+                f"{tool['seconds']:.3f}s",
+                str(tool["result_bytes"])
+            )
+        console.print(table)
+
+    for name, tier in summary.get("tiers", {}).items():
+        console.print(
+            f"Model tier {name}: {tier['calls']} calls, {tier['seconds'] / tier['calls']:.2f}s avg, "
+            f"{tier['output_tokens']} output tokens, ${tier['cost_usd']:.4f}"
+        )
+    routing = summary.get("gauges", {}).get("routing")
+    if routing and routing["escalations"]:
+        console.print(f"[dim]Escalated to a higher tier {routing['escalations']} times[/dim]")
+
+    blobs = summary.get("gauges", {}).get("blob_store")
+    if blobs and blobs["puts"]:
+        console.print(
+            f"[dim]Stored tool results: {blobs['memory_bytes'] / 1024 / 1024:.1f}MB in memory "
+            f"({blobs['memory_blobs']} blobs), {blobs['disk_bytes'] / 1024 / 1024:.1f}MB on disk "
+            f"({blobs['disk_blobs']} blobs), {blobs['deduplicated']} duplicates[/dim]"
+        )
+    console.print()
+
+
+def show_error(message: str) -> None:
+    """
+    Display an error that ended a request.
+
+    Args:
+        message: Error description
+    """
+    console.print(f"\n[bold red]Error:[/bold red] {message}\n")
+
+
 def show_agent_separator() -> None:
     """Display separator before agent response."""
     console.rule("[bold green]Agent", style="green")
@@ -51,41 +173,259 @@ def render_agent_response(text: str) -> None:
         text: Response text to render
     """
     if text:
+        from rich.markdown import Markdown
         console.print(Markdown(text))
 
 
-def show_demo_context(
-    system_prompt: str,
-    tools: List[Dict[str, Any]],
-    conversation_history: List[Dict[str, Any]]
-) -> None:
+class StreamingMarkdown:
     """
-    Display all context that will be sent to Claude in demo mode.
-    Pauses execution until the user presses Enter.
+    Render markdown incrementally as text streams in.
 
-    Args:
-        system_prompt: The system prompt
-        tools: List of tool schemas
-        conversation_history: Current conversation
+    Re-rendering markdown costs time proportional to the whole text, so
+    refreshes are throttled to at most one per refresh interval; the final
+    text is always rendered when the renderer is closed.
     """
-    console.print()
-    console.rule("[bold yellow]DEMO MODE: Context being sent to Claude[/bold yellow]", style="yellow")
 
-    # System prompt
-    console.print("\n[bold cyan]📋 SYSTEM PROMPT:[/bold cyan]")
-    console.print(f"[dim]{system_prompt}[/dim]\n")
+    def __init__(self, refresh_interval: float = config.STREAM_REFRESH_INTERVAL):
+        """
+        Initialize the renderer.
 
-    # Tools
-    console.print("[bold cyan]🛠️  AVAILABLE TOOLS:[/bold cyan]")
-    tools_formatted = pformat(tools, width=config.PFORMAT_WIDTH)
-    console.print(f"[dim]{tools_formatted}[/dim]\n")
+        Args:
+            refresh_interval: Minimum seconds between re-renders
+        """
+        self.refresh_interval = refresh_interval
+        self._parts: List[str] = []
+        self._live = None
+        self._last_refresh = 0.0
 
-    # Conversation history
-    console.print("[bold cyan]💬 CONVERSATION HISTORY:[/bold cyan]")
-    history_formatted = pformat(conversation_history, width=config.PFORMAT_WIDTH)
-    console.print(f"[dim]{history_formatted}[/dim]\n")
+    def __enter__(self) -> "StreamingMarkdown":
+        return self
 
-    console.rule(style="yellow")
-    console.print("[yellow]Press Enter to send this context to Claude...[/yellow] ", end="")
-    input()
-    console.print()
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def text(self) -> str:
+        """Text received so far."""
+        return ''.join(self._parts)
+
+    def append(self, text: str) -> None:
+        """
+        Add a chunk of streamed text, re-rendering if the throttle allows.
+
+        Args:
+            text: Text delta from the stream
+        """
+        if not text:
+            return
+        self._parts.append(text)
+        if self._live is None:
+            from rich.live import Live
+            self._live = Live(console=console, auto_refresh=False, vertical_overflow="visible")
+            self._live.start()
+        now = time.monotonic()
+        if now - self._last_refresh >= self.refresh_interval:
+            self._refresh()
+            self._last_refresh = now
+
+    def close(self) -> None:
+        """Render the complete text and stop the live display."""
+        if self._live is None:
+            return
+        self._refresh()
+        self._live.stop()
+        self._live = None
+
+    def _refresh(self) -> None:
+        from rich.markdown import Markdown
+        self._live.update(Markdown(self.text), refresh=True)
+
+
+class ConsoleSink(EventSink):
+    """Renders agent events on the console: streamed markdown, or whole responses."""
+
+    def __init__(self):
+        self._renderer = None
+
+    def on_text(self, text: str) -> None:
+        if self._renderer is None:
+            self._renderer = StreamingMarkdown()
+        self._renderer.append(text)
+
+    def on_response(self, response: Any) -> None:
+        if self._renderer is not None:
+            self._close_renderer()
+        else:
+            render_agent_response(''.join(block.text for block in response.content if hasattr(block, 'text')))
+
+    def on_error(self, error: BaseException) -> None:
+        if self._renderer is not None:
+            self._close_renderer()
+
+    def on_retry(self, reason: str) -> None:
+        if self._renderer is not None:
+            self._close_renderer()
+        console.print(f"[dim]Retrying on a larger model ({reason})...[/dim]")
+
+    def _close_renderer(self) -> None:
+        self._renderer.close()
+        self._renderer = None
+
+
+class DemoContextDisplay:
+    """
+    Shows the context sent to Claude before each API call, in demo mode.
+
+    The history is resent in full on every call, but only the messages
+    added since the previous call are shown; the system prompt and tools
+    are shown again only when they change. Long messages are cut to
+    config.DEMO_MESSAGE_MAX_CHARS and tool results are collapsed to a
+    one-line preview, so each call costs time proportional to what is new
+    rather than to the whole session.
+    """
+
+    def __init__(self, pause: bool = config.DEMO_MODE_PAUSE):
+        """
+        Initialize the display.
+
+        Args:
+            pause: Print to the console and wait for Enter before each call
+                (False = write the context to the log and carry on)
+        """
+        self.pause = pause
+        self._system_prompt: Optional[str] = None
+        self._tool_names: Optional[List[str]] = None
+        # Messages already shown, and the last of them, to spot compaction
+        self._shown = 0
+        self._last_shown: Any = None
+
+    def show(
+        self,
+        system_prompt: str,
+        tools: List[Dict[str, Any]],
+        conversation_history: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Display what is new in the context about to be sent.
+
+        Args:
+            system_prompt: The system prompt
+            tools: List of tool schemas
+            conversation_history: Current conversation
+        """
+        if not self.pause:
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Context being sent to Claude:\n%s", "\n\n".join(
+                    f"{title}:\n{body}" for title, body in self.render(system_prompt, tools, conversation_history)
+                ))
+            else:
+                self._mark_shown(conversation_history)
+            return
+
+        console.print()
+        console.rule("[bold yellow]DEMO MODE: Context being sent to Claude[/bold yellow]", style="yellow")
+        for title, body in self.render(system_prompt, tools, conversation_history):
+            console.print(f"\n[bold cyan]{title}:[/bold cyan]")
+            console.print(body, style="dim", markup=False, highlight=False)
+        console.print()
+        console.rule(style="yellow")
+        console.print("[yellow]Press Enter to send this context to Claude...[/yellow] ", end="")
+        input()
+        console.print()
+
+    def render(
+        self,
+        system_prompt: str,
+        tools: List[Dict[str, Any]],
+        conversation_history: List[Dict[str, Any]]
+    ) -> List[Tuple[str, str]]:
+        """
+        Build the display for what changed since the last call, and mark it shown.
+
+        Args:
+            system_prompt: The system prompt
+            tools: List of tool schemas
+            conversation_history: Current conversation
+
+        Returns:
+            (title, plain text body) sections
+        """
+        sections = []
+        if system_prompt != self._system_prompt:
+            sections.append(("📋 SYSTEM PROMPT", system_prompt))
+            self._system_prompt = system_prompt
+        tool_names = [tool["name"] for tool in tools]
+        if tool_names != self._tool_names:
+            sections.append(("🛠️  AVAILABLE TOOLS", pformat(tools, width=config.PFORMAT_WIDTH)))
+            self._tool_names = tool_names
+
+        start, note = self._first_unshown(conversation_history)
+        lines = [note] if note else []
+        lines += [
+            _format_message(index, message)
+            for index, message in enumerate(conversation_history[start:], start)
+        ]
+        total = len(conversation_history)
+        sections.append((
+            f"💬 CONVERSATION HISTORY ({total - start} new of {total} messages)",
+            "\n".join(lines) if lines else "(no new messages)"
+        ))
+        self._mark_shown(conversation_history)
+        return sections
+
+    def _first_unshown(self, conversation_history: List[Dict[str, Any]]) -> Tuple[int, Optional[str]]:
+        """Find the first message not shown yet, noting when the history was compacted or cleared."""
+        shown = self._shown
+        if shown <= len(conversation_history) and (shown == 0 or conversation_history[shown - 1] is self._last_shown):
+            return shown, None
+        # Compaction replaced older messages; the recent ones are kept as they were
+        for index in range(len(conversation_history) - 1, -1, -1):
+            if conversation_history[index] is self._last_shown:
+                return index + 1, f"(earlier history was compacted to {index + 1} messages)"
+        return 0, "(history was replaced; showing it from the start)" if shown else None
+
+    def _mark_shown(self, conversation_history: List[Dict[str, Any]]) -> None:
+        self._shown = len(conversation_history)
+        self._last_shown = conversation_history[-1] if conversation_history else None
+
+    def reset(self) -> None:
+        """Show everything again on the next call."""
+        self._system_prompt = None
+        self._tool_names = None
+        self._shown = 0
+        self._last_shown = None
+
+
+def _format_message(index: int, message: Dict[str, Any]) -> str:
+    """Format one history message, capping its size and collapsing tool results."""
+    content = message["content"]
+    if isinstance(content, str):
+        return f"[{index}] {message['role']}: {_cap(content, config.DEMO_MESSAGE_MAX_CHARS)}"
+
+    lines = [f"[{index}] {message['role']}:"]
+    budget = config.DEMO_MESSAGE_MAX_CHARS
+    for block in content:
+        block_type = block_field(block, "type")
+        if block_type == "text":
+            line = f"  text: {_cap(block_field(block, 'text', ''), budget)}"
+        elif block_type == "tool_use":
+            line = f"  tool_use {block_field(block, 'name')} {_cap(json.dumps(block_field(block, 'input', {})), budget)}"
+        elif block_type == "tool_result":
+            result = content_text(block_field(block, "content", ""))
+            preview = _cap(result.strip(), config.DEMO_TOOL_RESULT_PREVIEW_CHARS).replace("\n", " ⏎ ")
+            line = f"  tool_result {block_field(block, 'tool_use_id')} ({len(result)} chars): {preview}"
+        else:
+            line = f"  {block_type}"
+        lines.append(line)
+        budget = max(budget - len(line), 0)
+        if not budget:
+            lines.append("  ...")
+            break
+    return "\n".join(lines)
+
+
+def _cap(text: str, limit: int) -> str:
+    """Cut text to limit characters, saying how much was left out."""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Server mode: host agent sessions over HTTP, streaming events with SSE.
+
+Endpoints:
+    POST   /sessions                 Open a session -> {"session_id": ...}
+    GET    /sessions                 List open sessions
+    DELETE /sessions/<id>            Close a session
+    GET    /sessions/<id>/stats      Telemetry summary of a session
+    POST   /sessions/<id>/messages   Send {"message": ...}; the response is a
+                                     text/event-stream of text, tool_call,
+                                     tool_result and response events, ending
+                                     with done (or error). A retry event means
+                                     the text streamed since the last
+                                     response is discarded
+    GET    /health                   Liveness check
+
+All sessions share one pooled AsyncAnthropic client and run on one event
+loop. Tools run in the server's working directory.
+
+Usage:
+    export ANTHROPIC_API_KEY="your-key"
+    python server.py --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+from agent import create_registry
+from core.async_agent import AsyncAgent
+from core.events import QueueSink
+from core.sessions import Session, SessionPool, SessionPoolFull
+import config
+
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+
+REASONS = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    """Ends a request with an error status and JSON message."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class AgentServer:
+    """Minimal HTTP/1.1 server on asyncio streams, one request per connection."""
+
+    def __init__(self, pool: SessionPool):
+        """
+        Initialize the server.
+
+        Args:
+            pool: Sessions to serve
+        """
+        self.pool = pool
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Read one request, dispatch it and close the connection."""
+        try:
+            method, path, body = await self._read_request(reader)
+            await self._dispatch(method, path, body, writer)
+        except HTTPError as e:
+            await self._send_json(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            logger.exception("Request failed")
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        """Parse the request line, headers and JSON body."""
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        try:
+            method, path, _ = request_line.split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Malformed Content-Length header")
+        if length < 0:
+            raise HTTPError(400, "Malformed Content-Length header")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        body = None
+        if length:
+            try:
+                body = json.loads(await reader.readexactly(length))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                raise HTTPError(400, "Body is not valid JSON")
+            if not isinstance(body, dict):
+                raise HTTPError(400, "Body must be a JSON object")
+        return method, path.split("?", 1)[0].rstrip("/"), body
+
+    async def _dispatch(self, method: str, path: str, body: Optional[Dict[str, Any]], writer: asyncio.StreamWriter) -> None:
+        """Route a request to its handler."""
+        parts = path.strip("/").split("/")
+        if parts == ["health"] and method == "GET":
+            await self._send_json(writer, 200, {"status": "ok", "sessions": len(self.pool)})
+        elif parts == ["sessions"]:
+            if method == "POST":
+                try:
+                    session = self.pool.create()
+                except SessionPoolFull as e:
+                    raise HTTPError(503, str(e))
+                await self._send_json(writer, 201, {"session_id": session.id})
+            elif method == "GET":
+                await self._send_json(writer, 200, {"sessions": self.pool.list()})
+            else:
+                raise HTTPError(405, f"{method} not allowed on /sessions")
+        elif len(parts) in (2, 3) and parts[0] == "sessions":
+            session = self.pool.get(parts[1])
+            if session is None:
+                raise HTTPError(404, f"Unknown session: {parts[1]}")
+            action = parts[2] if len(parts) == 3 else None
+            if action is None and method == "DELETE":
+                if session.busy:
+                    raise HTTPError(409, "Session is handling a message")
+                self.pool.close(session.id)
+                await self._send(writer, 204, b"", "application/json")
+            elif action == "stats" and method == "GET":
+                await self._send_json(writer, 200, session.agent.telemetry.summary())
+            elif action == "messages" and method == "POST":
+                message = (body or {}).get("message")
+                if not isinstance(message, str) or not message:
+                    raise HTTPError(400, 'Body must be {"message": "..."}')
+                await self._stream_run(session, message, writer)
+            else:
+                raise HTTPError(405 if action in (None, "stats", "messages") else 404, f"{method} {path} not supported")
+        else:
+            raise HTTPError(404, f"Not found: {path}")
+
+    async def _stream_run(self, session: Session, message: str, writer: asyncio.StreamWriter) -> None:
+        """Run the agent on a message, streaming its events as server-sent events."""
+        if session.busy:
+            raise HTTPError(409, "Session is already handling a message")
+        session.running = True
+        queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        session.sink.queue = queue
+
+        async def drive() -> None:
+            try:
+                text = await session.agent.run(message)
+                queue.put_nowait({"type": "done", "text": text})
+            except Exception as e:
+                logger.exception("Session %s failed", session.id)
+                queue.put_nowait({"type": "error", "error": f"{type(e).__name__}: {e}"})
+            finally:
+                session.running = False
+                session.touch()
+                queue.put_nowait(None)
+
+        # The run finishes even if the client goes away, keeping the history consistent
+        run = asyncio.ensure_future(drive())
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n"
+        )
+        connected = True
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            if not connected:
+                continue
+            try:
+                writer.write(f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n".encode("utf-8"))
+                await writer.drain()
+            except ConnectionError:
+                connected = False
+        await run
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, data: Any) -> None:
+        await self._send(writer, status, json.dumps(data, default=str).encode("utf-8"), "application/json")
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str) -> None:
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+
+def create_session_agent(sink: QueueSink) -> AsyncAgent:
+    """Create the agent for a new session; all sessions share the pooled client."""
+    return AsyncAgent(create_registry(), events=sink)
+
+
+async def serve(host: str, port: int) -> None:
+    """Serve until cancelled."""
+    pool = SessionPool(create_session_agent)
+    server = AgentServer(pool)
+    evictor = asyncio.ensure_future(pool.run_evictor())
+    listener = await asyncio.start_server(server.handle_connection, host, port)
+    logger.info("Serving on http://%s:%d", host, port)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        evictor.cancel()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve agent sessions over HTTP with SSE streaming.")
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=config.LOGGING_LEVEL, format='[%(levelname)s] %(message)s')
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
 """Base classes for tool implementations."""
 
-from typing import Callable, Dict, Any
+import json
+import os
+import threading
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, Hashable, Iterable, List, Optional, Tuple
+
+
+# Resources a tool call reads or writes: absolute paths, or None for "anything"
+Resources = Optional[List[str]]
 
 
 class Tool:
@@ -11,7 +19,12 @@ class Tool:
         name: str,
         description: str,
         input_schema: Dict[str, Any],
-        function: Callable
+        function: Callable,
+        read_only: bool = False,
+        path_param: Optional[str] = None,
+        pure: bool = False,
+        reads: Optional[Callable[[Dict[str, Any]], Resources]] = None,
+        writes: Optional[Callable[[Dict[str, Any]], Resources]] = None
     ):
         """
         Initialize a tool.
@@ -21,11 +34,28 @@ class Tool:
             description: What the tool does
             input_schema: JSON schema describing the tool's parameters
             function: Python function to execute
+            read_only: True if the tool never modifies anything, so it can
+                run concurrently with other calls
+            path_param: Name of the input parameter holding the path the
+                tool touches, if any
+            pure: True if the result depends only on the input and the
+                resources the tool reads, so it can be memoized until one
+                of those resources is written
+            reads: Function returning the resources a call reads (defaults
+                to the path in path_param, or anything if there is none)
+            writes: Function returning the resources a call writes
+                (defaults to nothing for read-only tools, otherwise the
+                path in path_param, or anything if there is none)
         """
         self.name = name
         self.description = description
         self.input_schema = input_schema
         self.function = function
+        self.read_only = read_only
+        self.path_param = path_param
+        self.pure = pure
+        self._reads = reads
+        self._writes = writes
 
     def to_anthropic_format(self) -> Dict[str, Any]:
         """Convert tool to Anthropic API format."""
@@ -35,9 +65,203 @@ class Tool:
             "input_schema": self.input_schema
         }
 
+    def resource_path(self, tool_input: Dict[str, Any]) -> Optional[str]:
+        """
+        Get the absolute path a call to this tool touches.
+
+        Args:
+            tool_input: Parameters for the tool
+
+        Returns:
+            Normalized absolute path, or None if the tool has no path parameter
+        """
+        if self.path_param is None:
+            return None
+        default = self.input_schema.get("properties", {}).get(self.path_param, {}).get("default")
+        path = tool_input.get(self.path_param, default)
+        if not isinstance(path, str):
+            return None
+        return os.path.abspath(path)
+
+    def read_resources(self, tool_input: Dict[str, Any]) -> Resources:
+        """
+        Get the resources a call to this tool reads.
+
+        Args:
+            tool_input: Parameters for the tool
+
+        Returns:
+            Absolute paths read, or None if the call may read anything
+        """
+        if self._reads is not None:
+            return self._reads(tool_input)
+        path = self.resource_path(tool_input)
+        return None if path is None else [path]
+
+    def write_resources(self, tool_input: Dict[str, Any]) -> Resources:
+        """
+        Get the resources a call to this tool writes.
+
+        Args:
+            tool_input: Parameters for the tool
+
+        Returns:
+            Absolute paths written, or None if the call may write anything
+        """
+        if self._writes is not None:
+            return self._writes(tool_input)
+        if self.read_only:
+            return []
+        path = self.resource_path(tool_input)
+        return None if path is None else [path]
+
+    def memo_key(self, tool_input: Dict[str, Any]) -> str:
+        """
+        Get a key identifying equivalent calls, for memoization.
+
+        Schema defaults are filled in and the path parameter is made
+        absolute, so {} and {"path": "."} give the same key.
+
+        Args:
+            tool_input: Parameters for the tool
+
+        Returns:
+            Normalized JSON of the tool name and input
+        """
+        normalized = {
+            name: spec["default"]
+            for name, spec in self.input_schema.get("properties", {}).items()
+            if "default" in spec
+        }
+        normalized.update(tool_input)
+        if self.path_param is not None and isinstance(normalized.get(self.path_param), str):
+            normalized[self.path_param] = os.path.abspath(normalized[self.path_param])
+        return json.dumps([self.name, normalized], sort_keys=True, default=str)
+
     def execute(self, **kwargs) -> str:
         """Execute the tool with given parameters."""
         try:
             return self.function(**kwargs)
         except Exception as e:
             return f"Error executing {self.name}: {e}"
+
+
+class ToolSession:
+    """
+    Per-session state shared by the tools of one registry.
+
+    Tools record which tool call produced a result and from what state
+    (a fingerprint, such as a file's mtime and size), so a repeated call on
+    unchanged state can point back to the earlier result instead of
+    returning the same content again. Tools can also keep state of their own
+    that belongs to one session, such as the background jobs it started.
+    """
+
+    def __init__(self):
+        """Initialize an empty session."""
+        self._results: Dict[Hashable, Tuple[Hashable, str]] = {}
+        self._state: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def state(self, name: str, factory: Callable[[], Any]) -> Any:
+        """
+        Get a tool's state for this session, creating it on first use.
+
+        Args:
+            name: Key of the state
+            factory: Creates the state; if it has a close() method, it is
+                called when the session is closed
+
+        Returns:
+            The state
+        """
+        with self._lock:
+            if name not in self._state:
+                self._state[name] = factory()
+            return self._state[name]
+
+    def remember(self, key: Hashable, fingerprint: Hashable, tool_use_id: str) -> None:
+        """
+        Record that a tool call returned the result for key.
+
+        Args:
+            key: What was requested (e.g. tool name, path and range)
+            fingerprint: State the result was produced from
+            tool_use_id: ID of the tool call that returned it
+        """
+        with self._lock:
+            self._results[key] = (fingerprint, tool_use_id)
+
+    def recall(self, key: Hashable, fingerprint: Hashable) -> Optional[str]:
+        """
+        Find an earlier tool call that returned the same result.
+
+        Args:
+            key: What is being requested
+            fingerprint: Current state
+
+        Returns:
+            ID of the earlier tool call, or None if there is none or the
+            state has changed since
+        """
+        with self._lock:
+            entry = self._results.get(key)
+        if entry is None or entry[0] != fingerprint:
+            return None
+        return entry[1]
+
+    def forget_results(self, tool_use_ids: Iterable[str]) -> None:
+        """
+        Forget results that are no longer in the conversation.
+
+        Args:
+            tool_use_ids: IDs of tool calls whose results were removed
+        """
+        ids = set(tool_use_ids)
+        with self._lock:
+            self._results = {key: entry for key, entry in self._results.items() if entry[1] not in ids}
+
+    def clear(self) -> None:
+        """Forget everything."""
+        with self._lock:
+            self._results.clear()
+
+    def close(self) -> None:
+        """End the session: forget its results and close the tools' state, stopping whatever it started."""
+        with self._lock:
+            self._results.clear()
+            state, self._state = self._state, {}
+        for value in state.values():
+            if hasattr(value, "close"):
+                value.close()
+
+
+# Context of the tool call being executed, set by ToolRegistry.execute_tool
+current_tool_use_id: ContextVar[Optional[str]] = ContextVar("current_tool_use_id", default=None)
+current_tool_session: ContextVar[Optional[ToolSession]] = ContextVar("current_tool_session", default=None)
+
+
+def resources_overlap(a: Resources, b: Resources) -> bool:
+    """
+    Check whether two sets of resources may share a path.
+
+    Paths overlap if they are equal or one is inside the other (a directory
+    listing overlaps a write to a file in that directory).
+
+    Args:
+        a: First resources
+        b: Second resources
+
+    Returns:
+        True if the resources may overlap
+    """
+    if a == [] or b == []:
+        return False
+    if a is None or b is None:
+        return True
+    return any(_is_within(x, y) or _is_within(y, x) for x in a for y in b)
+
+
+def _is_within(path: str, ancestor: str) -> bool:
+    """Check whether path is ancestor itself or lies underneath it."""
+    return path == ancestor or path.startswith(ancestor.rstrip(os.sep) + os.sep)
@@ -0,0 +1,123 @@
+"""In-memory cache of file contents validated against file metadata."""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import config
+
+
+# (mtime in ns, size, inode) - changes whenever the file is rewritten or replaced
+FileSignature = Tuple[int, int, int]
+
+
+def file_signature(path: str) -> FileSignature:
+    """
+    Get the signature used to validate cached content.
+
+    Args:
+        path: File path
+
+    Returns:
+        (mtime_ns, size, inode) of the file
+
+    Raises:
+        OSError: If the file can't be stat'ed
+    """
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class FileCache:
+    """
+    LRU cache of file bytes keyed by absolute path.
+
+    An entry is only returned while the file's (mtime, size, inode) still
+    match the signature it was stored with, so edits made outside the
+    agent are never served stale.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = config.FILE_CACHE_MAX_BYTES,
+        max_file_bytes: int = config.FILE_CACHE_MAX_FILE_BYTES
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Total bytes kept before least recently used entries
+                are evicted
+            max_file_bytes: Larger files are never cached
+        """
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._entries: "OrderedDict[str, Tuple[FileSignature, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, signature: FileSignature) -> Optional[bytes]:
+        """
+        Get cached content if the file hasn't changed.
+
+        Args:
+            path: Absolute file path
+            signature: Current signature of the file
+
+        Returns:
+            Cached bytes, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != signature:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, path: str, signature: FileSignature, data: bytes) -> None:
+        """
+        Store file content.
+
+        Args:
+            path: Absolute file path
+            signature: Signature of the file the data was read from
+            data: File content
+        """
+        if len(data) > self.max_file_bytes:
+            return
+        with self._lock:
+            self._remove(path)
+            self._entries[path] = (signature, data)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def invalidate(self, path: str) -> None:
+        """
+        Drop a file from the cache.
+
+        Args:
+            path: Absolute file path
+        """
+        with self._lock:
+            self._remove(path)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Entry count, cached bytes, hits and misses
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+    def _remove(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._size -= len(entry[1])
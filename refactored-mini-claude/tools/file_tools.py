@@ -1,22 +1,307 @@
 """File operation tools for the agent."""
 
+import base64
+import difflib
+import fnmatch
+import json
+import mmap
+import os
+import re
+import tempfile
 from pathlib import Path
-from .base import Tool
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+import config
+from .base import Tool, ToolSession, current_tool_session, current_tool_use_id
+from .file_cache import FileCache, FileSignature, file_signature
+from .ignore import glob_to_regex, walk
+from . import search_index
+
+
+# Contents of recently read files, shared by all sessions
+file_cache = FileCache()
+
+# Room kept in read_files' byte budget for a truncated file's continuation marker
+_TRUNCATION_MARKER_BYTES = 200
 
 
 # Tool implementation functions
 
-def read_file(path: str) -> str:
-    """Read and return the contents of a file."""
+def read_file(path: str, offset: int = 0, limit: Optional[int] = None, unit: str = "lines") -> str:
+    """
+    Read and return part or all of a file.
+
+    At most config.READ_FILE_MAX_BYTES are returned per call; if more of the
+    file remains, a marker at the end says where to continue. Files of at
+    least config.READ_FILE_MMAP_THRESHOLD bytes are memory-mapped, so reading
+    a window of a huge file only touches the pages in that window. Binary
+    files are refused.
+
+    Smaller files are served from file_cache while unchanged on disk. If the
+    same range was already returned in this session and the file hasn't
+    changed since, a short reference to that tool call is returned instead
+    of the content.
+    """
+    if unit not in ("lines", "bytes"):
+        return f"Error: unit must be 'lines' or 'bytes', got: {unit}"
+    if offset < 0 or (limit is not None and limit < 0):
+        return "Error: offset and limit must not be negative"
+
+    session = current_tool_session.get()
+    read_key = ("read_file", os.path.abspath(path), offset, limit, unit)
+    if session is not None:
+        reference = _earlier_read(session, read_key, path)
+        if reference is not None:
+            return reference
+
+    result, signature = _read_path(path, offset, limit, unit)
+    tool_use_id = current_tool_use_id.get()
+    if session is not None and tool_use_id is not None and signature is not None:
+        session.remember(read_key, signature, tool_use_id)
+    return result
+
+
+def _earlier_read(session: ToolSession, read_key: tuple, path: str) -> Optional[str]:
+    """Return a reference to an earlier call that read the same unchanged range, if there is one."""
     try:
-        with open(path, 'r') as f:
-            return f.read()
+        signature = file_signature(read_key[1])
+    except OSError:
+        return None
+    earlier_call = session.recall(read_key, signature)
+    if earlier_call is None:
+        return None
+    return (
+        f"[{path} is unchanged since tool call {earlier_call}, which returned this same content. "
+        "Refer to that result instead of reading it again.]"
+    )
+
+
+def _read_path(
+    path: str,
+    offset: int,
+    limit: Optional[int],
+    unit: str,
+    max_bytes: Optional[int] = None
+) -> Tuple[str, Optional[FileSignature]]:
+    """
+    Read a range of a file through the file cache.
+
+    Returns:
+        (result text, signature of the file read) - the signature is None
+        if the result is an error
+    """
+    try:
+        key = os.path.abspath(path)
+        signature = file_signature(key)
+        data = file_cache.get(key, signature)
+        if data is not None:
+            result = _read_window(path, data, len(data), offset, limit, unit, max_bytes)
+        else:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+                if st.st_size >= config.READ_FILE_MMAP_THRESHOLD:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        result = _read_window(path, mapped, st.st_size, offset, limit, unit, max_bytes)
+                else:
+                    data = f.read()
+                    file_cache.put(key, signature, data)
+                    result = _read_window(path, data, len(data), offset, limit, unit, max_bytes)
+        if result.startswith("Error"):
+            return result, None
+        return result, signature
     except FileNotFoundError:
-        return f"Error: File not found: {path}"
+        return f"Error: File not found: {path}", None
+    except IsADirectoryError:
+        return f"Error: Is a directory: {path}", None
     except PermissionError:
-        return f"Error: Permission denied: {path}"
+        return f"Error: Permission denied: {path}", None
     except Exception as e:
-        return f"Error reading file: {e}"
+        return f"Error reading file: {e}", None
+
+
+def _read_window(
+    path: str,
+    data: Union[bytes, mmap.mmap],
+    size: int,
+    offset: int,
+    limit: Optional[int],
+    unit: str,
+    max_bytes: Optional[int] = None
+) -> str:
+    """Decode the requested window of a file's bytes, adding a truncation marker if needed."""
+    max_bytes = config.READ_FILE_MAX_BYTES if max_bytes is None else max_bytes
+    if b"\0" in data[:config.READ_FILE_BINARY_SNIFF_BYTES]:
+        return f"Error: {path} appears to be a binary file ({size} bytes); refusing to read it"
+
+    next_unit = unit
+    if unit == "bytes":
+        start = min(offset, size)
+        end = size if limit is None else min(size, start + limit)
+        end = min(end, start + max_bytes)
+    else:
+        start = _skip_lines(data, 0, offset, size)
+        end = size if limit is None else _skip_lines(data, start, limit, size)
+        if end - start > max_bytes:
+            # Cut at the last complete line that fits, if there is one
+            cap = start + max_bytes
+            last_newline = data.rfind(b"\n", start, cap)
+            if last_newline >= start:
+                end = last_newline + 1
+            else:
+                # A single line longer than the cap (minified code): continuing by lines would
+                # restart at the same line forever, so the rest is read by bytes
+                end = _char_boundary(data, start, cap)
+                next_unit = "bytes"
+
+    chunk = data[start:end]
+    text = chunk.decode("utf-8", errors="replace").replace("\r\n", "\n")
+    if end >= size:
+        return text
+
+    if next_unit == "bytes":
+        next_offset = end
+    else:
+        next_offset = offset + chunk.count(b"\n")
+    separator = "\n" if text.endswith("\n") else "\n\n"
+    return (
+        f"{text}{separator}[Truncated: returned bytes {start}-{end} of {size}. "
+        f"Call read_file with offset={next_offset} unit=\"{next_unit}\" to continue.]"
+    )
+
+
+def _char_boundary(data: Union[bytes, mmap.mmap], start: int, end: int) -> int:
+    """Move a cut back off UTF-8 continuation bytes, so it doesn't split a character."""
+    position = end
+    while position > start and end - position < 4 and data[position] & 0xC0 == 0x80:
+        position -= 1
+    return position if position > start else end
+
+
+def _skip_lines(data: Union[bytes, mmap.mmap], start: int, count: int, size: int) -> int:
+    """Return the byte position just after count newlines from start (or size)."""
+    position = start
+    for _ in range(count):
+        newline = data.find(b"\n", position)
+        if newline == -1:
+            return size
+        position = newline + 1
+    return position
+
+
+def read_files(paths: List[str], max_bytes: int = config.READ_FILES_MAX_BYTES) -> str:
+    """
+    Read several files in one call.
+
+    Entries may be file paths or glob patterns ('src/**/*.py'); globs skip
+    files hidden by .gitignore. Files are read concurrently and returned in
+    order, each in its own <file> element, with failures as <error>
+    elements. Once max_bytes of content have been returned, the remaining
+    files are listed as skipped.
+    """
+    expanded: List[str] = []
+    for entry in paths:
+        if any(char in entry for char in "*?["):
+            expanded.extend(_expand_glob(entry))
+        else:
+            expanded.append(entry)
+    expanded = list(dict.fromkeys(expanded))
+    if not expanded:
+        return "Error: No files matched"
+    if max_bytes <= 0:
+        return "Error: max_bytes must be positive"
+
+    dropped = expanded[config.READ_FILES_MAX_FILES:]
+    expanded = expanded[:config.READ_FILES_MAX_FILES]
+
+    # Files already returned unchanged in this session are only referenced
+    session = current_tool_session.get()
+    references = {}
+    if session is not None:
+        for path in expanded:
+            reference = _earlier_read(session, ("read_file", os.path.abspath(path), 0, None, "lines"), path)
+            if reference is not None:
+                references[path] = reference
+
+    to_read = [path for path in expanded if path not in references]
+    # A file cut to the budget still has to fit with its truncation marker
+    per_file_bytes = min(config.READ_FILE_MAX_BYTES, max(1, max_bytes - _TRUNCATION_MARKER_BYTES))
+    with ThreadPoolExecutor(max_workers=max(1, min(config.MAX_TOOL_WORKERS, len(to_read)))) as pool:
+        read = dict(zip(to_read, pool.map(lambda path: _read_path(path, 0, None, "lines", per_file_bytes), to_read)))
+
+    tool_use_id = current_tool_use_id.get()
+    parts = []
+    remaining = max_bytes
+    skipped = []
+    errors = 0
+    for path in expanded:
+        if path in references:
+            parts.append(f'<file path="{path}">\n{references[path]}\n</file>')
+            continue
+        result, signature = read[path]
+        if signature is None:
+            errors += 1
+            parts.append(f'<error path="{path}">{result}</error>')
+            continue
+        size = len(result.encode("utf-8"))
+        if size > remaining and remaining < max_bytes:
+            skipped.append(path)
+            continue
+        # The first file is returned even if a tiny budget can't hold its marker
+        remaining -= min(size, remaining)
+        parts.append(f'<file path="{path}">\n{result}\n</file>')
+        # Only remembered if read_file would return the same content, i.e. not cut to a smaller budget
+        same_as_read_file = per_file_bytes == config.READ_FILE_MAX_BYTES or signature[1] <= per_file_bytes
+        if session is not None and tool_use_id is not None and same_as_read_file:
+            session.remember(("read_file", os.path.abspath(path), 0, None, "lines"), signature, tool_use_id)
+
+    summary = f"Read {len(expanded) - errors - len(skipped)} of {len(expanded)} files ({max_bytes - remaining} bytes)"
+    if errors:
+        summary += f", {errors} failed"
+    parts.insert(0, summary)
+    if skipped:
+        parts.append(
+            f"[Byte budget of {max_bytes} reached; not returned: {', '.join(skipped)}. "
+            "Read them separately or in a smaller batch.]"
+        )
+    if dropped:
+        parts.append(f"[Only the first {config.READ_FILES_MAX_FILES} files were read; not read: {', '.join(dropped)}]")
+    return "\n".join(parts)
+
+
+def _expand_glob(pattern: str) -> List[str]:
+    """Find the files matching a glob, walking from its non-glob leading directories."""
+    base, rest = _split_glob(pattern)
+    regex = re.compile(glob_to_regex(rest))
+    if not os.path.isdir(base):
+        return []
+    return [
+        os.path.join(base, relpath) if base != "." else relpath
+        for relpath, entry, _ in walk(base)
+        if entry.is_file() and regex.fullmatch(relpath)
+    ]
+
+
+def _split_glob(pattern: str) -> Tuple[str, str]:
+    """Split a glob into its leading directories without wildcards and the rest."""
+    parts = pattern.split("/")
+    base_parts = []
+    for part in parts[:-1]:
+        if any(char in part for char in "*?["):
+            break
+        base_parts.append(part)
+    base = "/".join(base_parts) or ("/" if pattern.startswith("/") else ".")
+    return base, "/".join(parts[len(base_parts):])
+
+
+def _read_files_resources(tool_input: Dict[str, Any]) -> List[str]:
+    """Get the paths read_files reads: each file, or the directory a glob walks."""
+    resources = []
+    for entry in tool_input.get("paths", []):
+        if any(char in entry for char in "*?["):
+            entry = _split_glob(entry)[0]
+        resources.append(os.path.abspath(entry))
+    return resources
 
 
 def write_file(path: str, content: str) -> str:
@@ -26,6 +311,8 @@ def write_file(path: str, content: str) -> str:
         Path(path).parent.mkdir(parents=True, exist_ok=True)
         with open(path, 'w') as f:
             f.write(content)
+        file_cache.invalidate(os.path.abspath(path))
+        search_index.notify_changed(path)
         return f"Successfully wrote to {path}"
     except PermissionError:
         return f"Error: Permission denied: {path}"
@@ -33,45 +320,266 @@ def write_file(path: str, content: str) -> str:
         return f"Error writing file: {e}"
 
 
-def list_files(path: str = ".") -> str:
-    """List files and directories in the given path."""
+def edit_file(
+    path: str,
+    old_string: Optional[str] = None,
+    new_string: Optional[str] = None,
+    replace_all: bool = False,
+    diff: Optional[str] = None
+) -> str:
+    """
+    Edit part of a file without rewriting all of it.
+
+    Either replaces old_string with new_string (old_string must occur exactly
+    once unless replace_all is set) or applies a unified diff whose hunks
+    must each match exactly one place. The file is replaced atomically and
+    only a short diff of the change is returned.
+    """
+    if diff is None and old_string is None:
+        return "Error: Provide either old_string and new_string, or diff"
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            original = f.read()
+
+        if diff is not None:
+            updated = _apply_unified_diff(original, diff)
+        else:
+            updated = _replace_string(original, old_string, new_string or "", replace_all)
+
+        if updated == original:
+            return f"No changes made to {path}"
+        _atomic_write(path, updated)
+        file_cache.invalidate(os.path.abspath(path))
+        search_index.notify_changed(path)
+        return _diff_summary(path, original, updated)
+    except FileNotFoundError:
+        return f"Error: File not found: {path}"
+    except PermissionError:
+        return f"Error: Permission denied: {path}"
+    except UnicodeDecodeError:
+        return f"Error: {path} is not a UTF-8 text file"
+    except ValueError as e:
+        return f"Error: {e}"
+    except Exception as e:
+        return f"Error editing file: {e}"
+
+
+def _replace_string(content: str, old_string: str, new_string: str, replace_all: bool) -> str:
+    """Replace old_string in content, requiring a unique match unless replace_all is set."""
+    if not old_string:
+        raise ValueError("old_string must not be empty")
+    if old_string not in content and "\r\n" in content:
+        # The model writes \n; match files with Windows line endings too
+        old_string = old_string.replace("\n", "\r\n")
+        new_string = new_string.replace("\n", "\r\n")
+
+    count = content.count(old_string)
+    if count == 0:
+        raise ValueError("old_string was not found in the file")
+    if count > 1 and not replace_all:
+        raise ValueError(
+            f"old_string matches {count} places; include more surrounding context to make it unique, "
+            "or set replace_all"
+        )
+    return content.replace(old_string, new_string)
+
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+
+def _apply_unified_diff(content: str, diff: str) -> str:
+    """
+    Apply a unified diff to content.
+
+    Each hunk's context and removed lines must match exactly one place in
+    the file, or the place named in its header if they match several.
+    """
+    lines = content.split("\n")
+    hunks: List[tuple] = []
+    current = None
+    for line in diff.splitlines():
+        header = _HUNK_HEADER.match(line)
+        if header:
+            current = (int(header.group(1)), [], [])
+            hunks.append(current)
+        elif current is None or line.startswith("\\"):
+            # File headers before the first hunk, "\ No newline at end of file"
+            continue
+        elif line.startswith("-"):
+            current[1].append(line[1:])
+        elif line.startswith("+"):
+            current[2].append(line[1:])
+        elif line.startswith(" ") or line == "":
+            current[1].append(line[1:])
+            current[2].append(line[1:])
+        else:
+            raise ValueError(f"Malformed diff line: {line!r}")
+    if not hunks:
+        raise ValueError("diff contains no hunks")
+
+    offset = 0
+    for number, (start, old_lines, new_lines) in enumerate(hunks, 1):
+        expected = max(start - 1 + offset, 0)
+        if not old_lines:
+            position = expected
+        else:
+            matches = [
+                i for i in range(len(lines) - len(old_lines) + 1)
+                if lines[i:i + len(old_lines)] == old_lines
+            ]
+            if not matches:
+                raise ValueError(f"Hunk {number} does not match the file")
+            if len(matches) > 1 and expected not in matches:
+                raise ValueError(f"Hunk {number} matches {len(matches)} places; add more context lines")
+            position = expected if len(matches) > 1 else matches[0]
+        lines[position:position + len(old_lines)] = new_lines
+        offset += len(new_lines) - len(old_lines)
+    return "\n".join(lines)
+
+
+def _atomic_write(path: str, content: str) -> None:
+    """Write content to a temporary file next to path and move it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    mode = os.stat(path).st_mode & 0o7777
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _diff_summary(path: str, original: str, updated: str) -> str:
+    """Summarize an edit as line counts plus a short unified diff."""
+    diff_lines = list(difflib.unified_diff(
+        original.splitlines(), updated.splitlines(), fromfile=path, tofile=path, lineterm="", n=1
+    ))[2:]
+    added = sum(1 for line in diff_lines if line.startswith("+"))
+    removed = sum(1 for line in diff_lines if line.startswith("-"))
+    limit = config.EDIT_DIFF_MAX_LINES
+    if len(diff_lines) > limit:
+        diff_lines = diff_lines[:limit] + [f"[... {len(diff_lines) - limit} more diff lines]"]
+    return f"Edited {path}: +{added} -{removed} lines\n" + "\n".join(diff_lines)
+
+
+def list_files(
+    path: str = ".",
+    recursive: bool = False,
+    max_depth: Optional[int] = None,
+    pattern: Optional[str] = None,
+    include_ignored: bool = False,
+    cursor: Optional[str] = None
+) -> str:
+    """
+    List files and directories in the given path.
+
+    Entries hidden by .gitignore or config.DEFAULT_EXCLUDES are skipped
+    unless include_ignored is set. At most config.LIST_FILES_PAGE_SIZE
+    entries are returned per call, followed by a cursor to continue from.
+    """
     try:
+        if not os.path.isdir(path):
+            if os.path.exists(path):
+                return f"Error: Not a directory: {path}"
+            return f"Error: Directory not found: {path}"
+
+        after = None
+        if cursor:
+            after = _decode_cursor(cursor, path)
+            if after is None:
+                return f"Error: Invalid cursor for {path}"
+
+        depth = max_depth if recursive else 1
         entries = []
-        p = Path(path)
-        for entry in sorted(p.iterdir()):
-            if entry.is_dir():
-                entries.append(f"[DIR]  {entry.name}/")
-            else:
-                entries.append(f"[FILE] {entry.name}")
+        last = None
+        for relpath, entry, _ in walk(path, max_depth=depth, include_ignored=include_ignored, after=after):
+            is_dir = entry.is_dir()
+            if pattern and (is_dir or not _glob_match(relpath, pattern)):
+                continue
+            if len(entries) == config.LIST_FILES_PAGE_SIZE:
+                entries.append(
+                    f"[... more entries; call list_files again with the same arguments and "
+                    f"cursor=\"{_encode_cursor(path, last)}\" to continue]"
+                )
+                break
+            entries.append(f"[DIR]  {relpath}/" if is_dir else f"[FILE] {relpath}")
+            last = relpath
+
         if not entries:
-            return f"Directory is empty: {path}"
+            if cursor:
+                return f"No more entries in: {path}"
+            return f"No matching files in: {path}" if pattern else f"Directory is empty: {path}"
         return "\n".join(entries)
-    except FileNotFoundError:
-        return f"Error: Directory not found: {path}"
-    except NotADirectoryError:
-        return f"Error: Not a directory: {path}"
     except PermissionError:
         return f"Error: Permission denied: {path}"
     except Exception as e:
         return f"Error listing directory: {e}"
 
 
+def _glob_match(relpath: str, pattern: str) -> bool:
+    """Match a glob against the relative path, or just the file name if the glob has no /."""
+    return fnmatch.fnmatch(relpath if "/" in pattern else relpath.rsplit("/", 1)[-1], pattern)
+
+
+def _encode_cursor(path: str, after: str) -> str:
+    """Build a list_files continuation cursor."""
+    payload = json.dumps({"root": os.path.abspath(path), "after": after})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_cursor(cursor: str, path: str) -> Optional[str]:
+    """Get the last listed path from a cursor, or None if it is invalid or for another directory."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        return None
+    if not isinstance(payload, dict) or payload.get("root") != os.path.abspath(path):
+        return None
+    return payload.get("after")
+
+
 # Tool definitions
 
 read_file_tool = Tool(
     name="read_file",
-    description="Read the contents of a file at the given path. Returns the file content as a string.",
+    description=(
+        "Read the contents of a file at the given path. Returns the file content as a string. "
+        "Large files are truncated with a marker saying which offset to continue from; "
+        "use offset and limit to read a specific range. Binary files are refused."
+    ),
     input_schema={
         "type": "object",
         "properties": {
             "path": {
                 "type": "string",
                 "description": "The path to the file to read"
+            },
+            "offset": {
+                "type": "integer",
+                "description": "Number of lines (or bytes) to skip from the start of the file",
+                "default": 0
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of lines (or bytes) to read (defaults to the rest of the file)"
+            },
+            "unit": {
+                "type": "string",
+                "enum": ["lines", "bytes"],
+                "description": "Whether offset and limit count lines or bytes",
+                "default": "lines"
             }
         },
         "required": ["path"]
     },
-    function=read_file
+    function=read_file,
+    read_only=True,
+    path_param="path"
 )
 
 write_file_tool = Tool(
@@ -91,12 +599,85 @@ write_file_tool = Tool(
         },
         "required": ["path", "content"]
     },
-    function=write_file
+    function=write_file,
+    path_param="path"
+)
+
+read_files_tool = Tool(
+    name="read_files",
+    description=(
+        "Read several files in one call instead of calling read_file repeatedly. "
+        "Entries can be paths or glob patterns such as 'src/**/*.py'. Each file is returned in a "
+        "<file path=...> element (capped like read_file), failures in <error> elements. "
+        "Stops adding files once the byte budget is used up and lists the ones it skipped."
+    ),
+    input_schema={
+        "type": "object",
+        "properties": {
+            "paths": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "File paths and/or glob patterns to read"
+            },
+            "max_bytes": {
+                "type": "integer",
+                "description": "Total bytes of file content to return",
+                "default": config.READ_FILES_MAX_BYTES
+            }
+        },
+        "required": ["paths"]
+    },
+    function=read_files,
+    read_only=True,
+    reads=_read_files_resources
+)
+
+edit_file_tool = Tool(
+    name="edit_file",
+    description=(
+        "Edit part of an existing file instead of rewriting it with write_file. Either give "
+        "old_string (copied exactly from the file, including indentation, with enough context to "
+        "match only one place) and new_string, or give a unified diff. Returns a short diff of the change."
+    ),
+    input_schema={
+        "type": "object",
+        "properties": {
+            "path": {
+                "type": "string",
+                "description": "The path to the file to edit"
+            },
+            "old_string": {
+                "type": "string",
+                "description": "Exact text to replace; must occur exactly once unless replace_all is set"
+            },
+            "new_string": {
+                "type": "string",
+                "description": "Text to replace old_string with"
+            },
+            "replace_all": {
+                "type": "boolean",
+                "description": "Replace every occurrence of old_string",
+                "default": False
+            },
+            "diff": {
+                "type": "string",
+                "description": "Unified diff to apply instead of old_string/new_string"
+            }
+        },
+        "required": ["path"]
+    },
+    function=edit_file,
+    path_param="path"
 )
 
 list_files_tool = Tool(
     name="list_files",
-    description="List all files and directories in the given directory path.",
+    description=(
+        "List all files and directories in the given directory path. "
+        "Set recursive to list a whole tree in one call. Entries ignored by .gitignore and "
+        "directories such as .git and node_modules are skipped. Long listings end with a cursor "
+        "to pass back for the next page."
+    ),
     input_schema={
         "type": "object",
         "properties": {
@@ -104,14 +685,39 @@ list_files_tool = Tool(
                 "type": "string",
                 "description": "The directory path to list (defaults to current directory)",
                 "default": "."
+            },
+            "recursive": {
+                "type": "boolean",
+                "description": "List subdirectories recursively",
+                "default": False
+            },
+            "max_depth": {
+                "type": "integer",
+                "description": "With recursive, the deepest level to list (1 = this directory only)"
+            },
+            "pattern": {
+                "type": "string",
+                "description": "Only list files matching this glob, e.g. '*.py' or 'src/**/*.ts'"
+            },
+            "include_ignored": {
+                "type": "boolean",
+                "description": "Also list entries hidden by .gitignore and the default excludes",
+                "default": False
+            },
+            "cursor": {
+                "type": "string",
+                "description": "Cursor from a previous truncated listing, to get the next page"
             }
         },
         "required": []
     },
-    function=list_files
+    function=list_files,
+    read_only=True,
+    path_param="path",
+    pure=True
 )
 
 
 def get_file_tools() -> list[Tool]:
     """Get all file operation tools."""
-    return [read_file_tool, write_file_tool, list_files_tool]
+    return [read_file_tool, read_files_tool, write_file_tool, edit_file_tool, list_files_tool]
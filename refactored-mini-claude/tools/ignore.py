@@ -0,0 +1,220 @@
+"""Directory walking that honours .gitignore files and default excludes."""
+
+import os
+import re
+from typing import Iterator, List, Optional, Pattern, Tuple
+import config
+
+
+class IgnoreRules:
+    """Patterns from one .gitignore file."""
+
+    def __init__(self, base: str, lines: List[str], prefix: str = ""):
+        """
+        Parse .gitignore lines.
+
+        Args:
+            base: Directory the .gitignore lives in, relative to the walk
+                root ("" for the root itself); anchored patterns are
+                relative to it
+            lines: Lines of the .gitignore file
+            prefix: For a .gitignore above the walk root, the root's path
+                relative to the .gitignore's directory
+        """
+        self.base = base
+        self.prefix = prefix
+        self._patterns: List[Tuple[Pattern, bool, bool, bool]] = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if line:
+                self._patterns.append((re.compile(glob_to_regex(line)), negate, dir_only, anchored))
+
+    @classmethod
+    def load(cls, directory: str, base: str, prefix: str = "") -> Optional["IgnoreRules"]:
+        """
+        Load the .gitignore in a directory, if it has one.
+
+        Args:
+            directory: Directory to look in
+            base: The directory's path relative to the walk root
+            prefix: See __init__
+
+        Returns:
+            Parsed rules, or None if there is no readable .gitignore
+        """
+        try:
+            with open(os.path.join(directory, ".gitignore"), "r", errors="replace") as f:
+                return cls(base, f.readlines(), prefix)
+        except OSError:
+            return None
+
+    def match(self, relpath: str, is_dir: bool) -> Optional[bool]:
+        """
+        Check a path against these rules.
+
+        Args:
+            relpath: Path relative to the walk root, with / separators
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if ignored, False if re-included by a negated pattern,
+            None if no pattern matches
+        """
+        if self.prefix:
+            relpath = f"{self.prefix}/{relpath}"
+        if self.base:
+            if not relpath.startswith(self.base + "/"):
+                return None
+            relpath = relpath[len(self.base) + 1:]
+        name = relpath.rsplit("/", 1)[-1]
+
+        result = None
+        for regex, negate, dir_only, anchored in self._patterns:
+            if dir_only and not is_dir:
+                continue
+            if regex.fullmatch(relpath if anchored else name):
+                result = not negate
+        return result
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translate a gitignore-style glob into a regular expression.
+
+    * and ? don't match /, ** matches any number of directories.
+
+    Args:
+        pattern: Glob pattern
+
+    Returns:
+        Regular expression source, to be matched with fullmatch
+    """
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            regex.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            regex.append("[" + pattern[i + 1:end].replace("!", "^", 1) + "]")
+            i = end + 1
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(regex)
+
+
+def _ancestor_rules(root: str) -> List[IgnoreRules]:
+    """
+    Load .gitignore files from the directories above root, up to its git repository root.
+
+    Their patterns are rewritten to apply relative to root.
+    """
+    ancestors = []
+    directory = root
+    while True:
+        parent = os.path.dirname(directory)
+        if os.path.isdir(os.path.join(directory, ".git")) or parent == directory:
+            break
+        ancestors.append(parent)
+        directory = parent
+    if not ancestors or not os.path.isdir(os.path.join(ancestors[-1], ".git")):
+        # root is not inside a git repository
+        return []
+
+    rules = []
+    for ancestor in reversed(ancestors):
+        loaded = IgnoreRules.load(ancestor, "", os.path.relpath(root, ancestor).replace(os.sep, "/"))
+        if loaded is not None:
+            rules.append(loaded)
+    return rules
+
+
+def walk(
+    root: str,
+    max_depth: Optional[int] = None,
+    include_ignored: bool = False,
+    after: Optional[str] = None
+) -> Iterator[Tuple[str, os.DirEntry, int]]:
+    """
+    Walk a directory tree depth-first in sorted order.
+
+    Uses os.scandir so the file type comes from the directory entry instead
+    of a stat call per path. Symlinked directories are listed but not
+    descended into.
+
+    Args:
+        root: Directory to walk
+        max_depth: Deepest level to list (1 = root's own entries only)
+        include_ignored: List entries that .gitignore or the default
+            excludes would hide
+        after: Relative path of the last entry already seen; the walk
+            resumes after it without descending into subtrees that
+            lie entirely before it
+
+    Yields:
+        (path relative to root with / separators, directory entry, depth)
+    """
+    after_parts = tuple(after.split("/")) if after else None
+    excludes = set(config.DEFAULT_EXCLUDES)
+    base_rules = [] if include_ignored else _ancestor_rules(os.path.abspath(root))
+
+    def is_ignored(relpath: str, name: str, is_dir: bool, rules: List[IgnoreRules]) -> bool:
+        if name in excludes:
+            return True
+        ignored = False
+        for rule_set in rules:
+            matched = rule_set.match(relpath, is_dir)
+            if matched is not None:
+                ignored = matched
+        return ignored
+
+    def visit(directory: str, prefix: Tuple[str, ...], depth: int, rules: List[IgnoreRules]):
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except (PermissionError, FileNotFoundError, NotADirectoryError):
+            return
+
+        if not include_ignored and any(entry.name == ".gitignore" for entry in entries):
+            loaded = IgnoreRules.load(directory, "/".join(prefix))
+            if loaded is not None:
+                rules = rules + [loaded]
+
+        for entry in entries:
+            parts = prefix + (entry.name,)
+            is_dir = entry.is_dir()
+            relpath = "/".join(parts)
+            if not include_ignored and is_ignored(relpath, entry.name, is_dir, rules):
+                continue
+
+            inside_after = after_parts is not None and after_parts[:len(parts)] == parts
+            if after_parts is None or parts > after_parts:
+                yield relpath, entry, depth
+            elif not inside_after:
+                # This entry and everything under it come before the cursor
+                continue
+
+            if is_dir and not entry.is_symlink() and (max_depth is None or depth < max_depth):
+                yield from visit(entry.path, parts, depth + 1, rules)
+
+    yield from visit(root, (), 1, base_rules)
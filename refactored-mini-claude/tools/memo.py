@@ -0,0 +1,104 @@
+"""Memoization of pure tool results."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import config
+from .base import Resources, resources_overlap
+
+
+class ToolMemo:
+    """
+    LRU cache of tool results with a time-to-live.
+
+    Each entry remembers the resources the call read, so a later call that
+    writes one of them evicts it.
+    """
+
+    def __init__(self, max_entries: int = config.TOOL_MEMO_MAX_ENTRIES, ttl: float = config.TOOL_MEMO_TTL):
+        """
+        Initialize the memo.
+
+        Args:
+            max_entries: Entries kept before least recently used ones are evicted
+            ttl: Seconds an entry stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, float, Resources]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a memoized result.
+
+        Args:
+            key: Call key from Tool.memo_key
+
+        Returns:
+            The result, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, result: str, reads: Resources) -> None:
+        """
+        Memoize a result.
+
+        Args:
+            key: Call key from Tool.memo_key
+            result: Tool result
+            reads: Resources the call read
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (result, time.monotonic() + self.ttl, reads)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, writes: Resources) -> None:
+        """
+        Drop entries that read any of the written resources.
+
+        Args:
+            writes: Resources a call wrote (None = anything)
+        """
+        with self._lock:
+            stale = [key for key, (_, _, reads) in self._entries.items() if resources_overlap(reads, writes)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get memo statistics.
+
+        Returns:
+            Hits, misses, invalidations and current entry count
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries)
+            }
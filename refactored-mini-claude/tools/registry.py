@@ -1,7 +1,19 @@
 """Tool registry for managing available tools."""
 
-from typing import Dict, List, Any
-from .base import Tool
+import functools
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from .base import Tool, ToolSession, Resources, current_tool_session, current_tool_use_id, resources_overlap
+from .memo import ToolMemo
+
+
+# A pending tool call: (tool_use_id, tool name, tool input)
+ToolCall = Tuple[str, str, Dict[str, Any]]
+
+# Called after each execution with (tool name, wall-clock start, duration in
+# seconds, result, whether the result came from the memo)
+ExecutionListener = Callable[[str, float, float, str, bool], None]
 
 
 class ToolRegistry:
@@ -10,6 +22,9 @@ class ToolRegistry:
     def __init__(self):
         """Initialize an empty tool registry."""
         self._tools: Dict[str, Tool] = {}
+        self.session = ToolSession()
+        self.memo = ToolMemo()
+        self.on_execute: Optional[ExecutionListener] = None
 
     def register(self, tool: Tool) -> None:
         """
@@ -35,13 +50,20 @@ class ToolRegistry:
         """
         return self._tools[name]
 
-    def execute_tool(self, name: str, tool_input: Dict[str, Any]) -> str:
+    def execute_tool(self, name: str, tool_input: Dict[str, Any], tool_use_id: Optional[str] = None) -> str:
         """
         Execute a tool by name.
 
+        While the tool runs, current_tool_use_id and current_tool_session
+        are set so the tool can refer back to earlier calls.
+
+        Results of pure tools are memoized until a call writes one of the
+        resources they read. Every execution is reported to on_execute.
+
         Args:
             name: Tool name
             tool_input: Parameters for the tool
+            tool_use_id: ID of the tool_use block being executed, if any
 
         Returns:
             Tool execution result
@@ -50,7 +72,190 @@ class ToolRegistry:
             return f"Error: Unknown tool: {name}"
 
         tool = self._tools[name]
-        return tool.execute(**tool_input)
+        start = time.time()
+        started = time.perf_counter()
+        memo_key = tool.memo_key(tool_input) if tool.pure else None
+        if memo_key is not None:
+            cached = self.memo.get(memo_key)
+            if cached is not None:
+                self._notify(name, start, time.perf_counter() - started, cached, True)
+                return cached
+
+        session_token = current_tool_session.set(self.session)
+        call_token = current_tool_use_id.set(tool_use_id)
+        try:
+            result = tool.execute(**tool_input)
+        finally:
+            current_tool_use_id.reset(call_token)
+            current_tool_session.reset(session_token)
+
+        writes = tool.write_resources(tool_input)
+        if writes != []:
+            self.memo.invalidate(writes)
+        if memo_key is not None and not result.startswith("Error"):
+            self.memo.put(memo_key, result, tool.read_resources(tool_input))
+        self._notify(name, start, time.perf_counter() - started, result, False)
+        return result
+
+    def _notify(self, name: str, start: float, duration: float, result: str, cached: bool) -> None:
+        """Report an execution to the on_execute listener, if there is one."""
+        if self.on_execute is not None:
+            self.on_execute(name, start, duration, result, cached)
+
+    def execute_tools(self, tool_calls: List[ToolCall], max_workers: int = 1) -> List[str]:
+        """
+        Execute a batch of tool calls, running independent calls concurrently.
+
+        Calls are split into lanes. Calls where one writes a resource the
+        other reads or writes share a lane and run in their original order;
+        separate lanes run in parallel on a bounded thread pool.
+
+        Args:
+            tool_calls: Calls from one model turn, in the order they were made
+            max_workers: Maximum number of lanes to run at once (1 = sequential)
+
+        Returns:
+            Tool results, in the same order as tool_calls
+        """
+        results: List[str] = [""] * len(tool_calls)
+
+        def run_lane(lane: List[int]) -> None:
+            for index in lane:
+                tool_use_id, name, tool_input = tool_calls[index]
+                results[index] = self.execute_tool(name, tool_input, tool_use_id)
+
+        lanes = self._plan_lanes(tool_calls)
+        if max_workers <= 1 or len(lanes) <= 1:
+            for lane in lanes:
+                run_lane(lane)
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(lanes))) as pool:
+            # list() re-raises any unexpected exception from a lane
+            list(pool.map(run_lane, lanes))
+        return results
+
+    async def execute_tool_async(
+        self,
+        name: str,
+        tool_input: Dict[str, Any],
+        tool_use_id: Optional[str] = None,
+        executor: Optional[Executor] = None
+    ) -> str:
+        """
+        Execute a tool by name without blocking the event loop.
+
+        Tools whose function is a coroutine function are awaited directly;
+        blocking tools run in an executor.
+
+        Args:
+            name: Tool name
+            tool_input: Parameters for the tool
+            tool_use_id: ID of the tool_use block being executed, if any
+            executor: Executor for blocking tools (defaults to the loop's
+                default thread pool)
+
+        Returns:
+            Tool execution result
+        """
+        # Imported here so the synchronous REPL doesn't pay for asyncio at startup
+        import asyncio
+
+        tool = self._tools.get(name)
+        if tool is not None and asyncio.iscoroutinefunction(tool.function):
+            session_token = current_tool_session.set(self.session)
+            call_token = current_tool_use_id.set(tool_use_id)
+            try:
+                return await tool.function(**tool_input)
+            except Exception as e:
+                return f"Error executing {tool.name}: {e}"
+            finally:
+                current_tool_use_id.reset(call_token)
+                current_tool_session.reset(session_token)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor,
+            functools.partial(self.execute_tool, name, tool_input, tool_use_id)
+        )
+
+    async def execute_tools_async(
+        self,
+        tool_calls: List[ToolCall],
+        executor: Optional[Executor] = None
+    ) -> List[str]:
+        """
+        Execute a batch of tool calls concurrently without blocking the event loop.
+
+        Uses the same lanes as execute_tools, so conflicting calls still
+        run in their original order.
+
+        Args:
+            tool_calls: Calls from one model turn, in the order they were made
+            executor: Executor for blocking tools
+
+        Returns:
+            Tool results, in the same order as tool_calls
+        """
+        import asyncio
+
+        results: List[str] = [""] * len(tool_calls)
+
+        async def run_lane(lane: List[int]) -> None:
+            for index in lane:
+                tool_use_id, name, tool_input = tool_calls[index]
+                results[index] = await self.execute_tool_async(name, tool_input, tool_use_id, executor)
+
+        await asyncio.gather(*(run_lane(lane) for lane in self._plan_lanes(tool_calls)))
+        return results
+
+    def _plan_lanes(self, tool_calls: List[ToolCall]) -> List[List[int]]:
+        """
+        Group tool calls into lanes that must each run sequentially.
+
+        Args:
+            tool_calls: Calls from one model turn
+
+        Returns:
+            Lists of call indices, each sorted in original call order
+        """
+        lanes: List[List[int]] = []
+        accesses: List[List[Tuple[Resources, Resources]]] = []
+
+        for index, (_, name, tool_input) in enumerate(tool_calls):
+            tool = self._tools.get(name)
+            if tool is None:
+                # Unknown tools just return an error, they can't conflict
+                lanes.append([index])
+                accesses.append([])
+                continue
+
+            access = (tool.read_resources(tool_input), tool.write_resources(tool_input))
+            conflicting = [
+                i for i, lane_accesses in enumerate(accesses)
+                if any(_conflicts(access, other) for other in lane_accesses)
+            ]
+
+            # Merge every lane this call conflicts with, keeping call order
+            merged = [index]
+            merged_accesses = [access]
+            for i in reversed(conflicting):
+                merged.extend(lanes.pop(i))
+                merged_accesses.extend(accesses.pop(i))
+            lanes.append(sorted(merged))
+            accesses.append(merged_accesses)
+
+        lanes.sort(key=lambda lane: lane[0])
+        return lanes
+
+    def memo_stats(self) -> Dict[str, int]:
+        """
+        Get memoization statistics.
+
+        Returns:
+            Hits, misses, invalidations and current entry count
+        """
+        return self.memo.stats()
 
     def get_tool_schemas(self) -> List[Dict[str, Any]]:
         """
@@ -69,3 +274,23 @@ class ToolRegistry:
             List of tool names
         """
         return list(self._tools.keys())
+
+
+def _conflicts(a: Tuple[Resources, Resources], b: Tuple[Resources, Resources]) -> bool:
+    """
+    Check whether two tool calls must keep their relative order.
+
+    Args:
+        a: (reads, writes) of the first call
+        b: (reads, writes) of the second call
+
+    Returns:
+        True if either call writes something the other reads or writes
+    """
+    reads_a, writes_a = a
+    reads_b, writes_b = b
+    return (
+        resources_overlap(writes_a, reads_b)
+        or resources_overlap(writes_a, writes_b)
+        or resources_overlap(writes_b, reads_a)
+    )
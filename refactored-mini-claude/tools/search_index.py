@@ -0,0 +1,354 @@
+"""Persistent trigram index for fast code search.
+
+Every text file under a root directory is broken into the set of 3-byte
+sequences (trigrams) it contains, case-folded. A query can only match a file
+that contains every trigram of the literal text the query requires, so
+intersecting the posting lists of those trigrams narrows 100k files down to
+a handful of candidates, which are then scanned for real.
+
+The index is stored on disk and updated incrementally: only files whose
+(mtime, size) changed since the last refresh are re-read.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import config
+from .ignore import walk
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+
+def trigrams(data: bytes) -> Set[int]:
+    """
+    Get the case-folded trigrams in some bytes.
+
+    Args:
+        data: Text bytes
+
+    Returns:
+        Set of trigrams, each packed into an int
+    """
+    data = data.lower()
+    return {(a << 16) | (b << 8) | c for a, b, c in zip(data, data[1:], data[2:])}
+
+
+def required_literals(query: str, is_regex: bool) -> List[str]:
+    """
+    Get literal strings that any match of the query must contain.
+
+    For a regex this is conservative: only runs of plain characters at the
+    top level of the pattern are used, anything else just ends the run.
+
+    Args:
+        query: Search query
+        is_regex: Whether the query is a regular expression
+
+    Returns:
+        Literal strings (each at least 3 characters long)
+    """
+    if not is_regex:
+        return [query] if len(query) >= 3 else []
+
+    try:
+        parsed = sre_parse.parse(query)
+    except re.error:
+        return []
+    if any(op is sre_parse.BRANCH for op, _ in parsed):
+        return []
+
+    literals = []
+    run = []
+    for op, value in parsed:
+        if op is sre_parse.LITERAL:
+            run.append(chr(value))
+            continue
+        if len(run) >= 3:
+            literals.append("".join(run))
+        run = []
+    if len(run) >= 3:
+        literals.append("".join(run))
+    return literals
+
+
+class TrigramIndex:
+    """Trigram index of the text files under one directory."""
+
+    def __init__(self, root: str, index_path: Optional[str] = None):
+        """
+        Initialize the index, loading it from disk if it was saved before.
+
+        Args:
+            root: Directory to index
+            index_path: Where to store the index (defaults to a file in
+                config.SEARCH_INDEX_DIR named after the root)
+        """
+        self.root = os.path.abspath(root)
+        if index_path is None:
+            digest = hashlib.sha1(self.root.encode()).hexdigest()[:16]
+            index_path = os.path.join(os.path.expanduser(config.SEARCH_INDEX_DIR), f"{digest}.pkl")
+        self.index_path = index_path
+        # relpath -> (file id, mtime_ns, size)
+        self._files: Dict[str, Tuple[int, int, int]] = {}
+        self._paths: Dict[int, str] = {}
+        self._postings: Dict[int, array] = {}
+        self._next_id = 0
+        self._dead_ids = 0
+        self._pending: Set[str] = set()
+        self._last_refresh = 0.0
+        # Changes not yet saved; saving rewrites the whole index, so it only happens on a full refresh
+        self._unsaved = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def search_candidates(self, literals: Iterable[str]) -> List[str]:
+        """
+        Get the files that may contain all of the given literals.
+
+        Args:
+            literals: Strings a matching file must contain
+
+        Returns:
+            Relative paths of candidate files, sorted
+        """
+        with self._lock:
+            self._refresh_if_stale()
+            wanted: Set[int] = set()
+            for literal in literals:
+                wanted |= trigrams(literal.encode("utf-8"))
+
+            if not wanted:
+                return sorted(self._files)
+
+            postings = sorted((self._postings.get(trigram, array("I")) for trigram in wanted), key=len)
+            ids = set(postings[0])
+            for posting in postings[1:]:
+                if not ids:
+                    break
+                ids.intersection_update(posting)
+            return sorted(self._paths[file_id] for file_id in ids if file_id in self._paths)
+
+    def notify_changed(self, path: str) -> None:
+        """
+        Mark a file as changed so the next search re-indexes it.
+
+        Args:
+            path: Absolute path of the file
+        """
+        with self._lock:
+            self._pending.add(path)
+
+    def mark_stale(self) -> None:
+        """Make the next search refresh the whole index, after changes that weren't reported file by file."""
+        with self._lock:
+            self._last_refresh = 0.0
+
+    def refresh(self) -> int:
+        """
+        Bring the whole index up to date with the files on disk.
+
+        Returns:
+            Number of files added, updated or removed
+        """
+        with self._lock:
+            return self._refresh()
+
+    def _refresh_if_stale(self) -> None:
+        """Refresh fully every SEARCH_REFRESH_INTERVAL seconds, otherwise just re-index pending files."""
+        if time.monotonic() - self._last_refresh >= config.SEARCH_REFRESH_INTERVAL:
+            self._refresh()
+            return
+
+        changed = 0
+        for path in self._pending:
+            relpath = os.path.relpath(path, self.root).replace(os.sep, "/")
+            if relpath.startswith("../"):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                changed += self._remove(relpath)
+                continue
+            changed += self._update(relpath, path, st.st_mtime_ns, st.st_size)
+        self._pending.clear()
+        if changed:
+            self._unsaved = True
+
+    def _refresh(self) -> int:
+        """Walk the root and re-index files whose mtime or size changed."""
+        start = time.perf_counter()
+        seen = set()
+        changed = 0
+        for relpath, entry, _ in walk(self.root):
+            if not entry.is_file():
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            seen.add(relpath)
+            changed += self._update(relpath, entry.path, st.st_mtime_ns, st.st_size)
+
+        for relpath in [relpath for relpath in self._files if relpath not in seen]:
+            changed += self._remove(relpath)
+
+        if self._dead_ids > max(1000, len(self._paths)):
+            self._compact()
+        self._pending.clear()
+        self._last_refresh = time.monotonic()
+        if changed or self._unsaved:
+            self._save()
+        logger.info("Search index refresh: %d files changed in %.3fs", changed, time.perf_counter() - start)
+        return changed
+
+    def _update(self, relpath: str, path: str, mtime_ns: int, size: int) -> int:
+        """Re-index one file if it changed. Returns 1 if the index changed."""
+        entry = self._files.get(relpath)
+        if entry is not None and entry[1:] == (mtime_ns, size):
+            return 0
+
+        data = None
+        if size <= config.SEARCH_MAX_FILE_BYTES:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                pass
+        if data is None or b"\0" in data[:config.READ_FILE_BINARY_SNIFF_BYTES]:
+            # Unreadable, too large or binary - not searchable
+            return self._remove(relpath)
+
+        self._remove(relpath)
+        file_id = self._next_id
+        self._next_id += 1
+        self._files[relpath] = (file_id, mtime_ns, size)
+        self._paths[file_id] = relpath
+        for trigram in trigrams(data):
+            posting = self._postings.get(trigram)
+            if posting is None:
+                posting = self._postings[trigram] = array("I")
+            posting.append(file_id)
+        return 1
+
+    def _remove(self, relpath: str) -> int:
+        """Drop a file from the index. Its postings stay behind until the next compaction."""
+        entry = self._files.pop(relpath, None)
+        if entry is None:
+            return 0
+        del self._paths[entry[0]]
+        self._dead_ids += 1
+        return 1
+
+    def _compact(self) -> None:
+        """Remove postings that belong to files no longer in the index."""
+        live = self._paths
+        postings = {}
+        for trigram, posting in self._postings.items():
+            kept = array("I", (file_id for file_id in posting if file_id in live))
+            if kept:
+                postings[trigram] = kept
+        self._postings = postings
+        self._dead_ids = 0
+
+    def _load(self) -> None:
+        """Load the saved index, if there is a usable one."""
+        try:
+            with open(self.index_path, "rb") as f:
+                saved = pickle.load(f)
+            if saved.get("version") != INDEX_VERSION or saved.get("root") != self.root:
+                return
+            files = saved["files"]
+            paths = {entry[0]: relpath for relpath, entry in files.items()}
+            postings = {}
+            for trigram, raw in saved["postings"].items():
+                posting = array("I")
+                posting.frombytes(raw)
+                postings[trigram] = posting
+            next_id, dead_ids = int(saved["next_id"]), int(saved["dead_ids"])
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            # Truncated, from another version or otherwise unusable - rebuild from scratch
+            logger.warning("Ignoring unusable search index %s: %s", self.index_path, e)
+            return
+        self._files, self._paths, self._postings = files, paths, postings
+        self._next_id, self._dead_ids = next_id, dead_ids
+
+    def _save(self) -> None:
+        """Write the index to disk atomically."""
+        saved = {
+            "version": INDEX_VERSION,
+            "root": self.root,
+            "files": self._files,
+            "next_id": self._next_id,
+            "dead_ids": self._dead_ids,
+            "postings": {trigram: posting.tobytes() for trigram, posting in self._postings.items()}
+        }
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                pickle.dump(saved, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.index_path)
+            self._unsaved = False
+        except OSError as e:
+            logger.warning("Could not save search index: %s", e)
+
+
+_indexes: Dict[str, TrigramIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(root: str) -> TrigramIndex:
+    """
+    Get the index for a directory, creating or loading it on first use.
+
+    Args:
+        root: Directory to search
+
+    Returns:
+        Shared index for that directory
+    """
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = TrigramIndex(root)
+        return index
+
+
+def notify_changed(path: str) -> None:
+    """
+    Tell every loaded index that a file changed.
+
+    Args:
+        path: Path of the changed file
+    """
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        if path.startswith(index.root + os.sep):
+            index.notify_changed(path)
+
+
+def mark_all_stale() -> None:
+    """Make every loaded index refresh fully on its next search, e.g. after a shell command ran."""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.mark_stale()
@@ -0,0 +1,143 @@
+"""Code search tool backed by the trigram index."""
+
+import fnmatch
+import os
+import re
+from typing import List, Optional
+import config
+from .base import Tool
+from .search_index import get_index, required_literals
+
+
+# Tool implementation functions
+
+def search_code(
+    query: str,
+    path: str = ".",
+    regex: bool = False,
+    case_sensitive: bool = False,
+    pattern: Optional[str] = None,
+    context_lines: int = 2,
+    max_results: int = config.SEARCH_MAX_RESULTS
+) -> str:
+    """Search the text files under a directory for a literal string or regex."""
+    if not os.path.isdir(path):
+        return f"Error: Directory not found: {path}"
+    try:
+        compiled = re.compile(query if regex else re.escape(query), 0 if case_sensitive else re.IGNORECASE)
+    except re.error as e:
+        return f"Error: Invalid regular expression: {e}"
+
+    literals = required_literals(query, regex)
+    if not case_sensitive:
+        # The index only folds ASCII case
+        literals = [literal for literal in literals if literal.isascii()]
+
+    root = os.path.abspath(path)
+    candidates = get_index(root).search_candidates(literals)
+    if pattern:
+        candidates = [
+            relpath for relpath in candidates
+            if fnmatch.fnmatch(relpath if "/" in pattern else relpath.rsplit("/", 1)[-1], pattern)
+        ]
+
+    output: List[str] = []
+    matches = 0
+    for relpath in candidates:
+        try:
+            with open(os.path.join(root, relpath), "r", encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue
+
+        hits = [i for i, line in enumerate(lines) if compiled.search(line)]
+        hit_set = set(hits)
+        if not hits:
+            continue
+
+        shown_until = None
+        for i in hits:
+            if matches == max_results:
+                output.append(f"[... stopped after {max_results} matches; narrow the query or pattern]")
+                return "\n".join(output)
+            matches += 1
+            first = max(i - context_lines, 0 if shown_until is None else shown_until + 1)
+            last = min(i + context_lines, len(lines) - 1)
+            if output and (shown_until is None or first > shown_until + 1):
+                # Separate groups of lines that aren't contiguous, like grep
+                output.append("--")
+            for j in range(first, last + 1):
+                separator = ":" if j in hit_set else "-"
+                output.append(f"{relpath}{separator}{j + 1}{separator} {_clip_line(lines[j])}")
+            shown_until = max(last, shown_until if shown_until is not None else -1)
+
+    if not output:
+        return f"No matches for {query!r} in {path}"
+    return "\n".join(output)
+
+
+def _clip_line(line: str) -> str:
+    """Shorten very long lines such as minified code."""
+    limit = config.SEARCH_MAX_LINE_CHARS
+    return line if len(line) <= limit else line[:limit] + "..."
+
+
+# Tool definitions
+
+search_code_tool = Tool(
+    name="search_code",
+    description=(
+        "Search the text files under a directory for a literal string or a regular expression. "
+        "Uses an index, so it is fast even on large repositories. Returns matching lines as "
+        "'path:line: text' with surrounding context lines ('path-line- text'). "
+        "Files ignored by .gitignore are not searched."
+    ),
+    input_schema={
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "Text or regular expression to search for"
+            },
+            "path": {
+                "type": "string",
+                "description": "Directory to search in (defaults to current directory)",
+                "default": "."
+            },
+            "regex": {
+                "type": "boolean",
+                "description": "Treat the query as a regular expression",
+                "default": False
+            },
+            "case_sensitive": {
+                "type": "boolean",
+                "description": "Match case exactly",
+                "default": False
+            },
+            "pattern": {
+                "type": "string",
+                "description": "Only search files matching this glob, e.g. '*.py'"
+            },
+            "context_lines": {
+                "type": "integer",
+                "description": "Lines of context to show around each match",
+                "default": 2
+            },
+            "max_results": {
+                "type": "integer",
+                "description": "Maximum number of matching lines to return",
+                "default": config.SEARCH_MAX_RESULTS
+            }
+        },
+        "required": ["query"]
+    },
+    function=search_code,
+    read_only=True,
+    path_param="path",
+    pure=True
+)
+
+
+def get_search_tools() -> list[Tool]:
+    """Get all search tools."""
+    return [search_code_tool]
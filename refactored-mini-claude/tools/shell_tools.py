@@ -0,0 +1,381 @@
+"""Shell command tools for the agent."""
+
+import atexit
+import itertools
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+import config
+from .base import Tool, current_tool_session
+from . import search_index
+
+
+class OutputBuffer:
+    """
+    Bounded capture of a command's output.
+
+    The first half of the byte limit keeps the start of the output and a
+    ring of the second half keeps the end, so a command printing gigabytes
+    holds at most max_bytes and its output is shown as head, omitted-bytes
+    marker and tail. Positions are absolute offsets into the full output, so
+    a reader can ask for what was written since it last looked.
+    """
+
+    def __init__(self, max_bytes: int = config.SHELL_OUTPUT_MAX_BYTES):
+        """
+        Initialize an empty buffer.
+
+        Args:
+            max_bytes: Most bytes of output kept
+        """
+        self.head_limit = max_bytes // 2
+        self.tail_limit = max_bytes - self.head_limit
+        self._head = bytearray()
+        self._tail = bytearray()
+        # Bytes written in total; the tail holds the last len(_tail) of them
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes) -> None:
+        """Add output."""
+        with self._lock:
+            self.total += len(data)
+            room = self.head_limit - len(self._head)
+            if room > 0:
+                self._head += data[:room]
+                data = data[room:]
+            if data:
+                self._tail += data
+                if len(self._tail) > self.tail_limit:
+                    del self._tail[:len(self._tail) - self.tail_limit]
+
+    def read(self, since: int = 0) -> Tuple[str, int]:
+        """
+        Get the output written after an offset.
+
+        Args:
+            since: Offset returned by the previous read (0 for everything)
+
+        Returns:
+            The output, with a marker where bytes were dropped, and the
+            offset to pass next time
+        """
+        with self._lock:
+            total = self.total
+            tail_start = total - len(self._tail)
+            parts = []
+            if since < len(self._head):
+                parts.append(bytes(self._head[since:]))
+            position = max(since, len(self._head))
+            if position < tail_start:
+                parts.append(f"\n[... {tail_start - position} bytes of output omitted ...]\n".encode("utf-8"))
+                position = tail_start
+            parts.append(bytes(self._tail[position - tail_start:]))
+        return b"".join(parts).decode("utf-8", errors="replace"), total
+
+
+class Job:
+    """A command running in its own process group, its output read by a background thread."""
+
+    def __init__(self, job_id: str, command: str, cwd: str, max_output_bytes: int = config.SHELL_OUTPUT_MAX_BYTES):
+        """
+        Start the command.
+
+        Args:
+            job_id: Identifier reported to the model
+            command: Shell command line
+            cwd: Working directory
+            max_output_bytes: Most bytes of output kept
+
+        Raises:
+            OSError: If the shell can't be started
+        """
+        self.id = job_id
+        self.command = command
+        self.output = OutputBuffer(max_output_bytes)
+        self.started = time.monotonic()
+        self.timed_out = False
+        # Offset of the output already returned by command_status
+        self.read_offset = 0
+        self.process = subprocess.Popen(
+            command,
+            shell=True,
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            # Merged, so the output keeps the order it was written in
+            stderr=subprocess.STDOUT,
+            # A new session makes the shell a process group leader, so its children can be killed with it
+            start_new_session=True
+        )
+        self._reader = threading.Thread(target=self._read_output, name=f"job-{job_id}", daemon=True)
+        self._reader.start()
+
+    def _read_output(self) -> None:
+        stdout = self.process.stdout
+        while True:
+            data = stdout.read1(65536)
+            if not data:
+                break
+            self.output.write(data)
+        stdout.close()
+
+    @property
+    def running(self) -> bool:
+        """True until the command exits."""
+        return self.process.poll() is None
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """
+        Wait for the command to exit and its output to be read.
+
+        Args:
+            timeout: Seconds to wait (None = no limit)
+
+        Returns:
+            True if it exited within the timeout
+        """
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            return False
+        # Children that outlive the shell can hold the pipe open; don't wait on them forever
+        self._reader.join(config.SHELL_KILL_GRACE_SECONDS)
+        return True
+
+    def kill(self) -> None:
+        """Stop the command and everything it started: SIGTERM to its process group, then SIGKILL."""
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(self.process.pid, sig)
+            except (ProcessLookupError, PermissionError):
+                break
+            self.wait(config.SHELL_KILL_GRACE_SECONDS)
+        self.process.wait()
+        self._reader.join(config.SHELL_KILL_GRACE_SECONDS)
+
+    def status(self) -> str:
+        """One line describing the job's state."""
+        elapsed = time.monotonic() - self.started
+        if self.running:
+            return f"Job {self.id} is running ({elapsed:.1f}s): {self.command}"
+        if self.timed_out:
+            return f"Job {self.id} was killed after timing out: {self.command}"
+        return f"Job {self.id} exited with code {self.process.returncode}: {self.command}"
+
+
+class JobTable:
+    """
+    Background jobs of one session, by id.
+
+    A session only sees its own jobs, so under the server one session can't
+    read or kill another's by guessing ids. Jobs still running when the
+    session is closed, or at exit, are killed.
+    """
+
+    def __init__(self, max_jobs: int = config.SHELL_MAX_BACKGROUND_JOBS):
+        self.max_jobs = max_jobs
+        self._jobs: Dict[str, Job] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        _tables.add(self)
+
+    def start(self, command: str, cwd: str) -> Job:
+        """
+        Start a background job.
+
+        Raises:
+            RuntimeError: If max_jobs jobs are already running
+            OSError: If the shell can't be started
+        """
+        with self._lock:
+            if sum(job.running for job in self._jobs.values()) >= self.max_jobs:
+                raise RuntimeError(f"{self.max_jobs} background jobs are already running; wait for or kill one first")
+            job = Job(str(next(self._ids)), command, cwd)
+            self._jobs[job.id] = job
+            return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def remove(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def kill_all(self) -> None:
+        """Kill every running job."""
+        with self._lock:
+            running = [job for job in self._jobs.values() if job.running]
+        for job in running:
+            job.kill()
+
+    def close(self) -> None:
+        """Kill the running jobs, when the session that owns them ends."""
+        _tables.discard(self)
+        self.kill_all()
+
+
+# Job tables not closed yet, so jobs still running at exit can be killed
+_tables: Set[JobTable] = set()
+
+
+@atexit.register
+def _kill_all_jobs() -> None:
+    for table in list(_tables):
+        table.kill_all()
+
+
+# Jobs started outside any tool session (tools called directly)
+jobs = JobTable()
+
+
+def session_jobs() -> JobTable:
+    """Get the job table of the calling tool session."""
+    session = current_tool_session.get()
+    if session is None:
+        return jobs
+    return session.state("shell_jobs", JobTable)
+
+
+# Tool implementation functions
+
+def run_command(command: str, timeout: float = config.SHELL_TIMEOUT, cwd: str = ".", background: bool = False) -> str:
+    """
+    Run a shell command and return its exit code and output.
+
+    The command runs in its own process group; if it outlives the timeout,
+    the whole group is killed, so test runners and servers it started don't
+    linger. stdout and stderr are merged and capped at
+    config.SHELL_OUTPUT_MAX_BYTES (keeping the start and the end).
+
+    With background=True the command is started as a job and its id returned
+    at once; the job is followed with command_status.
+    """
+    if not os.path.isdir(cwd):
+        return f"Error: Directory not found: {cwd}"
+    if timeout <= 0:
+        return "Error: timeout must be positive"
+    timeout = min(timeout, config.SHELL_MAX_TIMEOUT)
+
+    try:
+        if background:
+            job = session_jobs().start(command, cwd)
+            return f"Started job {job.id} (pid {job.process.pid}). Check on it with command_status."
+        job = Job("foreground", command, cwd)
+    except (OSError, RuntimeError) as e:
+        return f"Error: {e}"
+
+    try:
+        finished = job.wait(timeout)
+    finally:
+        # Interrupted (Ctrl-C) or timed out: the job is in its own session, so nothing else will stop it
+        if job.running:
+            job.timed_out = True
+            job.kill()
+        # Commands can change files behind the search index's back (git checkout, formatters, codegen)
+        search_index.mark_all_stale()
+    output, _ = job.output.read()
+    if not finished:
+        return f"Error: Command timed out after {timeout:g}s; its process group was killed. Output so far:\n{output}"
+    return f"Exit code: {job.process.returncode}\n{output}"
+
+
+def command_status(job_id: str, wait: float = 0, kill: bool = False) -> str:
+    """
+    Report a background job's state and the output written since the last check.
+
+    Args are documented in the tool schema. A finished job is forgotten once
+    its final output has been returned.
+    """
+    table = session_jobs()
+    job = table.get(job_id)
+    if job is None:
+        return f"Error: No background job {job_id!r}"
+    if kill and job.running:
+        job.kill()
+    elif wait > 0:
+        job.wait(min(wait, config.SHELL_MAX_TIMEOUT))
+
+    running = job.running
+    output, job.read_offset = job.output.read(job.read_offset)
+    if not running:
+        table.remove(job_id)
+        search_index.mark_all_stale()
+    return f"{job.status()}\n{output}" if output else f"{job.status()}\n(no new output)"
+
+
+# Tool definitions
+
+run_command_tool = Tool(
+    name="run_command",
+    description=(
+        "Run a shell command (sh -c) and return its exit code and combined stdout/stderr, e.g. to run "
+        "tests, builds or git. Output is capped, keeping the start and the end. The command is killed, "
+        "with everything it started, if it runs longer than the timeout. For long-running commands "
+        "such as servers or watchers, set background to true and check on the job with command_status."
+    ),
+    input_schema={
+        "type": "object",
+        "properties": {
+            "command": {
+                "type": "string",
+                "description": "Shell command line to run"
+            },
+            "timeout": {
+                "type": "number",
+                "description": f"Seconds before the command is killed (at most {config.SHELL_MAX_TIMEOUT:g})",
+                "default": config.SHELL_TIMEOUT
+            },
+            "cwd": {
+                "type": "string",
+                "description": "Working directory (defaults to the current directory)",
+                "default": "."
+            },
+            "background": {
+                "type": "boolean",
+                "description": "Start the command as a background job and return its job id immediately",
+                "default": False
+            }
+        },
+        "required": ["command"]
+    },
+    function=run_command
+)
+
+command_status_tool = Tool(
+    name="command_status",
+    description=(
+        "Check on a background job started by run_command: whether it is still running, its exit code, "
+        "and the output written since the last check. Can wait for the job to finish, or kill it."
+    ),
+    input_schema={
+        "type": "object",
+        "properties": {
+            "job_id": {
+                "type": "string",
+                "description": "Job id returned by run_command"
+            },
+            "wait": {
+                "type": "number",
+                "description": "Seconds to wait for the job to finish before reporting",
+                "default": 0
+            },
+            "kill": {
+                "type": "boolean",
+                "description": "Kill the job and everything it started",
+                "default": False
+            }
+        },
+        "required": ["job_id"]
+    },
+    function=command_status
+)
+
+
+def get_shell_tools() -> list[Tool]:
+    """Get all shell tools."""
+    return [run_command_tool, command_status_tool]
@@ -0,0 +1,113 @@
+"""Sub-agent tool: fan independent parts of a task out to child agents."""
+
+from typing import Any, Dict, List
+import config
+from .base import Tool
+from .registry import ToolRegistry
+
+
+def get_subagent_tools(registry: ToolRegistry) -> list[Tool]:
+    """
+    Get the sub-agent tools for a registry.
+
+    Register these last: children can use the tools in the registry when
+    spawn_subagents is called, except spawn_subagents itself.
+
+    Args:
+        registry: Registry the tools are added to, whose tools the
+            children get
+
+    Returns:
+        The spawn_subagents tool
+    """
+
+    def spawn_subagents(
+        tasks: List[Dict[str, Any]],
+        max_concurrency: int = config.SUBAGENT_MAX_CONCURRENCY,
+        token_budget: int = config.SUBAGENT_TOKEN_BUDGET
+    ) -> str:
+        """Run a child agent on each task, concurrently, and return their reports."""
+        # Imported here: core.subagents builds on core.agent, which imports the tools
+        from core.subagents import run_subagents
+
+        if not tasks:
+            return "Error: No tasks given"
+        if len(tasks) > config.SUBAGENT_MAX_TASKS:
+            return f"Error: At most {config.SUBAGENT_MAX_TASKS} tasks per call, got {len(tasks)}"
+        if max_concurrency < 1 or token_budget < 1:
+            return "Error: max_concurrency and token_budget must be positive"
+        available = set(registry.list_tools())
+        for task in tasks:
+            if not isinstance(task, dict) or not isinstance(task.get("task"), str):
+                return "Error: Each task must be an object with a 'task' string"
+            unknown = sorted(set(task.get("tools") or []) - available)
+            if unknown:
+                return f"Error: Unknown tools: {', '.join(unknown)}"
+
+        reports = run_subagents(
+            tasks,
+            registry,
+            max_concurrency=min(max_concurrency, config.SUBAGENT_MAX_CONCURRENCY),
+            token_budget=min(token_budget, config.SUBAGENT_TOKEN_BUDGET)
+        )
+        sections = [
+            f"## Sub-agent {i} ({report['status']}, {report['api_calls']} API calls, "
+            f"{report['tokens']} tokens, {report['seconds']:.1f}s)\n"
+            f"Task: {_first_line(report['task'])}\n\n{report['report']}"
+            for i, report in enumerate(reports, 1)
+        ]
+        total_tokens = sum(report["tokens"] for report in reports)
+        return "\n\n".join(sections) + f"\n\n[{len(reports)} sub-agents used {total_tokens} tokens in total]"
+
+    return [Tool(
+        name="spawn_subagents",
+        description=(
+            "Hand independent parts of a large task to sub-agents that work in parallel, e.g. one per module to "
+            "review or refactor. Each sub-agent starts with no knowledge of this conversation, so every task must "
+            "be self-contained: say what to do, where, and what to report. Only each sub-agent's final report is "
+            "returned. Don't give two sub-agents the same files to change. Use this for work that splits into "
+            "parts needing several tool calls each, not for single lookups."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "tasks": {
+                    "type": "array",
+                    "description": f"One entry per sub-agent (at most {config.SUBAGENT_MAX_TASKS})",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "task": {
+                                "type": "string",
+                                "description": "Complete instructions for the sub-agent"
+                            },
+                            "tools": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "Tools the sub-agent may use (defaults to all of yours), e.g. only "
+                                               "read_file and search_code for a review"
+                            }
+                        },
+                        "required": ["task"]
+                    }
+                },
+                "max_concurrency": {
+                    "type": "integer",
+                    "description": "Sub-agents running at once",
+                    "default": config.SUBAGENT_MAX_CONCURRENCY
+                },
+                "token_budget": {
+                    "type": "integer",
+                    "description": "Tokens all the sub-agents may use together; each stops when it is spent",
+                    "default": config.SUBAGENT_TOKEN_BUDGET
+                }
+            },
+            "required": ["tasks"]
+        },
+        function=spawn_subagents
+    )]
+
+
+def _first_line(text: str, limit: int = 120) -> str:
+    line = text.strip().split("\n", 1)[0]
+    return line if len(line) <= limit else line[:limit] + "..."